@@ -128,16 +128,19 @@ def preprocess_seasonal_data(raw_file, interval=None, themask=None,
     #--- READ DATA ---
     obs = Data(obs_ymonmean_file, obs_var, read=True, label=label,
                lat_name='lat', lon_name='lon', shift_lon=shift_lon,
-               time_cycle=time_cycle)
+               time_cycle=time_cycle,
+               share_grid=True)
     obs_std = Data(obs_ymonstd_file, obs_var, read=True,
                    label=label + ' std', lat_name='lat', lon_name='lon',
-                   shift_lon=shift_lon, time_cycle=time_cycle)
+                   shift_lon=shift_lon, time_cycle=time_cycle,
+                   share_grid=True)
     obs.std = obs_std.data.copy()
     del obs_std
     obs_N = Data(obs_ymonN_file, obs_var, read=True,
                  label=label + ' N', unit='-', lat_name='lat',
                  lon_name='lon',
-                 shift_lon=shift_lon, time_cycle=time_cycle)
+                 shift_lon=shift_lon, time_cycle=time_cycle,
+                 share_grid=True)
     obs.n = obs_N.data.copy()
     del obs_N
 
@@ -148,7 +151,7 @@ def preprocess_seasonal_data(raw_file, interval=None, themask=None,
     #/// read monthly data (needed for global means and hovmoeller plots) ///
     obs_monthly = Data(obs_mon_file, obs_var, read=True, label=label,
                        lat_name='lat', lon_name='lon',
-                       shift_lon=shift_lon)  # ,mask=ls_mask.data.data)
+                       shift_lon=shift_lon, share_grid=True)  # ,mask=ls_mask.data.data)
 
     #try to ensure really monthly increasing time series
     if hasattr(obs_monthly, 'time_cycle'):
@@ -62,7 +62,7 @@ class Model(Data):
         else:
             self.stop_time = None
 
-    def save(self, directory, prefix=None):
+    def save(self, directory, prefix=None, format='nc'):
         """
         save model variables to file
 
@@ -72,7 +72,12 @@ class Model(Data):
             directory where to store the data to
         prefix : str
             file prefix [obligatory]
+        format : str
+            'nc': netCDF files; 'snap': binary snapshot files (see
+            Data.dump()) which can be reloaded fast with Data.load()
         """
+        if format not in ['nc', 'snap']:
+            raise ValueError('Invalid format: %s' % format)
         if prefix is None:
             raise ValueError('File prefix needs to be given!')
         if not os.path.exists(directory):
@@ -85,7 +90,10 @@ class Model(Data):
                 pass
             else:
                 if self.variables[k] is not None:
-                    self.variables[k].save(directory + prefix + '_' + k.strip().upper() + '.nc', varname=k.strip().lower(), delete=True, mean=False, timmean=False)
+                    if format == 'snap':
+                        self.variables[k].dump(directory + prefix + '_' + k.strip().upper() + '.snap', delete=True)
+                    else:
+                        self.variables[k].save(directory + prefix + '_' + k.strip().upper() + '.nc', varname=k.strip().lower(), delete=True, mean=False, timmean=False, chunking='time')
 
     def get_data(self):
         """
@@ -229,9 +237,12 @@ class MeanModel(Model):
                 raise ValueError('Model instance or derived class expected here!')
 
         if self.n == 0:
-            tmp = M.copy()
-            self.variables = tmp.variables
-            del tmp
+            # shared copies; add() and mulc() with copy=False duplicate the data
+            self.variables = {}
+            for k, v in M.variables.iteritems():
+                if isinstance(v, Data):
+                    v = v.copy(share=True)
+                self.variables.update({k: v})
             self.name = 'mean-model'
             self._unique_name = 'model_mean'
             self.N = {}
@@ -261,7 +272,7 @@ class MeanModel(Model):
                 else:  # mean model!
                     if hlp1 is None:
                         continue
-                    theD = hlp1.copy()
+                    theD = hlp1.copy(share=True)
                     theD.add(hlp2, copy=False)  # SUM: by using masked arrays, the resulting field is automatically only valid, when both datasets contain valid information!
                     theD.label = 'Mean-model'
                     self.variables.update({k: theD})
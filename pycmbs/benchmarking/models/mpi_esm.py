@@ -6,7 +6,9 @@ For COPYING and LICENSE details, please refer to the LICENSE file
 """
 
 from cdo import Cdo
-from pycmbs.data import Data
+from pycmbs.data import Data, get_memory_budget
+from pycmbs.data4D import Data4D
+from pycmbs.netcdf import NetCDFHandler
 import tempfile as tempfile
 import copy
 import glob
@@ -381,6 +383,120 @@ class JSBACH_RAW2(Model):
         """
         return self.name.replace(' ', '') + '-' + self.experiment.replace(' ', '')
 
+    def _aggregate_tiles(self, filename, varname, fraction_file=None, fraction_varname='cover_fract', veg_ratio_max='veg_ratio_max', chunksize=None):
+        """
+        aggregate a tile variable to grid box values as
+        sum(value * cover_fract [* veg_ratio_max]) over the tiles and
+        store the result in a file of the temporary directory
+
+        The tile values are read from file in chunks of timesteps,
+        thus only the grid box values of all timesteps are held in
+        memory. Cover fractions and veg_ratio_max are read in the same
+        chunks if their first dimension is the time dimension of the
+        tile values, otherwise they are read once.
+
+        Parameters
+        ----------
+        filename : str
+            file with the tile variable [time,tile,lat,lon]
+        varname : str
+            name of the tile variable
+        fraction_file : str
+            file with the cover fractions of the tiles and
+            veg_ratio_max. If None, the JSBACH main stream is used
+        fraction_varname : str
+            name of the cover fraction variable
+        veg_ratio_max : str
+            name of the variable of the maximum vegetated fraction
+            the cover fractions are scaled with. None for no scaling
+        chunksize : int
+            number of timesteps read at once. If None, the chunks are
+            sized according to the memory budget (see
+            pycmbs.data.set_memory_budget()); without a budget all
+            timesteps are read at once
+
+        Returns
+        -------
+        filename of the aggregated data
+        """
+        if fraction_file is None:
+            fraction_file = self.files['jsbach']
+        outfile = get_temporary_directory() + os.path.basename(filename)[:-3] + '_' + varname + '_box.nc'
+        if os.path.exists(outfile):
+            return outfile
+
+        def _get_shape(fname, vname):
+            # dimension names and shape of a variable
+            File = NetCDFHandler()
+            File.open_file(fname, 'r')
+            try:
+                if vname not in File.get_variable_keys():
+                    raise ValueError('Variable %s not existing in %s' % (vname, fname))
+                return File.get_dimensions(vname), File.get_variable_handler(vname).shape
+            finally:
+                File.close()
+
+        def _is_chunked(fname, vname):
+            # variables with the time dimension are read in chunks
+            dims, s = _get_shape(fname, vname)
+            if len(dims) == 0 or dims[0] != time_dim:
+                return False
+            if s[0] != nt:
+                raise ValueError('Time axis of %s inconsistent with %s' % (vname, varname))
+            return True
+
+        def _read(fname, vname, window, cls):
+            if window is None:
+                return cls(fname, vname, read=True, shift_lon=False)
+            return cls(fname, vname, read=True, shift_lon=False, time_window=window)
+
+        dims, shape = _get_shape(filename, varname)
+        if len(shape) != 4:
+            raise ValueError('Tile variable needs to be given as [time,tile,lat,lon]: %s' % varname)
+        time_dim = dims[0]
+        nt = shape[0]
+        if chunksize is None:
+            budget = get_memory_budget()
+            if budget is None:
+                chunksize = nt
+            else:
+                # tile values, fractions and temporaries of aggregate_tiles()
+                step = (4 * shape[1] + 1) * shape[2] * shape[3] * 9
+                chunksize = max(1, int(budget // step))
+
+        # variables with other time axes than the tile values are read once
+        fractions = None
+        vrm = None
+        chunked_fractions = _is_chunked(fraction_file, fraction_varname)
+        if not chunked_fractions:
+            fractions = _read(fraction_file, fraction_varname, None, Data4D)
+        chunked_vrm = False
+        if veg_ratio_max is not None:
+            chunked_vrm = _is_chunked(fraction_file, veg_ratio_max)
+            if not chunked_vrm:
+                vrm = _read(fraction_file, veg_ratio_max, None, Data)
+
+        res = None
+        data = []
+        time = []
+        for i1 in xrange(0, nt, chunksize):
+            window = (i1, min(i1 + chunksize, nt))
+            values = _read(filename, varname, window, Data4D)
+            if chunked_fractions:
+                fractions = _read(fraction_file, fraction_varname, window, Data4D)
+            if chunked_vrm:
+                vrm = _read(fraction_file, veg_ratio_max, window, Data)
+            r = values.aggregate_tiles(fractions, veg_ratio_max=vrm)
+            del values
+            if res is None:
+                res = r
+            data.append(r.data)
+            time.append(r.time)
+        res.data = np.ma.concatenate(data, axis=0)
+        res.time = np.concatenate(time)
+        res.save(outfile, varname=varname, delete=True)
+        return outfile
+
     def get_albedo_data(self, interval='season'):
         """
         calculate albedo as ratio of upward and downwelling fluxes
@@ -470,6 +586,12 @@ class JSBACH_RAW2(Model):
             variable - name of the variable as the short_name in the netcdf file
 
             kwargs is a dictionary with keys for each model. Then a dictionary with properties follows
+
+        optional parameters for tile variables are:
+            stream - stream the variable is read from (key of self.files)
+            aggregate_tiles - aggregate tile values to grid box values (see _aggregate_tiles())
+            fraction_variable - name of the cover fraction variable
+            veg_ratio_max - name of the veg_ratio_max variable; None for no scaling
         """
 
         if not self.type in kwargs.keys():
@@ -496,6 +618,10 @@ class JSBACH_RAW2(Model):
         valid_mask = locdict.pop('valid_mask')
         custom_path = locdict.pop('custom_path', None)
         thelevel = locdict.pop('level', None)
+        stream = locdict.pop('stream', None)
+        aggregate_tiles = locdict.pop('aggregate_tiles', False)
+        fraction_variable = locdict.pop('fraction_variable', 'cover_fract')
+        veg_ratio_max = locdict.pop('veg_ratio_max', 'veg_ratio_max')
 
         target_grid = self._actplot_options['targetgrid']
         interpolation = self._actplot_options['interpolation']
@@ -505,7 +631,9 @@ class JSBACH_RAW2(Model):
             raise ValueError('Invalid data format here!')
 
         # define from which stream of JSBACH data needs to be taken for specific variables
-        if varname in ['swdown_acc', 'swdown_reflect_acc']:
+        if stream is not None:
+            filename1 = self.files[stream]
+        elif varname in ['swdown_acc', 'swdown_reflect_acc']:
             filename1 = self.files['jsbach']
         elif varname in ['precip_acc']:
             filename1 = self.files['land']
@@ -546,6 +674,9 @@ class JSBACH_RAW2(Model):
             print 'WARNING: File not existing: ' + filename1
             return None
 
+        if aggregate_tiles:
+            filename1 = self._aggregate_tiles(filename1, varname, fraction_varname=fraction_variable, veg_ratio_max=veg_ratio_max)
+
         cdo.monmean(options='-f nc', output=file_monthly, input='-' + interpolation + ',' + target_grid + ' -seldate,' + s_start_time + ',' + s_stop_time + ' ' + filename1, force=force_calc)
 
         sys.stdout.write('\n *** Reading model data... \n')
@@ -584,11 +715,11 @@ class JSBACH_RAW2(Model):
         else:
             print interval
             raise ValueError('Unsupported interval!')
-        mdata = Data(mdata_clim_file, varname, read=True, label=self.model, unit=units, lat_name=lat_name, lon_name=lon_name, shift_lon=False, scale_factor=scf, level=thelevel, time_cycle=thetime_cylce)
-        mdata_std = Data(mdata_clim_std_file, varname, read=True, label=self.model + ' std', unit='-', lat_name=lat_name, lon_name=lon_name, shift_lon=False, level=thelevel, time_cycle=thetime_cylce)
+        mdata = Data(mdata_clim_file, varname, read=True, label=self.model, unit=units, lat_name=lat_name, lon_name=lon_name, shift_lon=False, scale_factor=scf, level=thelevel, time_cycle=thetime_cylce, share_grid=True)
+        mdata_std = Data(mdata_clim_std_file, varname, read=True, label=self.model + ' std', unit='-', lat_name=lat_name, lon_name=lon_name, shift_lon=False, level=thelevel, time_cycle=thetime_cylce, share_grid=True)
         mdata.std = mdata_std.data.copy()
         del mdata_std
-        mdata_N = Data(mdata_N_file, varname, read=True, label=self.model + ' std', unit='-', lat_name=lat_name, lon_name=lon_name, shift_lon=False, scale_factor=scf, level=thelevel)
+        mdata_N = Data(mdata_N_file, varname, read=True, label=self.model + ' std', unit='-', lat_name=lat_name, lon_name=lon_name, shift_lon=False, scale_factor=scf, level=thelevel, share_grid=True)
         mdata.n = mdata_N.data.copy()
         del mdata_N
 
@@ -597,7 +728,7 @@ class JSBACH_RAW2(Model):
         mdata.timsort()
 
         #4) read monthly data
-        mdata_all = Data(file_monthly, varname, read=True, label=self.model, unit=units, lat_name=lat_name, lon_name=lon_name, shift_lon=False, time_cycle=12, scale_factor=scf, level=thelevel)
+        mdata_all = Data(file_monthly, varname, read=True, label=self.model, unit=units, lat_name=lat_name, lon_name=lon_name, shift_lon=False, time_cycle=12, scale_factor=scf, level=thelevel, share_grid=True)
         mdata_all.adjust_time(day=15)
 
         if target_grid == 't63grid':
@@ -800,11 +931,11 @@ class xxxxxxxxJSBACH_RAW(Model):
             print interval
             raise ValueError('Unsupported interval!')
 
-        mdata = Data(mdata_clim_file, varname, read=True, label=self.name, shift_lon=False, time_cycle=thetime_cylce, lat_name='lat', lon_name='lon')
-        mdata_std = Data(mdata_clim_std_file, varname, read=True, label=self.name + ' std', unit='-', shift_lon=False, time_cycle=thetime_cylce, lat_name='lat', lon_name='lon')
+        mdata = Data(mdata_clim_file, varname, read=True, label=self.name, shift_lon=False, time_cycle=thetime_cylce, lat_name='lat', lon_name='lon', share_grid=True)
+        mdata_std = Data(mdata_clim_std_file, varname, read=True, label=self.name + ' std', unit='-', shift_lon=False, time_cycle=thetime_cylce, lat_name='lat', lon_name='lon', share_grid=True)
         mdata.std = mdata_std.data.copy()
         del mdata_std
-        mdata_N = Data(mdata_N_file, varname, read=True, label=self.name + ' std', shift_lon=False, lat_name='lat', lon_name='lon')
+        mdata_N = Data(mdata_N_file, varname, read=True, label=self.name + ' std', shift_lon=False, lat_name='lat', lon_name='lon', share_grid=True)
         mdata.n = mdata_N.data.copy()
         del mdata_N
 
@@ -813,7 +944,7 @@ class xxxxxxxxJSBACH_RAW(Model):
         mdata.timsort()
 
         #4) read monthly data
-        mdata_all = Data(file_monthly, varname, read=True, label=self.name, shift_lon=False, time_cycle=12, lat_name='lat', lon_name='lon')
+        mdata_all = Data(file_monthly, varname, read=True, label=self.name, shift_lon=False, time_cycle=12, lat_name='lat', lon_name='lon', share_grid=True)
         mdata_all.adjust_time(day=15)
 
         #mask_antarctica masks everything below 60 degree S.
@@ -214,6 +214,36 @@ class CMIP5Preprocessor(EnsemblePreprocessor):
         p = self.data_dir + self.institute + os.sep + self.model + os.sep + self.experiment + os.sep + 'mon' + os.sep + self.realm + os.sep + self.mip + os.sep + 'r' + str(ens) + 'i1p1' + os.sep + self.variable + os.sep + self.variable + '_' + self.mip + '_' + self.model + '_' + self.experiment + '_r' + '*.nc'
         return p
 
+    def get_ensemble_data(self, n, start_time=None, stop_time=None, **kwargs):
+        """
+        read the data of a single ensemble member directly from its
+        time sliced files, without merging them into a new file
+        (see mergetime()). Only the files which cover the period
+        start_time ... stop_time are read.
+
+        Parameters
+        ----------
+        n : int
+            number of ensemble member
+        start_time : datetime
+            start time of period
+        stop_time : datetime
+            end time of period
+        kwargs : dict
+            further arguments passed to C{Data}
+
+        Returns
+        -------
+        C{Data} object
+        """
+        from pycmbs.data import Data
+        if not hasattr(self, 'ensemble_files'):
+            self.get_ensemble_files()
+        if n not in self.ensemble_files.keys():
+            raise ValueError('Ensemble not existing!')
+        return Data(self.ensemble_files[n], self.variable, read=True,
+                    start_time=start_time, stop_time=stop_time, **kwargs)
+
     def mergetime_ensembles(self, delete=False, start_time=None, stop_time=None):
         self.get_ensemble_files()
         for i in self.ensemble_files.keys():
@@ -79,6 +79,78 @@ class TestPycmbsBenchmarkingModels(unittest.TestCase):
             os.remove(albfile)
         os.system('rm -rf ' + odir)
 
+    def test_save_snapshot(self):
+        m = self.model
+        odir = tempfile.mkdtemp() + os.sep
+        m.save(odir, prefix='testoutput', format='snap')
+        S = Data.load(odir + 'testoutput_SIS.snap')
+        self.assertTrue(np.all(S.data == m.variables['sis'].data))
+        self.assertEqual(S.label, 'sisdummy')
+        os.system('rm -rf ' + odir)
+
+    def test_jsbach_aggregate_tiles(self):
+        from netCDF4 import Dataset
+        from pycmbs.benchmarking.models.mpi_esm import JSBACH_RAW2
+
+        odir = tempfile.mkdtemp() + os.sep
+        os.environ['CDOTEMPDIR'] = odir
+        x = np.random.random((5, 3, 4, 6))
+        f = np.random.random((5, 3, 4, 6))
+        v = np.random.random((1, 4, 6))
+        F = Dataset(odir + 'jsbach.nc', 'w')
+        F.createDimension('time', None)
+        F.createDimension('tiles', 3)
+        F.createDimension('lat', 4)
+        F.createDimension('lon', 6)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t[:] = np.arange(5) * 30. + 15.
+        F.createVariable('lat', 'f8', ('lat',))[:] = [60., 20., -20., -60.]
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(6) * 60.
+        F.createVariable('lai', 'f8', ('time', 'tiles', 'lat', 'lon'))[:] = x
+        F.createVariable('cover_fract', 'f8', ('time', 'tiles', 'lat', 'lon'))[:] = f
+        F.createVariable('veg_ratio_max', 'f8', ('time', 'lat', 'lon'))[0:1] = v
+        F.close()
+
+        m = JSBACH_RAW2.__new__(JSBACH_RAW2)
+        m.files = {'jsbach': odir + 'jsbach.nc'}
+        try:
+            outfile = m._aggregate_tiles(odir + 'jsbach.nc', 'lai')
+            r = Data(outfile, 'lai', read=True, shift_lon=False)
+            self.assertTrue(np.all(np.abs(r.data - (x * f).sum(axis=1) * v) < 1.E-10))
+
+            # tile values and fractions read in chunks of timesteps
+            os.remove(outfile)
+            outfile = m._aggregate_tiles(odir + 'jsbach.nc', 'lai', veg_ratio_max=None, chunksize=2)
+            r = Data(outfile, 'lai', read=True, shift_lon=False)
+            self.assertEqual(r.data.shape, (5, 4, 6))
+            self.assertTrue(np.all(np.abs(r.time - (np.arange(5) * 30. + 15.)) < 1.E-10))
+            self.assertTrue(np.all(np.abs(r.data - (x * f).sum(axis=1)) < 1.E-10))
+
+            # fields without time dimension are read once, also if
+            # their first dimension has as many entries as timesteps
+            F = Dataset(odir + 'jsbach4.nc', 'w')
+            F.createDimension('time', None)
+            F.createDimension('tiles', 3)
+            F.createDimension('lat', 4)
+            F.createDimension('lon', 6)
+            t = F.createVariable('time', 'f8', ('time',))
+            t.units = 'days since 2000-01-01 00:00:00'
+            t[:] = np.arange(4) * 30. + 15.
+            F.createVariable('lat', 'f8', ('lat',))[:] = [60., 20., -20., -60.]
+            F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(6) * 60.
+            F.createVariable('lai', 'f8', ('time', 'tiles', 'lat', 'lon'))[:] = x[0:4]
+            F.createVariable('cover_fract', 'f8', ('time', 'tiles', 'lat', 'lon'))[:] = f[0:4]
+            F.createVariable('veg_ratio_max', 'f8', ('lat', 'lon'))[:] = v[0]
+            F.close()
+            m.files = {'jsbach': odir + 'jsbach4.nc'}
+            outfile = m._aggregate_tiles(odir + 'jsbach4.nc', 'lai', chunksize=2)
+            r = Data(outfile, 'lai', read=True, shift_lon=False)
+            self.assertTrue(np.all(np.abs(r.data - (x[0:4] * f[0:4]).sum(axis=1) * v[0]) < 1.E-10))
+        finally:
+            del os.environ['CDOTEMPDIR']
+            os.system('rm -rf ' + odir)
+
     @unittest.skip('Becnchmarking tests still pending')
     def test_cmip5_init_singlemember(self):
         data_dir = tempfile.mkdtemp()
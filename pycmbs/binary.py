@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module provides access to flat binary files (optionally gzip
+compressed) as numpy arrays of shape [nt, ny, nx]
+"""
+
+import os
+import gzip
+
+import numpy as np
+
+# format codes for each supported datatype. These are the same codes
+# as used by the struct module and are understood by numpy as well
+dtype_spec = {
+    'int16': 'H',
+    'double': 'd',
+    'int32': 'i',
+    'float': 'f'
+}
+
+valid_byteorders = ['=', '<', '>']
+
+
+class BinaryHandler(object):
+
+    def __init__(self, filename, dtype, nt=1, ny=None, nx=None,
+                 byteorder='=', offset=0, chunksize=2 ** 24):
+        """
+        handler for flat binary files
+
+        Uncompressed files are memory mapped, thus data is only read
+        from disk when it is actually accessed. Gzip compressed files
+        are decompressed in a streaming way into a single preallocated
+        buffer.
+
+        Parameters
+        ----------
+        filename : str
+            name of binary file; files ending with .gz are
+            assumed to be gzip compressed
+        dtype : str
+            datatype specification ['int16', 'double', 'int32', 'float']
+        nt : int
+            number of timesteps on file
+        ny : int
+            y-size of the array on file
+        nx : int
+            x-size of the array on file
+        byteorder : str
+            byteorder of the data on file
+            ['=': native, '<': little endian, '>': big endian]
+        offset : int
+            number of header bytes to skip at the beginning of the file
+        chunksize : int
+            number of bytes decompressed at once for gzip files
+        """
+        if dtype not in dtype_spec.keys():
+            raise ValueError('ERROR: invalid data type')
+        if byteorder not in valid_byteorders:
+            raise ValueError('ERROR: invalid byteorder: %s' % byteorder)
+        if ny is None:
+            raise ValueError('ERROR: Need to specify NY')
+        if nx is None:
+            raise ValueError('ERROR: Need to specify NX')
+
+        self.filename = filename
+        self.dtype = np.dtype(byteorder + dtype_spec[dtype])
+        self.shape = (nt, ny, nx)
+        self.offset = offset
+        self.chunksize = chunksize
+
+    def _is_compressed(self):
+        return self.filename[-3:] == '.gz'
+
+    def _get_nbytes(self):
+        nt, ny, nx = self.shape
+        return nt * ny * nx * self.dtype.itemsize
+
+    def get_variable(self):
+        """
+        get the content of the file as an array [nt,ny,nx]
+
+        Returns
+        -------
+        data : ndarray
+            memory mapped array for uncompressed files or an array
+            wrapping the decompressed buffer for gzip files. Slicing the
+            result results in views and does not copy any data.
+        """
+        if not os.path.exists(self.filename):
+            raise ValueError('ERROR: File not existing: %s' % self.filename)
+
+        if self._is_compressed():
+            return self._read_compressed()
+        else:
+            # mode='c' (copy-on-write) allows inplace modifications
+            # without writing these back to the file
+            return np.memmap(self.filename, dtype=self.dtype, mode='c',
+                             offset=self.offset, shape=self.shape)
+
+    def _read_compressed(self):
+        """
+        decompress gzip file into a preallocated buffer
+        """
+        nbytes = self._get_nbytes()
+        buf = bytearray(nbytes)
+        view = memoryview(buf)
+
+        f = gzip.open(self.filename, 'rb')
+        if self.offset > 0:
+            f.read(self.offset)
+        pos = 0
+        while pos < nbytes:
+            r = f.read(min(self.chunksize, nbytes - pos))
+            if len(r) == 0:
+                break
+            view[pos:pos + len(r)] = r
+            pos += len(r)
+        f.close()
+
+        if pos != nbytes:
+            raise ValueError('ERROR: file %s is too small for the given geometry: %s' % (self.filename, str(self.shape)))
+
+        return np.frombuffer(buf, dtype=self.dtype).reshape(self.shape)
+
+    def get_subset(self, tbeg=None, tend=None, ybeg=None, yend=None,
+                   xbeg=None, xend=None):
+        """
+        get a spatial and temporal window of the data as a view
+
+        Parameters
+        ----------
+        tbeg, tend : int
+            time index start/stop (stop is exclusive)
+        ybeg, yend : int
+            y index start/stop (stop is exclusive)
+        xbeg, xend : int
+            x index start/stop (stop is exclusive)
+        """
+        x = self.get_variable()
+        return x[tbeg:tend, ybeg:yend, xbeg:xend]
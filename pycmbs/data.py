@@ -11,6 +11,17 @@ import sys
 
 #~ from geoval.statistic import get_significance, ttest_ind
 from pycmbs.netcdf import NetCDFHandler
+from pycmbs.binary import BinaryHandler, dtype_spec
+from pycmbs.lazy import LazyArray, ChunkCache
+from pycmbs.packed import PackedArray, get_packing_index
+from pycmbs.grouping import group_reduce
+from pycmbs.spatial import GridIndex, deg2chord, km2chord
+from pycmbs.spectral import lomb_scargle_blocks
+from pycmbs.significance import masked_moments, ttest_from_moments
+from pycmbs.grid import get_grid
+from pycmbs.snapshot import write_snapshot, read_snapshot
+from pycmbs.multifile import is_file_pattern, expand_filenames, read_time_header
+from pycmbs import timeaxis
 
 
 import numpy as np
@@ -44,10 +55,109 @@ import pytz
 import datetime
 
 import tempfile
-import struct
 import gzip
 
 from geoval.core.data import GeoData
+from geoval.statistic import get_significance
+
+
+# datatypes supported for the data of Data objects
+valid_dtypes = ['float32', 'float64']
+
+# datatype used by default for the data of Data objects
+_default_dtype = 'float64'
+
+
+def set_default_dtype(dtype):
+    """
+    set the datatype which is used for the data of all C{Data}
+    objects which are created afterwards without an explicit
+    dtype. Using 'float32' halves the memory needed for the data.
+
+    Parameters
+    ----------
+    dtype : str
+        datatype ['float32','float64']
+    """
+    global _default_dtype
+    if np.dtype(dtype).name not in valid_dtypes:
+        raise ValueError('Invalid dtype: %s' % dtype)
+    _default_dtype = np.dtype(dtype).name
+
+
+def get_default_dtype():
+    """
+    returns the datatype used by default for the data of C{Data} objects
+    """
+    return _default_dtype
+
+
+# memory budget [bytes] for reductions of lazy data; None: no budget
+_memory_budget = None
+
+
+def set_memory_budget(nbytes):
+    """
+    set the memory budget which is used by default for reductions
+    over lazy data (e.g. timmean(), timstd(), get_climatology()).
+    The data is then processed in time chunks such that the chunks,
+    the temporary arrays and the accumulated results fit into the
+    budget.
+
+    Parameters
+    ----------
+    nbytes : int
+        memory budget [bytes]; None switches the budget off
+    """
+    global _memory_budget
+    if nbytes is not None and nbytes <= 0:
+        raise ValueError('Invalid memory budget: %s' % nbytes)
+    _memory_budget = nbytes
+
+
+def get_memory_budget():
+    """
+    returns the memory budget [bytes] used by default for reductions
+    over lazy data (None if not set)
+    """
+    return _memory_budget
+
+
+# attributes which are shared between a C{Data} object and its
+# copies with share=True (see Data.copy())
+shared_attributes = ['data', 'lat', 'lon', 'cell_area', 'time']
+
+# arrays which are stored in snapshot files besides the data (see Data.dump())
+snapshot_arrays = ['lat', 'lon', 'time', 'cell_area', 'std', 'n']
+
+
+def _readonly_view(x):
+    """
+    returns a read-only view of an array, which shares the memory
+    (also of the mask) with the input array
+    """
+    v = x.view()
+    if isinstance(v, np.ma.MaskedArray) and v._mask is not np.ma.nomask:
+        v._mask = v._mask.view()
+        v._mask.flags.writeable = False
+        v._sharedmask = True
+    v.flags.writeable = False
+    return v
+
+
+def _unshared_arithmetic(name):
+    """
+    returns a method of C{Data} which calls the arithmetic method
+    GeoData.<name>(x, copy=True). If the data is modified in place
+    (copy=False), shared data is duplicated before (see Data.copy())
+    """
+    def f(self, x, copy=True):
+        if not copy:
+            self._unshare('data')
+        return getattr(super(Data, self), name)(x, copy=copy)
+    f.__name__ = name
+    f.__doc__ = """ see GeoData.%s(); shared data is duplicated before """ % name
+    return f
 
 
 class Data(GeoData):
@@ -64,7 +174,9 @@ class Data(GeoData):
         ----------
         filename : str
             name of the file that contains the data
-            (specify None if not data from file)
+            (specify None if not data from file). A list of files or
+            a pattern with wildcards specifies a dataset which is
+            split into several files along the time axis (see read())
 
         varname : str
             name of the variable that contains the data
@@ -157,10 +269,86 @@ class Data(GeoData):
         geometry_file : str
             name of individual file with coordinates. This can be usefull in the case
             that no coordinate information is stored within the actual data files
+
+        lazy : bool
+            if True, the data is not read when the object is created, but
+            C{data} is a L{LazyArray} which reads only the parts of the file
+            which are actually accessed (e.g. by indexing, timmean(),
+            fldmean(), get_aoi() or temporal subsetting). Only netCDF
+            variables with geometry [time,ny,nx] (or 4D variables with a
+            given level) are supported; other data is read as usual.
+
+        bbox : tuple
+            bounding box (lonmin, lonmax, latmin, latmax) [deg]. If given,
+            only the data within this box is read from file. The box may
+            cross the 0/360 or the -180/180 longitude seam. Requires
+            lat/lon given as vectors in the file.
+
+        region : Region
+            region (RegionBboxLatLon or RegionIndex) which specifies the
+            area that is read from file (alternative to bbox). Other
+            regions (e.g. polygons) raise a ValueError. The indices of
+            a RegionIndex refer to the object as read (latitudes
+            N ... S), also for files with increasing latitudes
+
+        dtype : str
+            datatype of the data ['float32','float64']. If None, the
+            default set by set_default_dtype() is used. With 'float32'
+            the data is kept in single precision when reading, masking,
+            in arithmetic operations, climatologies and when saving.
+            Temporal means are accumulated in double precision.
+
+        memory_budget : int
+            memory budget [bytes] for reductions of lazy data
+            (fldmean(), timmean(), timstd(), get_climatology(), ...).
+            If None, the budget set by set_memory_budget() is used.
+
+        lon_convention : str
+            if given, the data is rotated after reading such that the
+            longitudes are ascending within [-180,180) ('180') or
+            [0,360) ('360'); see normalize_lon()
+
+        share_grid : bool
+            if True, the coordinates and the cell area are replaced after
+            reading by read-only views of the arrays of the shared
+            C{Grid} (see get_grid()), thus they are kept only once in
+            memory for all datasets on the same grid. They can then not
+            be modified in place anymore. By default the object keeps
+            own (writeable) coordinates.
+
+        time_window : tuple
+            (i1, i2) range of time indices [i1, i2) which is read from
+            file. This allows to process large files in chunks of
+            timesteps. Not supported for lazy reading and for datasets
+            split into several files.
         """
         self.lat = None
         self.lon = None
 
+        dtype = kwargs.pop('dtype', None)
+        if dtype is None:
+            dtype = _default_dtype
+        if np.dtype(dtype).name not in valid_dtypes:
+            raise ValueError('Invalid dtype: %s' % dtype)
+        self.dtype = np.dtype(dtype)
+
+        self.lazy = kwargs.pop('lazy', False)
+        self.memory_budget = kwargs.pop('memory_budget', None)
+        self.share_grid = kwargs.pop('share_grid', False)
+        self.time_window = kwargs.pop('time_window', None)
+        self.lon_convention = kwargs.pop('lon_convention', None)
+        if self.lon_convention not in [None, '180', '360']:
+            raise ValueError('Invalid longitude convention: %s' % self.lon_convention)
+        self.level = kwargs.pop('level', None)
+        self.bbox = kwargs.pop('bbox', None)
+        self._read_region = kwargs.pop('region', None)
+        if self.bbox is None and self._read_region is not None:
+            if hasattr(self._read_region, 'lonmin'):
+                self.bbox = (self._read_region.lonmin, self._read_region.lonmax,
+                             self._read_region.latmin, self._read_region.latmax)
+            elif not all([hasattr(self._read_region, k) for k in ['x1', 'x2', 'y1', 'y2']]):
+                raise ValueError('Region for reading needs to be a RegionBboxLatLon or RegionIndex: %s' % type(self._read_region).__name__)
+
         super(Data, self).__init__(filename, varname, **kwargs)
 
         self.detrended = False
@@ -171,7 +359,6 @@ class Data(GeoData):
         self._lon360 = True
 
 
-        self.level = kwargs.pop('level', None)
         self.gridtype = None
 
         # specifies if latitudes have been checked for increasing order
@@ -205,6 +392,1493 @@ class Data(GeoData):
 
 
 
+    def read(self, shift_lon, start_time=None, stop_time=None,
+             time_var='time', checklat=True):
+        """
+        Read data from a file. If the object was created with lazy=True,
+        then the data is not read, but provided as a L{LazyArray}
+
+        Parameters
+        ----------
+        shift_lon : bool
+            if given, longitudes will be shifted
+        start_time : datetime
+            start time for reading the data
+        stop_time : datetime
+            stop time for reading the data
+        time_var : str
+            name of time variable field
+        checklat : bool
+            check if latitude is in decreasing order (N ... S)
+
+        If the filename of the object is a list of files or a pattern
+        with wildcards (e.g. 'tas_Amon_MPI-ESM-LR_amip_r1i1p1_*.nc'),
+        the files are read as a single dataset which is split along
+        the time axis. Only the files with timesteps between
+        start_time and stop_time are read; their names are stored in
+        the attribute C{files}. If more than one file is read, the
+        data is not read lazily.
+        """
+        if self.time_window is not None and (self.lazy or is_file_pattern(self.filename)):
+            raise ValueError('time_window is not supported for lazy reading and several files')
+        if is_file_pattern(self.filename):
+            self._read_multifile(shift_lon, start_time=start_time,
+                                 stop_time=stop_time, time_var=time_var,
+                                 checklat=checklat)
+            return
+
+        # spatial subsetting when reading the data
+        self._read_xy_slices = None
+        if (self.bbox is not None) or (self._read_region is not None):
+            self._read_xy_slices = self._get_read_xy_slices(checklat=checklat)
+
+        if self.lazy:
+            if self._read_lazy(shift_lon, start_time=start_time,
+                               stop_time=stop_time, time_var=time_var,
+                               checklat=checklat):
+                self._set_grid()
+                if self.lon_convention is not None:
+                    self.normalize_lon(self.lon_convention)
+                return
+            # variable can not be handled lazily
+            self.lazy = False
+
+        # temporal subsetting is done already when reading the data.
+        # This is not possible if a climatology of the full dataset
+        # is needed (time_cycle given)
+        self._read_time_slice = None
+        if self.time_window is not None:
+            if (start_time is not None) or (stop_time is not None):
+                raise ValueError('Either time_window or start_time/stop_time can be given')
+            self._read_time_slice = slice(*self.time_window)
+        elif (start_time is not None) or (stop_time is not None):
+            if not hasattr(self, 'time_cycle'):
+                self._read_time_slice = self._get_read_time_slice(
+                    time_var, start_time, stop_time)
+        if self._read_time_slice is not None:
+            start_time = None
+            stop_time = None
+
+        super(Data, self).read(shift_lon, start_time=start_time,
+                               stop_time=stop_time, time_var=time_var,
+                               checklat=checklat)
+        self._set_grid()
+        if self.lon_convention is not None:
+            self.normalize_lon(self.lon_convention)
+
+    def _read_multifile(self, shift_lon, start_time=None, stop_time=None,
+                        time_var='time', checklat=True):
+        """
+        read a dataset which is split into several files along the
+        time axis (see read()). The time axes of all files are read
+        first; then only the files which have timesteps within
+        start_time ... stop_time are read. Files are sorted by time
+        and their timesteps may not overlap.
+        """
+        files = expand_filenames(self.filename)
+        if len(files) == 0:
+            raise ValueError('No files found for %s' % str(self.filename))
+
+        def _check_timezone(d):
+            if d is not None and d.tzinfo is None:
+                d = d.replace(tzinfo=pytz.UTC)
+            return d
+        start_time = _check_timezone(start_time)
+        stop_time = _check_timezone(stop_time)
+
+        # the full dataset is needed for a climatology (time_cycle)
+        full = hasattr(self, 'time_cycle')
+        config = dict([(k, v) for k, v in self.__dict__.iteritems()
+                       if k not in ['time_cycle', 'data', 'time']])
+
+        parts = []
+        for f in files:
+            x = Data(None, None)
+            x.__dict__.update(config)
+            x.filename = f
+            x.time, x.time_str, x.calendar = read_time_header(f, time_var=time_var)
+            if x.time is None or x.time_str is None or len(x.time) == 0:
+                raise ValueError('File without valid time axis: %s' % f)
+            x.set_time()
+            if not full:
+                t1 = -np.inf if start_time is None else x.date2num(start_time)
+                t2 = np.inf if stop_time is None else x.date2num(stop_time)
+                if not np.any((x.time >= t1) & (x.time <= t2)):
+                    continue
+            # files are sorted by the date of their first timestep
+            T = x.get_time_axis()
+            if T is None:
+                raise ValueError('Time axis can not be decoded: %s' % f)
+            i = np.argmin(x.time)
+            parts.append(((T.year[i], T.month[i], T.day[i], T.hour[i], T.minute[i],
+                           T.second[i], T.microsecond[i]), f, x))
+        if len(parts) == 0:
+            raise ValueError('No data within the requested period: %s' % str(self.filename))
+        parts.sort()
+        self.files = [p[1] for p in parts]
+
+        if len(parts) > 1:
+            print('Reading %i files of %s' % (len(parts), str(self.filename)))
+        ref = None
+        data = []
+        time = []
+        for tmin, f, x in parts:
+            if len(parts) > 1:
+                x.lazy = False  # LazyArrays of several files can not be combined
+            if full:
+                x.read(shift_lon, time_var=time_var, checklat=checklat)
+            else:
+                x.read(shift_lon, start_time=start_time, stop_time=stop_time,
+                       time_var=time_var, checklat=checklat)
+            if ref is None:
+                ref = x
+            elif np.shape(x.data)[-2:] != np.shape(ref.data)[-2:]:
+                raise ValueError('Files have different geometries: %s' % f)
+            t = x.time
+            if x.time_str != ref.time_str or x.calendar != ref.calendar:
+                if x.calendar != ref.calendar:
+                    raise ValueError('Files have different calendars: %s' % f)
+                T = x.get_time_axis()
+                t = timeaxis.date2num(T.year, T.month, T.day, T.hour, T.minute,
+                                      T.second + T.microsecond * 1.E-6,
+                                      time_str=ref.time_str, calendar=ref.calendar)
+            d = x.data
+            if x.data.ndim == 2:
+                d = x.data.reshape((1,) + x.data.shape)
+            data.append(d)
+            time.append(np.atleast_1d(t))
+
+        time = np.concatenate(time)
+        if np.any(np.diff(time) <= 0.):
+            raise ValueError('Files have overlapping time axes: %s' % str(self.filename))
+
+        filename, label, files = self.filename, self.label, self.files
+        time_cycle = getattr(self, 'time_cycle', None)
+        self.__dict__.update(ref.__dict__)
+        self.filename = filename
+        self.files = files
+        self.label = label if isinstance(label, basestring) else files[0]
+        if len(data) > 1:
+            self.data = np.ma.concatenate(data, axis=0)
+        self.time = time
+        self._set_grid()
+
+        if full:
+            self.time_cycle = time_cycle
+            self._climatology_raw = self.get_climatology()
+            m1, m2 = self._get_time_indices(start_time, stop_time)
+            self._temporal_subsetting(m1, m2)
+            if self.time_cycle is None:
+                self._set_timecycle()
+
+    def _set_grid(self):
+        """
+        if share_grid is set, replace the coordinates and the cell area
+        by read-only views of the arrays of the shared C{Grid} object
+        with the same geometry (see pycmbs.grid). Thus the coordinates
+        are kept only once in memory for all datasets on the same grid.
+        """
+        self._grid = None
+        self._grid_arrays = None
+        if not getattr(self, 'share_grid', False):
+            return
+        G = self.get_grid()
+        if G is None:
+            return
+        self._grid = G
+        self.lat = _readonly_view(G.lat)
+        self.lon = _readonly_view(G.lon)
+        if G.cell_area is not None:
+            self.cell_area = _readonly_view(G.cell_area)
+
+    def get_grid(self):
+        """
+        returns the C{Grid} object (see pycmbs.grid) describing the
+        geometry of the data, which holds cached area weights, unique
+        coordinates and latitude bands. Returns None if no valid
+        coordinates are available.
+
+        Unless the coordinates are shared with the grid (share_grid),
+        the grid is looked up by a hash of the coordinates, which is
+        only calculated again if coordinates were reassigned or
+        unshared for modification in place (see _unshare()). After
+        writing directly into the coordinate arrays, call _set_grid().
+        """
+        lat = getattr(self, 'lat', None)
+        lon = getattr(self, 'lon', None)
+        cell_area = getattr(self, 'cell_area', None)
+        if lat is None or lon is None or np.shape(lat) != np.shape(lon):
+            return None
+        if cell_area is not None and np.shape(cell_area) != np.shape(lat):
+            cell_area = None
+        G = getattr(self, '_grid', None)
+        if G is not None and G.is_grid_of(lat, lon, cell_area):
+            return G
+        arrays = getattr(self, '_grid_arrays', None)
+        if G is not None and arrays is not None and \
+                all(a is b for a, b in zip(arrays, [lat, lon, cell_area])):
+            return G
+        # coordinates were changed; keep the grid to reuse its caches
+        self._grid = get_grid(lat, lon, cell_area)
+        self._grid_arrays = (lat, lon, cell_area)
+        return self._grid
+
+    def _get_read_time_slice(self, time_var, start_time, stop_time):
+        """
+        decode the time axis of the file and determine the range of
+        time indices between start_time and stop_time
+
+        Returns
+        -------
+        slice of time indices or None if the time axis can not be
+        used for subsetting at read time
+        """
+        if time_var is None:
+            return None
+        if not os.path.exists(self.filename):
+            return None
+
+        File = NetCDFHandler()
+        File.open_file(self.filename, 'r')
+        keys = File.get_variable_keys()
+        if (time_var not in keys) or (self.varname not in keys):
+            File.close()
+            return None
+        tdims = File.get_dimensions(time_var)
+        vdims = File.get_dimensions(self.varname)
+        if len(tdims) != 1 or len(vdims) < 3 or vdims[0] != tdims[0]:
+            File.close()
+            return None
+        tvar = File.get_variable_handler(time_var)
+        if not hasattr(tvar, 'units'):
+            File.close()
+            return None
+        self.time_str = tvar.units
+        self.calendar = getattr(tvar, 'calendar', 'standard')
+        if self.calendar == 'climatology_bounds':
+            self.calendar = 'standard'
+        self.time = File.get_variable(time_var).flatten()
+        File.close()
+
+        self.set_time()
+        if np.any(np.diff(self.time) < 0.):
+            return None
+        m1, m2 = self._get_time_indices(start_time, stop_time)
+        return slice(m1, m2 + 1)
+
+    def _get_read_xy_slices(self, checklat=True):
+        """
+        translate the bounding box or region given for reading into
+        index ranges of the y and x dimensions of the file
+
+        The indices of a RegionIndex refer to the object after reading,
+        i.e. with checklat to latitudes in decreasing order (N ... S).
+        They are mapped to the rows of files with increasing latitudes.
+
+        Returns
+        -------
+        tuple (y_slice, x_slices) with x_slices a tuple of one or two
+        slices (the latter for boxes crossing the longitude seam)
+        """
+        if not os.path.exists(self.filename):
+            raise ValueError('Error: file not existing: %s' % self.filename)
+
+        if self.geometry_file is None:
+            filename = self.filename
+        else:
+            filename = self.geometry_file
+
+        File = NetCDFHandler()
+        File.open_file(filename, 'r')
+        keys = File.get_variable_keys()
+        lat_name = self.lat_name
+        lon_name = self.lon_name
+        if lat_name is None:
+            lat_name = ([k for k in ['lat', 'latitude'] if k in keys] + [None])[0]
+        if lon_name is None:
+            lon_name = ([k for k in ['lon', 'longitude'] if k in keys] + [None])[0]
+        if lat_name is None or lon_name is None:
+            File.close()
+            raise ValueError('Spatial subsetting requires lat/lon coordinates in file')
+        lat = File.get_variable(lat_name)
+        lon = File.get_variable(lon_name)
+        ydim = File.get_dimensions(lat_name)
+        xdim = File.get_dimensions(lon_name)
+        File.close()
+        if lat.ndim != 1 or lon.ndim != 1:
+            raise ValueError('Spatial subsetting at read time only supported for lat/lon vectors')
+        self._read_xy_dims = (ydim[0], xdim[0])
+        self._read_shape = (len(lat), len(lon))
+
+        # region given by indices
+        if self.bbox is None:
+            R = self._read_region
+            y_slice = slice(R.y1, R.y2)
+            if checklat and len(lat) > 1 and np.all(np.diff(lat) > 0.):
+                # rows are flipped after reading
+                iy = np.arange(len(lat))[::-1][y_slice]
+                if len(iy) == 0:
+                    raise ValueError('No latitudes within region!')
+                y_slice = slice(iy.min(), iy.max() + 1)
+            return y_slice, (slice(R.x1, R.x2),)
+
+        lonmin, lonmax, latmin, latmax = self.bbox
+        if latmax < latmin:
+            raise ValueError('Invalid bbox: latmax < latmin')
+
+        # latitudes
+        iy = np.nonzero((lat >= latmin) & (lat <= latmax))[0]
+        if len(iy) == 0:
+            raise ValueError('No latitudes within bounding box!')
+        y_slice = slice(iy.min(), iy.max() + 1)
+
+        # longitudes; all in [0 ... 360] to handle the seam
+        if lonmax - lonmin >= 360.:
+            return y_slice, (slice(None),)
+        if np.any(np.diff(lon) <= 0.):
+            raise ValueError('Spatial subsetting requires increasing longitudes')
+        l = np.mod(lon, 360.)
+        lo = np.mod(lonmin, 360.)
+        hi = np.mod(lonmax, 360.)
+        if lo <= hi:
+            sel = (l >= lo) & (l <= hi)
+        else:
+            sel = (l >= lo) | (l <= hi)
+        if not np.any(sel):
+            raise ValueError('No longitudes within bounding box!')
+
+        # runs of consecutive valid longitudes in file order
+        d = np.diff(np.concatenate([[0], sel.astype('int'), [0]]))
+        run_start = np.nonzero(d == 1)[0]
+        run_stop = np.nonzero(d == -1)[0]
+        nx = len(lon)
+        if len(run_start) == 1:
+            return y_slice, (slice(run_start[0], run_stop[0]),)
+        elif len(run_start) == 2 and run_start[0] == 0 and run_stop[1] == nx:
+            # box crosses the seam of the file
+            return y_slice, (slice(run_start[1], nx), slice(0, run_stop[0]))
+        else:
+            raise ValueError('Longitudes of bounding box are not contiguous on file')
+
+    def _get_read_xy_index(self):
+        """
+        index vectors in y and x direction of the spatial subset
+        """
+        y_slice, x_slices = self._read_xy_slices
+        iy = np.arange(self._read_shape[0])[y_slice]
+        ix = np.concatenate([np.arange(self._read_shape[1])[xs] for xs in x_slices])
+        return iy, ix
+
+    def _subset_xy(self, x):
+        """
+        extract the spatial subset from an array with the full
+        geometry of the file [...,ny,nx]
+        """
+        iy, ix = self._get_read_xy_index()
+        return x[..., iy, :][..., ix]
+
+    def _read_coordinates(self, shift_lon, netcdf_backend=None):
+        """
+        read coordinates from file (see GeoData._read_coordinates())
+        and extract the spatial subset if a bbox or region was given
+        for reading
+        """
+        super(Data, self)._read_coordinates(shift_lon,
+                                            netcdf_backend=netcdf_backend)
+        if getattr(self, '_read_xy_slices', None) is None:
+            return
+        iy, ix = self._get_read_xy_index()
+        self.lat = self.lat[iy]
+        self.lon = self.lon[ix]
+        if self.cell_area is not None:
+            if self.cell_area.shape == self._read_shape:
+                self.cell_area = self._subset_xy(self.cell_area)
+
+    def _set_cell_area(self):
+        """
+        set cell area size. For data which was read for a spatial subset,
+        the cell area is estimated for the full grid and then subsetted
+        """
+        if getattr(self, '_read_xy_slices', None) is None or self.cell_area is not None:
+            return super(Data, self)._set_cell_area()
+        data = self.data
+        self.data = np.ma.array(np.zeros(self._read_shape))
+        try:
+            super(Data, self)._set_cell_area()
+        finally:
+            self.data = data
+        self.cell_area = self._subset_xy(self.cell_area)
+
+    def _get_time_indices(self, start, stop):
+        """
+        determine time indices start/stop based on data timestamps
+        and desired start/stop dates. For increasing time axes,
+        the indices are determined by binary search
+
+        Parameters
+        ----------
+        start : datetime
+            start time
+        stop : datetime
+            stop time
+
+        Returns
+        -------
+        returns start/stop indices (int)
+        """
+
+        def _check_timezone(d):
+            # if no timezone, then set it
+            if d.tzinfo is None:
+                return datetime.datetime(d.year, d.month, d.day, d.hour,
+                                         d.minute, d.second, d.microsecond,
+                                         pytz.UTC)
+            else:
+                return d
+
+        if start is None and stop is None:
+            return 0, len(self.time) - 1
+        if np.any(np.diff(self.time) < 0.):
+            return super(Data, self)._get_time_indices(start, stop)
+
+        if start is None:
+            m1 = 0
+        else:
+            assert (isinstance(start, datetime.datetime))
+            start = _check_timezone(start)
+            m1 = np.searchsorted(self.time, self.date2num(start), side='left')
+        if stop is None:
+            m2 = len(self.time) - 1
+        else:
+            assert (isinstance(stop, datetime.datetime))
+            stop = _check_timezone(stop)
+            m2 = np.searchsorted(self.time, self.date2num(stop), side='right') - 1
+        if (start is not None) and (stop is not None):
+            if stop < start:
+                raise ValueError('Error: startdate > stopdate')
+        if m2 < m1:
+            print self.time
+            raise ValueError('Something went wrong _get_time_indices')
+        return int(m1), int(m2)
+
+    def read_netcdf(self, varname, netcdf_backend='netCDF4', filename=None):
+        """
+        read data from netCDF file (see GeoData.read_netcdf()). Only
+        the hyperslab given by _get_variable_slice() is read: the time
+        window determined when reading the data, the selected level of
+        4D variables and the spatial subset.
+
+        varname : str
+            name of variable to be read
+        filename : str
+            specifies the name of the file to read. If this is not provided, then
+            self.filename is used
+        """
+        if filename is None:
+            filename = self.filename
+
+        File = NetCDFHandler(netcdf_backend=netcdf_backend)
+        File.open_file(filename, 'r')
+        try:
+            print('Reading file %s' % filename)
+            if varname not in File.get_variable_keys():
+                self._log_warning(
+                    'WARNING: data can not be read. Variable not existing! ' + varname)
+                return None
+            kwargs = self._get_variable_slice(File, varname)
+            try:
+                data = File.get_variable(varname, **kwargs)
+            except:
+                print('ERROR when reading variable %s' % varname)
+                return None
+            self._read_variable_attributes(File, varname)
+        finally:
+            File.close()
+        return self._mask_and_scale(data)
+
+    def _get_variable_slice(self, File, varname):
+        """
+        arguments of NetCDFHandler.get_variable() to read the part of
+        a variable needed: the time window (_read_time_slice) for
+        variables with a time dimension, the level of 4D variables,
+        the spatial subset (_read_xy_slices) and the datatype. Only the
+        data variable itself is read with the precision of the object;
+        coordinates and time are always double precision.
+        """
+        var = File.get_variable_handler(varname)
+        time_slice = getattr(self, '_read_time_slice', None)
+        if time_slice is not None:
+            if (self.time_var not in File.get_variable_keys() or len(var.dimensions) == 0 or
+                    var.dimensions[0] != File.get_dimensions(self.time_var)[0]):
+                time_slice = None
+        level = None
+        if len(var.shape) > 3:
+            if self.level is None:
+                raise ValueError(
+                    '4-dimensional variables not supported yet! Either remove a dimension or specify a level!')
+            # [time,level,ny,nx ] --> [time,ny,nx]
+            level = self.level
+        y_slice = None
+        x_slice = None
+        if getattr(self, '_read_xy_slices', None) is not None:
+            if tuple(var.dimensions[-2:]) == self._read_xy_dims:
+                y_slice, x_slice = self._read_xy_slices
+        if varname == self.varname:
+            dtype = self.dtype
+        else:
+            dtype = 'float'
+        return {'time_slice': time_slice, 'level': level, 'y_slice': y_slice,
+                'x_slice': x_slice, 'dtype': dtype}
+
+    def _read_variable_attributes(self, File, varname):
+        """
+        read the attributes of a variable (fill value, packing, long
+        name, unit), the units and calendar of the time variable and
+        the cell area, if given in the file and not set before (as
+        in GeoData.read_netcdf())
+        """
+        keys = File.get_variable_keys()
+        self.fill_value = File._get_fill_value(varname)
+        self._scale_factor_netcdf = File._get_scale_factor(varname) * 1.
+        self._add_offset_netcdf = File._get_add_offset(varname) * 1.
+        File._get_long_name(varname)
+        self.long_name = File.long_name
+        if 'cell_area' in keys and self.cell_area is None:
+            self.cell_area = File.get_variable('cell_area')
+        # units given by the user are kept
+        if self.unit is None:
+            self.unit = File._get_unit(varname)
+
+        if self.time_var in keys:
+            tvar = File.get_variable_handler(self.time_var)
+            self.time_str = getattr(tvar, 'units', None)
+            if hasattr(tvar, 'calendar'):
+                self.calendar = tvar.calendar
+                # when climatology means, reset calendar to standard
+                if self.calendar == 'climatology_bounds':
+                    self.calendar = 'standard'
+            else:
+                print 'WARNING: no calendar specified!'
+                self.calendar = 'standard'
+        else:
+            self.time = None
+            self.time_str = None
+
+    def _mask_and_scale(self, data):
+        """
+        mask the fill values of data read from file and apply the
+        packing of the variable (see _read_variable_attributes())
+        """
+        # in case of vector data, generate a dummy dimension
+        if data.ndim == 1:
+            data = data.reshape((1, len(data)))
+
+        # the mask has always the same geometry as the data
+        if self.fill_value is not None:
+            msk = data == self.fill_value
+            # set to nan, as otherwise problems with masked and scaled data
+            data[msk] = np.nan
+            data = np.ma.array(data, mask=np.isnan(data))
+        else:
+            data = np.ma.array(data, mask=np.zeros(data.shape).astype('bool'))
+            self.fill_value = -99999.
+
+        data *= self._scale_factor_netcdf
+        data += self._add_offset_netcdf
+        return data
+
+    def _read_lazy(self, shift_lon, start_time=None, stop_time=None,
+                   time_var='time', checklat=True):
+        """
+        read metadata, coordinates and time and set C{data} as a
+        L{LazyArray}. The steps are the same as in read()
+
+        Returns
+        -------
+        False if the variable can not be handled lazily; nothing
+        has been done then
+        """
+        if not os.path.exists(self.filename):
+            raise ValueError('Error: file not existing: %s' % self.filename)
+        netcdf_backend = 'netCDF4'
+
+        File = NetCDFHandler(netcdf_backend=netcdf_backend)
+        File.open_file(self.filename, 'r')
+        if self.varname not in File.get_variable_keys():
+            File.close()
+            raise ValueError(
+                'The data variable %s in the file %s is not existing. This must not happen!' % (self.varname, self.filename))
+        ndim = len(File.get_variable_handler(self.varname).shape)
+        if self.squeeze or not ((ndim == 3) or (ndim == 4 and self.level is not None)):
+            File.close()
+            return False
+
+        self.time_var = time_var
+        print('Reading file %s (lazy)' % self.filename)
+
+        self.time = None
+        self._read_variable_attributes(File, self.varname)
+        if self.time_var in File.get_variable_keys():
+            self.time = File.get_variable(self.time_var).flatten()
+        File.close()
+
+        valid_mask = None
+        if self.inmask is not None:
+            valid_mask = np.asarray(self.inmask).astype('bool')
+            if self._read_xy_slices is not None:
+                # mask is given for the spatial subset
+                iy, ix = self._get_read_xy_index()
+                tmp = np.ones(self._read_shape).astype('bool')
+                tmp[np.ix_(iy, ix)] = valid_mask
+                valid_mask = tmp
+        self.data = LazyArray(self.filename, self.varname, level=self.level,
+                              fill_value=self.fill_value,
+                              scale_factor=self.scale_factor,
+                              valid_mask=valid_mask,
+                              dtype=self.dtype,
+                              netcdf_backend=netcdf_backend)
+        if self._read_xy_slices is not None:
+            iy, ix = self._get_read_xy_index()
+            self.data = self.data.window((slice(None), iy, ix))
+        if self.fill_value is None:
+            self.fill_value = -99999.
+
+        # read lat/lon
+        self._read_coordinates(shift_lon, netcdf_backend=netcdf_backend)
+
+        if self.time is not None:
+            self.set_time()
+
+        # lat lon to 2D matrix
+        try:
+            self._mesh_lat_lon()
+        except:
+            print '        WARNING: No lat/lon mesh was generated!'
+
+        #  check if latitude in decreasing order (N ... S)?
+        if checklat:
+            if self.lat is not None:
+                # increasing order!
+                if np.all(np.diff(self.lat[:, 0]) > 0.):
+                    self._flipud()
+                    self._latitudecheckok = True
+                # decreasing order!
+                elif np.all(np.diff(self.lat[:, 0]) < 0.):
+                    self._latitudecheckok = True
+                else:
+                    print 'WARNING: latitudes not in systematic order! Might cause trouble with zonal statistics!'
+                    self._latitudecheckok = False
+
+        self._set_cell_area()
+
+        # calculate climatology from ORIGINAL (full dataset)
+        if hasattr(self, 'time_cycle') and self.time is not None:
+            self._climatology_raw = self.get_climatology()
+
+        # perform temporal subsetting; this only narrows the window
+        # of the LazyArray
+        if self.time is not None:
+            m1, m2 = self._get_time_indices(start_time, stop_time)
+            self._temporal_subsetting(m1, m2)
+
+        # calculate time_cycle automatically if not set already.
+        if self.time is not None:
+            if getattr(self, 'time_cycle', None) is None:
+                self._set_timecycle()
+        return True
+
+    def _is_lazy(self):
+        return isinstance(self.data, LazyArray)
+
+    def _is_packed(self):
+        return isinstance(self.data, PackedArray)
+
+    def pack(self, valid=None):
+        """
+        convert the data into packed storage (L{PackedArray}) which
+        keeps only the valid grid cells as [time,ncells]. This saves
+        memory and computing time for data which is valid only on a
+        part of the grid, e.g. land only data. Cells which are not
+        valid are masked. Datasets with the same valid cells share
+        the packing index.
+
+        Parameters
+        ----------
+        valid : ndarray (bool) or str
+            cells [ny,nx] which are stored. If None, all cells with
+            at least one valid value are used.
+        """
+        if self._is_lazy():
+            self.data = self.data.load()
+        if self._is_packed():
+            self.unpack()
+        if self.data.ndim not in [2, 3]:
+            raise ValueError('Packing is only supported for 2D or 3D data!')
+        if valid is None:
+            m = np.ma.getmaskarray(self.data)
+            valid = ~np.all(m.reshape((-1,) + m.shape[-2:]), axis=0)
+        P = get_packing_index(valid)
+        if P.shape != self.data.shape[-2:]:
+            raise ValueError('Mask has inconsistent geometry!')
+        self.data = PackedArray(P.pack(self.data).copy(), P)
+
+    def unpack(self):
+        """
+        expand packed data to the full grid
+        """
+        if self._is_packed():
+            self.data = self.data.load()
+
+    def _iter_cell_chunks(self):
+        """
+        iterate over the data in portions of timesteps; the grid
+        cells are flattened (lazy data) or only the stored cells are
+        used (packed data)
+
+        Returns
+        -------
+        generator of (i1, i2, data [i2-i1,ncells], cell_area [ncells])
+        """
+        if self._is_packed():
+            x = self.data.values
+            yield 0, len(x), x, self.data.index.pack(self.cell_area)
+        else:
+            ca = None if self.cell_area is None else self.cell_area.reshape(-1)
+            for i1, i2, x in self._iter_time_chunks():
+                yield i1, i2, x.reshape(i2 - i1, -1), ca
+
+    def _iter_time_chunks(self, nfields=0):
+        """
+        iterate over lazy data in time chunks. If a memory budget is
+        set (see memory_budget, set_memory_budget()), the chunks are
+        read with a private cache and their size is chosen such that
+        the chunks, the temporary arrays and the fields accumulated
+        by the caller fit into the budget.
+
+        Parameters
+        ----------
+        nfields : int
+            number of [ny,nx] double precision fields which are
+            accumulated by the caller
+
+        Returns
+        -------
+        generator of (i1, i2, data) with data = self.data[i1:i2]
+        """
+        budget = self.memory_budget
+        if budget is None:
+            budget = get_memory_budget()
+        if budget is None:
+            return self.data.iter_chunks()
+        ncells = int(np.prod(self.data.shape[1:]))
+        # per timestep: cached chunk and result (data + mask) and two
+        # double precision temporaries
+        step = ncells * 2 * (self.data.dtype.itemsize + 1) + ncells * 16
+        n = (budget - nfields * ncells * 8) // step
+        if n < 1:
+            raise ValueError('Memory budget of %i bytes is too small for this data!' % budget)
+        return self.data.iter_chunks(chunksize=int(n),
+                                     cache=ChunkCache(maxbytes=int(n) * ncells * (self.data.dtype.itemsize + 1)))
+
+    def _flipud(self):
+        """
+        flip dataset up down
+        """
+        if not self._is_lazy():
+            return super(Data, self)._flipud()
+        self.data = self.data.window((slice(None), slice(None, None, -1)))
+        if getattr(self, 'cell_area', None) is not None:
+            self.cell_area = self.cell_area[::-1, :]
+        if getattr(self, 'lat', None) is not None:
+            self.lat = self.lat[::-1, :]
+
+    def _apply_mask(self, msk1, keep_mask=True):
+        """
+        apply a mask to C{Data}. All data where mask==True
+        will be masked. Lazy data is read completely before,
+        shared data is duplicated before. Packed data stays packed
+        for 2D masks.
+        """
+        if self._is_lazy():
+            self.data = self.data.load()
+        if self._is_packed():
+            P = self.data.index
+            if keep_mask and not isinstance(msk1, GeoData) and np.shape(msk1) == P.shape:
+                v = self.data.values
+                keep = P.pack(np.asarray(msk1, dtype='bool'))
+                self.data = PackedArray(np.ma.array(v.data, mask=np.ma.getmaskarray(v) | ~keep), P)
+                return
+            self.unpack()
+        self._unshare('data')
+        dtype = self.data.dtype
+        super(Data, self)._apply_mask(msk1, keep_mask=keep_mask)
+        # 2D data is converted to double precision when masking
+        if self.data.dtype != dtype:
+            self.data = self.data.astype(dtype)
+
+    def timmean(self, return_object=True):
+        """
+        calculate temporal mean of data field. For lazy data,
+        the mean is accumulated chunk by chunk; packed data stays
+        packed. The sums are always accumulated in double precision;
+        the result has the datatype of the data
+
+        Parameters
+        ----------
+        return_object : bool
+            specifies if a C{Data} object shall be returned [True]; else a numpy array is returned
+        """
+        if self._is_lazy():
+            s = np.zeros(self.data.shape[1:])
+            n = np.zeros(self.data.shape[1:])
+            for i1, i2, x in self._iter_time_chunks(2):
+                s += x.sum(axis=0, dtype='float64').filled(0.)
+                n += x.count(axis=0)
+            res = np.ma.array(s / np.maximum(n, 1.), mask=n == 0)
+        elif self._is_packed():
+            v = self.data.values
+            if v.ndim == 2:
+                v = v.mean(axis=0, dtype='float64')
+            res = PackedArray(v.astype(self.data.dtype), self.data.index)
+        elif self.data.ndim == 3:
+            res = self.data.mean(axis=0, dtype='float64')
+        else:
+            return super(Data, self).timmean(return_object=return_object)
+        if not self._is_packed():
+            res = res.astype(self.data.dtype)
+
+        if return_object:
+            tmp = self._copy_result()
+            tmp.data = res
+            if hasattr(tmp, 'time'):
+                del tmp.time
+            return tmp
+        elif self._is_packed():
+            return res.load()
+        else:
+            return res
+
+    def _get_time_moments(self):
+        """
+        number of valid values, mean and sum of squared deviations
+        from the mean for each grid cell of lazy data. The moments of
+        the chunks are merged (Chan et al., 1979), which is
+        numerically stable in a single pass over the data.
+
+        Returns
+        -------
+        n, mean, m2 : ndarray
+            [ny,nx] double precision fields
+        """
+        shp = self.data.shape[1:]
+        n = np.zeros(shp)
+        mean = np.zeros(shp)
+        m2 = np.zeros(shp)
+        for i1, i2, x in self._iter_time_chunks(5):
+            nc = x.count(axis=0).astype('float')
+            mc = x.mean(axis=0, dtype='float64').filled(0.)
+            m2c = ((x - mc) ** 2).sum(axis=0, dtype='float64').filled(0.)
+            tot = n + nc
+            f = nc / np.maximum(tot, 1.)
+            delta = mc - mean
+            mean += delta * f
+            m2 += m2c + delta ** 2 * n * f
+            n = tot
+        return n, mean, m2
+
+    def _get_timvar(self, std, return_object):
+        n, mean, m2 = self._get_time_moments()
+        res = np.ma.array(m2 / np.maximum(n, 1.), mask=n == 0)
+        if std:
+            res = np.ma.sqrt(res)
+        res = res.astype(self.data.dtype)
+        if return_object:
+            tmp = self._copy_result()
+            tmp.data = res
+            if hasattr(tmp, 'time'):
+                del tmp.time
+            return tmp
+        else:
+            return res
+
+    def timvar(self, return_object=True):
+        """
+        calculate temporal variance of data field. For lazy data,
+        the variance is accumulated chunk by chunk in double
+        precision
+
+        Parameters
+        ----------
+        return_object : bool
+            specifies if a C{Data} object shall be returned [True];
+            else a numpy array is returned
+        """
+        if not (self._is_lazy() and self.data.ndim == 3):
+            return super(Data, self).timvar(return_object=return_object)
+        return self._get_timvar(False, return_object)
+
+    def timstd(self, return_object=True):
+        """
+        calculate temporal standard deviation of data field. For lazy
+        data, the variance is accumulated chunk by chunk in double
+        precision
+
+        Parameters
+        ----------
+        return_object : bool
+            specifies if a C{Data} object shall be returned [True];
+            else a numpy array is returned
+        """
+        if not (self._is_lazy() and self.data.ndim == 3):
+            return super(Data, self).timstd(return_object=return_object)
+        return self._get_timvar(True, return_object)
+
+    def fldmean(self, return_data=True, apply_weights=True):
+        """
+        calculate mean of the spatial field for each time using weighted
+        averaging. For lazy data, the field means are calculated chunk
+        by chunk; for packed data only the stored cells are used
+
+        Parameters
+        ----------
+        return_data : bool
+            if True, then a C{Data} object is returned
+        apply_weights : bool
+            apply weights when calculating area weights
+        """
+        packed = (self._is_packed() and self.data.ndim == 3 and
+                  (self.cell_area is not None or not apply_weights))
+        if self._is_packed() and not packed:
+            tmp = self.copy(share=True)
+            tmp.unpack()
+            return tmp.fldmean(return_data=return_data, apply_weights=apply_weights)
+        if not (self._is_lazy() or packed):
+            return super(Data, self).fldmean(return_data=return_data,
+                                             apply_weights=apply_weights)
+        if self.weighting_type not in ['valid', 'all']:
+            raise ValueError('Invalid option for normtype: %s' % self.weighting_type)
+
+        nt = len(self.data)
+        num = np.zeros(nt)
+        den = np.zeros(nt)
+        cnt = np.zeros(nt)
+        for i1, i2, x, ca in self._iter_cell_chunks():
+            m = np.ma.getmaskarray(x)
+            cnt[i1:i2] = (~m).sum(axis=1)
+            if apply_weights:
+                w = np.where(m, 0., ca[np.newaxis, :])
+            else:
+                w = (~m).astype('float')
+            num[i1:i2] = (w * x.filled(0.)).sum(axis=1)
+            den[i1:i2] = w.sum(axis=1)
+
+        if apply_weights:
+            if self.weighting_type == 'all':
+                den[:] = self.cell_area.sum()
+            self.totalarea = den * 1.
+        msk = (cnt == 0) | (den == 0.)
+        tmp = np.ma.array(num / np.where(msk, 1., den), mask=msk)
+
+        if return_data:
+            r = self._copy_result()
+            r.data = np.ma.array(tmp.data.reshape((nt, 1, 1)),
+                                 mask=msk.reshape((nt, 1, 1)))
+            r.cell_area = np.array([1.])
+            return r
+        else:
+            return tmp
+
+    def _get_weighting_matrix(self):
+        """
+        get matrix for area weighting of grid cells. For each timestep
+        the weights are calculated as a function of either the  number
+        of valid grid cells or all grid cells. Which one of the two
+        approaches is used depends on self.weighting_type
+        The returned array contains weights for each timestep. The sum
+        of these weights is equal to one for each timestep.
+
+        The normalized weights are cached by the C{Grid} of the data
+        for the most recently used masks, thus they are calculated only
+        once e.g. for all datasets with the same land/sea mask.
+
+        Returns
+        -------
+        w : ndarray
+            weighting matrix in same geometry as original data
+        """
+        if self.weighting_type not in ['valid', 'all']:
+            raise ValueError('Invalid option for normtype: %s' % self.weighting_type)
+        G = None
+        if self.cell_area is not None and not self._is_lazy() and self.data.ndim in [2, 3]:
+            G = self.get_grid()
+        if G is None or G.cell_area is None or G.shape != self.data.shape[-2:]:
+            return super(Data, self)._get_weighting_matrix()
+
+        ca = np.ma.getdata(G.cell_area)
+        if self.weighting_type == 'all':
+            # normalization by total area. This does NOT result in
+            # sum(w) == 1 for each timestep!
+            self.totalarea = G.get_total_area()
+            w = np.ones(self.data.shape) * (ca / self.totalarea)
+            return np.ma.array(w, mask=w != w)
+        if self._is_packed():
+            return self.data.index.unpack(self._get_packed_weights())
+
+        mask = np.ma.getmaskarray(self.data)
+        if self.data.ndim == 2:
+            w, self.totalarea = G.get_weights(mask)
+            return w.copy()
+        if np.all(mask == mask[0]):
+            # same mask for all timesteps
+            w2, total = G.get_weights(mask[0])
+            self.totalarea = np.ones(len(mask)) * total
+            w = np.ones(self.data.shape) * w2.data
+        else:
+            no = np.where(mask, 0., ca).reshape(len(mask), -1).sum(axis=1)
+            self.totalarea = no * 1.
+            with np.errstate(divide='ignore', invalid='ignore'):
+                w = ca[np.newaxis, :, :] / no[:, np.newaxis, np.newaxis]
+        # the mask of the data is not shared, as fldmean() reshapes w
+        return np.ma.array(w, mask=mask.copy())
+
+    def _get_packed_weights(self):
+        """
+        area weights of the stored cells of packed data; see
+        _get_weighting_matrix()
+
+        Returns
+        -------
+        w : masked array
+            weights [time,ncells] or [ncells]
+        """
+        if not self._is_packed():
+            raise ValueError('Data is not packed!')
+        if self.cell_area is None:
+            raise ValueError('Weights can not be calculated without cell_area!')
+        if self.weighting_type not in ['valid', 'all']:
+            raise ValueError('Invalid option for normtype: %s' % self.weighting_type)
+        v = self.data.values
+        ca = self.data.index.pack(np.ma.getdata(self.cell_area)) * np.ones(v.shape)
+        if self.weighting_type == 'all':
+            self.totalarea = np.ma.getdata(self.cell_area).sum()
+            return np.ma.array(ca / self.totalarea, mask=np.zeros(v.shape, dtype='bool'))
+        mask = np.ma.getmaskarray(v)
+        no = np.where(mask, 0., ca).sum(axis=-1)
+        self.totalarea = no * 1.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = ca / np.expand_dims(no, -1)
+        return np.ma.array(w, mask=mask)
+
+    def get_zonal_mean(self, return_object=True, resolution=None):
+        """
+        calculate zonal mean statistics of the data for each timestep
+        returns zonal statistics [time,ny]
+
+        uses area weighting of data
+        gives exact same results as function 'zonmean' in cdo's
+
+        Parameters
+        ----------
+        return_object : bool
+            if True, then returns a Data object
+        resolution : float
+            if None, each row of the data is a latitude band. Otherwise
+            the grid cells are assigned to latitude bands of the given
+            width [deg], which is needed for irregular grids
+            (see Grid.get_zonal_bands())
+
+        Returns
+        -------
+        r : ndarray, Data
+            array with zonal statistics
+        """
+        if self._is_lazy() or self.data.ndim not in [2, 3]:
+            return super(Data, self).get_zonal_mean(return_object=return_object)
+
+        if self.cell_area is None:
+            self._log_warning(
+                'WARNING: no cell area given, zonal means are based on equal weighting!')
+            w = np.ones(self.data.shape)
+        else:
+            w = self._get_weighting_matrix()
+        # weight data
+        dat = self.data * w
+
+        if resolution is None:
+            lat = self.lat[:, 0]
+            r = dat.sum(axis=-1)
+            W = np.ma.array(w).sum(axis=-1)
+            msk = np.ma.getmaskarray(r)
+        else:
+            G = self.get_grid()
+            if G is None or G.shape != self.data.shape[-2:]:
+                raise ValueError('Zonal bands require consistent coordinates!')
+            lat, idx = G.get_zonal_bands(resolution)
+            nb = len(lat)
+            x = dat.reshape((-1, idx.size))
+            nt = len(x)
+            # band index for each timestep and grid cell
+            k = (idx.reshape((1, -1)) + nb * np.arange(nt).reshape((-1, 1))).flatten()
+            r = np.bincount(k, weights=x.filled(0.).flatten(), minlength=nb * nt)
+            W = np.bincount(k, weights=np.ma.array(w).filled(0.).flatten(), minlength=nb * nt)
+            n = np.bincount(k, weights=~np.ma.getmaskarray(x).flatten(), minlength=nb * nt)
+            r = r.reshape((nt, nb))
+            W = W.reshape((nt, nb))
+            msk = n.reshape((nt, nb)) == 0
+            if self.data.ndim == 2:
+                r = r[0]
+                W = W[0]
+                msk = msk[0]
+        W = np.ma.filled(W, 0.)
+        r = np.ma.array(np.ma.getdata(r) / np.where(W == 0., 1., W), mask=msk | (W == 0.))
+
+        if return_object:
+            res = self._copy_result()
+            res.label = self.label + ' zonal mean'
+            res.data = r.T  # [lat,time]
+            res.lat = lat  # latitudes as a vector
+            return res
+        else:
+            return r
+
+    def _get_unique_lon(self):
+        """
+        estimate if the Data contains unique longitudes and if so,
+        returns a vector with these longitudes
+
+        Returns
+        -------
+        lon : ndarray
+            unique longitudes
+        """
+        G = self.get_grid()
+        if G is None:
+            return super(Data, self)._get_unique_lon()
+        lon = G.get_unique_lon()
+        if lon is None:
+            raise ValueError('The dataset does not contain unique LONGITUDES!')
+        return lon
+
+    def get_climatology(self, return_object=False, nmin=1, ensure_start_first=True):
+        """
+        calculate climatological mean for a time increment
+        specified by self.time_cycle. The climatology is calculated
+        in double precision and returned with the datatype of the data.
+        For lazy data, the climatology is accumulated chunk by chunk.
+
+        Parameters
+        ----------
+        return_object : bool
+            specifies if a Data object shall be returned
+        nmin : int
+            specifies the minimum number of datasets used for
+            climatology; else the result is masked
+        ensure_start_first : bool
+            ensure that the timeseries of the resulting climatology
+            always starts with the first date
+        """
+        dtype = self.data.dtype
+        if self._is_lazy() and self.data.ndim == 3:
+            if not hasattr(self, 'time_cycle'):
+                raise ValueError('Climatology can not be calculated without a valid time_cycle')
+            r = self._copy_result()
+            r.label += ' - climatology'
+            r.data = self._get_lazy_climatology(nmin=nmin).astype(dtype)
+            r.time = np.asarray(self.time[0:len(r.data)]).copy()
+            if len(r.time) != len(r.data):
+                raise ValueError('Data and time are inconsistent in get_climatology()')
+            r.adjust_time(year=1200)  # set some arbitrary time
+            if ensure_start_first:
+                r._shift_time_start_firstdate()
+            return r if return_object else r.data
+
+        r = super(Data, self).get_climatology(return_object=return_object,
+                                              nmin=nmin,
+                                              ensure_start_first=ensure_start_first)
+        if return_object:
+            r.data = r.data.astype(dtype)
+        else:
+            r = r.astype(dtype)
+        return r
+
+    def _get_lazy_climatology(self, nmin=1):
+        """
+        climatological mean of lazy data for each phase of the time
+        cycle; accumulated chunk by chunk in double precision. The
+        climatology starts with the phase of the first timestep.
+
+        Returns
+        -------
+        masked array [time_cycle,ny,nx]
+        """
+        tc = int(self.time_cycle)
+        shp = (tc,) + self.data.shape[1:]
+        s = np.zeros(shp)
+        n = np.zeros(shp)
+        for i1, i2, x in self._iter_time_chunks(2 * tc):
+            phase = np.arange(i1, i2) % tc
+            for k in np.unique(phase):
+                xk = x[phase == k]
+                s[k] += xk.sum(axis=0, dtype='float64').filled(0.)
+                n[k] += xk.count(axis=0)
+        return np.ma.array(s / np.maximum(n, 1.), mask=(n < nmin) | (n == 0))
+
+    def get_deseasonalized_anomaly(self, base=None, ensure_start_first=True):
+        """
+        see GeoData.get_deseasonalized_anomaly(). For lazy data, the
+        climatology is accumulated chunk by chunk and the anomalies
+        are returned as lazy data from which the climatology is
+        subtracted when it is read; ensure_start_first is not needed
+        then, as the climatology is aligned with the first timestep.
+        """
+        if not (self._is_lazy() and self.data.ndim == 3):
+            return super(Data, self).get_deseasonalized_anomaly(base=base,
+                                                                ensure_start_first=ensure_start_first)
+        if base not in ['current', 'all']:
+            raise ValueError('Anomalies can not be calculated, invalid BASE')
+        if not hasattr(self, 'time_cycle'):
+            raise ValueError('Anomalies can not be calculated without a valid time_cycle')
+        if base == 'all' and hasattr(self, '_climatology_raw'):
+            clim = self._climatology_raw
+        else:
+            clim = self._get_lazy_climatology()
+            if base == 'all':
+                self._climatology_raw = clim
+        res = self._copy_result()
+        res.data = self.data.subtract_cycle(clim)
+        res.label = self.label + ' anomaly'
+        return res
+
+    def save(self, filename, varname=None, format='nc', delete=False,
+             mean=False, timmean=False, compress=True, complevel=6,
+             shuffle=True, chunking=None):
+        """
+        saves the data object to a file
+
+        Parameters
+        ----------
+        filename : str
+            filename the file should be saved too
+        varname : str
+            variable name in output file. If *None*, then
+            the variables are just named like var001 ...
+        format : str
+            output format ['nc','ascii','nc3','nc4','snap']; 'snap'
+            is the binary snapshot format of dump()
+        delete : bool
+            delete file if existing without asking. If *False*, and the
+            file is existing already, then an error is raised
+        mean : bool
+            save spatial mean field only instead of the full field
+        timmean : bool
+            save temporal mean field
+        compress : bool
+            compress resulting file if supported by library
+        complevel : int
+            compression level [1 ... 9]
+        shuffle : bool
+            apply shuffle filter before compression
+        chunking : str
+            chunking strategy for the data variable
+            'time': time contiguous chunks for fast timeseries access
+            'map': chunks of single timesteps for fast access to maps
+            None: default chunking of the netCDF library
+        """
+        map_formats = {'nc': 'NETCDF4', 'nc3':
+                       'NETCDF3_CLASSIC', 'nc4': 'NETCDF4'}
+
+        if mean and timmean:
+            raise ValueError(
+                'Only the MEAN or the TIMMEAN option can be given, but not together!')
+
+        # either store full field or just spatial mean field
+        if mean:
+            print('Saving MEAN FIELD of object in file %s' % filename)
+            tmp = self.fldmean(return_data=True)
+        elif timmean:
+            tmp = self.timmean(return_object=True)
+        else:
+            print('Saving object in file %s' % filename)
+            tmp = self
+        if tmp._is_packed():
+            tmp = tmp.copy(share=True)
+            tmp.unpack()
+
+        # store data now ...
+        if format in ['nc', 'nc3', 'nc4']:
+            tmp._save_netcdf(filename, varname=varname, delete=delete,
+                             compress=compress, format=map_formats[format],
+                             complevel=complevel, shuffle=shuffle,
+                             chunking=chunking)
+        elif format == 'ascii':
+            tmp._save_ascii(filename, varname=varname, delete=delete)
+        elif format == 'snap':
+            tmp.dump(filename, delete=delete)
+        else:
+            raise ValueError('This output format is not defined yet!')
+
+    def dump(self, filename, delete=False):
+        """
+        write the data object to a binary snapshot file (see
+        pycmbs.snapshot). The data, mask, coordinates, time, cell area
+        and the fields std and n are stored uncompressed together
+        with all attributes of simple type (str, numbers, bool). Use
+        load() to read the file again.
+
+        Parameters
+        ----------
+        filename : str
+            name of the output file
+        delete : bool
+            delete file if existing without asking. If *False*, and the
+            file is existing already, then an error is raised
+        """
+        x = self.data
+        if self._is_lazy() or self._is_packed():
+            x = x.load()
+        arrays = {'data': np.ma.getdata(x)}
+        if isinstance(x, np.ma.MaskedArray) and x.mask is not np.ma.nomask:
+            arrays['mask'] = x.mask
+        for k in snapshot_arrays:
+            v = getattr(self, k, None)
+            if isinstance(v, np.ndarray):
+                arrays[k] = np.ma.getdata(v)
+        attributes = {}
+        for k, v in self.__dict__.iteritems():
+            if k in arrays or k in ['dtype', 'lazy']:
+                continue
+            if v is None or isinstance(v, (basestring, bool, int, long, float)):
+                attributes[k] = v
+        write_snapshot(filename, arrays, attributes=attributes, delete=delete)
+
+    @classmethod
+    def load(cls, filename, mmap=True):
+        """
+        read a data object from a snapshot file written by dump()
+
+        Parameters
+        ----------
+        filename : str
+            name of the snapshot file
+        mmap : bool
+            if True, the arrays are mapped into memory without copying
+            and only read from disk when they are accessed. Modifying
+            the data does not change the file.
+
+        Returns
+        -------
+        C{Data} object
+        """
+        arrays, attributes = read_snapshot(filename, mmap=mmap)
+        if 'data' not in arrays:
+            raise ValueError('No data in snapshot file: %s' % filename)
+        d = cls(None, None)
+        for k, v in attributes.iteritems():
+            setattr(d, k, v)
+        x = arrays.pop('data')
+        d.dtype = x.dtype
+        d.data = np.ma.array(x, mask=arrays.pop('mask', np.ma.nomask), copy=False)
+        for k, v in arrays.iteritems():
+            setattr(d, k, v)
+        d._set_grid()
+        return d
+
+    def _save_netcdf(self, filename, varname=None, delete=False, compress=True,
+                     format='NETCDF4', complevel=6, shuffle=True,
+                     chunking=None):
+        """
+        saves the data object to a netCDF file (see
+        GeoData._save_netcdf()). The data variable is written in single
+        precision if the data is float32, using the given compression
+        and chunking and slab by slab
+
+        Parameters
+        ----------
+        filename : str
+            filename of output file
+        varname : str
+            name of output variable; this explicitely overwrites
+            self.varname, which is tried to be used as a first order
+        delete : bool
+            delete file if existing without asking
+        compress : bool
+            compress resulting file if supported by backend
+        format : str
+            output file format specifier as used by netCDF4 library
+        complevel : int
+            compression level
+        shuffle : bool
+            apply shuffle filter before compression
+        chunking : str
+            chunking strategy of data variable ['time','map',None]
+        """
+        if varname is None:
+            if self.varname is None:
+                varname = 'var1'
+            else:
+                varname = self.varname
+
+        if self.data.ndim == 3:
+            if getattr(self, 'time', None) is None:
+                raise ValueError('No time variable existing! \
+                                  Can not write 3D data!')
+            dims = ('time', 'ny', 'nx')
+        elif self.data.ndim == 2:
+            dims = ('ny', 'nx')
+        else:
+            raise ValueError('Current shape not supported here %s' %
+                             str(self.shape))
+        if self.data.dtype == np.dtype('float32'):
+            dtype = 'f'
+        else:
+            dtype = 'd'
+
+        # dimensions, coordinates and time are written by GeoData
+        coords = Data(None, None)
+        for k in ['lat', 'lon', 'time', 'time_str', 'calendar']:
+            setattr(coords, k, getattr(self, k, None))
+        File = NetCDFHandler()
+        if self.lat is not None:
+            GeoData._save_netcdf(coords, filename, varname=varname,
+                                 delete=delete, compress=compress,
+                                 format=format)
+            File.open_file(filename, 'a')
+        else:
+            # GeoData takes the size of the grid from the coordinates
+            if os.path.exists(filename) and not delete:
+                raise ValueError('File already existing. Please delete \
+                                  manually or use DELETE option: \
+                                  %s' % filename)
+            File.open_file(filename, 'w', format=format)
+            File.create_dimension('ny', size=self.shape[-2])
+            File.create_dimension('nx', size=self.shape[-1])
+            if getattr(self, 'time', None) is not None:
+                File.create_dimension('time', size=len(self.time))
+                File.create_variable('time', 'd', ('time',))
+                File.assign_value('time', self.time)
+                File.set_attribute('time', 'units', self.time_str)
+                File.set_attribute('time', 'calendar', self.calendar)
+        try:
+            File.create_variable(varname, dtype, dims, zlib=compress,
+                                 complevel=complevel, shuffle=shuffle,
+                                 chunking=chunking)
+            # 3D data is written in slabs; lazy data is thus also
+            # read slab by slab
+            File.assign_value(varname, self.data)
+            if getattr(self, 'cell_area', None) is not None:
+                File.create_variable('cell_area', 'd', ('ny', 'nx'))
+                File.assign_value('cell_area', self.cell_area)
+
+            if getattr(self, 'long_name', None) is not None:
+                File.set_attribute(varname, 'long_name', self.long_name)
+            if getattr(self, 'unit', None) is not None:
+                File.set_attribute(varname, 'units', self.unit)
+            File.set_attribute(varname, 'scale_factor', 1.)
+            File.set_attribute(varname, 'add_offset', 0.)
+            File.set_attribute(varname, 'coordinates', 'lon lat')
+        finally:
+            File.close()
+
     def _get_binary_filehandler(self, mode='r'):
         """
         get filehandler for binary file
@@ -228,7 +1902,8 @@ class Data(GeoData):
 
     def _read_binary_file(self, dtype=None, lat=None, lon=None,
                           lonmin=None, lonmax=None, latmin=None,
-                          latmax=None, ny=None, nx=None, nt=None):
+                          latmax=None, ny=None, nx=None, nt=None,
+                          tbeg=None, tend=None, byteorder='=', offset=0):
         """
         read data from binary file
         this routine also allows spatial subsetting during reading
@@ -237,6 +1912,17 @@ class Data(GeoData):
         It requires however that two vectors of lon/lat are provided
         in case that a subsetting shall be made
 
+        Uncompressed files are memory mapped and the spatial and temporal
+        subsets are views on the file content. Thus only the data which is
+        actually used is read from disk. Gzip compressed files are
+        decompressed once into a preallocated buffer.
+
+        The data is set as a plain ndarray (no masked array) in the data
+        type of the file; it is not converted to the dtype of the object.
+        For native byte order it is a copy-on-write view of the mapped
+        file; data with a non-native byte order is converted to native
+        byte order, which requires a copy of the subset.
+
         Parameters
         ----------
         dtype : str
@@ -245,9 +1931,21 @@ class Data(GeoData):
             vector of latitudes
         lon : ndarray
             vector of longitudes
+        nt : int
+            number of timesteps on file
+        tbeg : int
+            first time index to read
+        tend : int
+            last time index to read (exclusive)
+        byteorder : str
+            byteorder of data on file ['=','<','>']
+        offset : int
+            size of file header [bytes] that is skipped
         """
         if dtype is None:
             raise ValueError('ERROR: dtype not provided')
+        if dtype not in dtype_spec.keys():
+            raise ValueError('ERROR: invalid data type')
         if lat is not None:
             assert (lon is not None)
         if lat is None:
@@ -256,29 +1954,8 @@ class Data(GeoData):
         else:
             assert (lat.ndim == 1)
             assert (lon.ndim == 1)
-
-        # specify bytes as well as format string for struct for each datatype
-        dtype_spec = {
-            'int16': 'H',
-            'double': 'd',
-            'int32': 'i',
-            'float': 'f'
-        }
-
-        if dtype not in dtype_spec.keys():
-            raise ValueError('ERROR: invalid data type')
-
-        #~ 'int8'   :'b',
-        #~ 'uint8'  :'B',
-        #~ 'int16'  :'h',
-        #~ 'uint16' :'H',
-        #~ 'int32'  :'i',
-        #~ 'uint32' :'I',
-        #~ 'int64'  :'q',
-        #~ 'uint64' :'Q',
-        #~ 'float'  :'f',
-        #~ 'double' :'d',
-        #~ 'char'   :'s'}
+        if nt is None:
+            nt = 1
 
         # set boundaries
         if lon is not None:
@@ -298,15 +1975,15 @@ class Data(GeoData):
             latmin = None
             latmax = None
 
-        # get file handler
-        f = self._get_binary_filehandler()
-
-        # read actual data
+        # determine spatial window
         if lon is None:
-            file_content = f.read()  # read entire file
             # TODO if specifie, then read lat/lon information from file
             self.lat = None
             self.lon = None
+            xbeg = 0
+            xend = nx
+            ybeg = 0
+            yend = ny
         else:
             # check if lat/lon is increasing
             assert np.all(np.diff(lat) > 0.)
@@ -330,80 +2007,140 @@ class Data(GeoData):
             olon = lon[lonminpos:lonmaxpos + 1]
             olat = lat[latminpos:latmaxpos + 1]
 
-            ny = len(olat)
-            nx = len(olon)
-
             self.lon, self.lat = np.meshgrid(olon, olat)
 
             print 'coordinates: ', lonmin, lonmax, latmin, latmax
             print 'Positions: ', lonminpos, lonmaxpos, latminpos, latmaxpos
 
-            file_content = self._read_binary_subset2D(f, struct.calcsize(dtype_spec[dtype]), ny=len(
-                lat), nx=len(lon), xbeg=lonminpos, xend=lonmaxpos + 1, ybeg=latminpos, yend=latmaxpos + 1)
-
-        # close file
-        f.close()
+            ny = len(lat)
+            nx = len(lon)
+            xbeg = lonminpos
+            xend = lonmaxpos + 1
+            ybeg = latminpos
+            yend = latmaxpos + 1
+
+        # the subset is a view on the memory mapped file (or the
+        # decompressed buffer); no data is copied here
+        F = BinaryHandler(self.filename, dtype, nt=nt, ny=ny, nx=nx,
+                          byteorder=byteorder, offset=offset)
+        data = F.get_subset(tbeg=tbeg, tend=tend, ybeg=ybeg, yend=yend,
+                            xbeg=xbeg, xend=xend)
+
+        if not data.dtype.isnative:
+            data = data.astype(data.dtype.newbyteorder('='))
+
+        # single timestep results in 2D field
+        if data.shape[0] == 1:
+            data = data[0, :, :]
+        self.data = data
+
+    def get_time_axis(self):
+        """
+        returns the decoded time axis (C{TimeAxis}) of the data. The
+        dates of all timesteps are calculated at once and cached; the
+        cache is renewed as soon as time, time_str or calendar change.
+        None is returned if the time axis can not be decoded.
+        """
+        if getattr(self, 'time', None) is None or getattr(self, 'time_str', None) is None:
+            return None
+        cal = getattr(self, 'calendar', None) or 'standard'
+        key = timeaxis.TimeAxis.get_key(self.time, self.time_str, cal)
+        T = getattr(self, '_time_axis', None)
+        if T is None or T.key != key:
+            try:
+                T = timeaxis.TimeAxis(self.time, self.time_str, calendar=cal)
+            except ValueError:
+                T = None
+            self._time_axis = T
+        return self._time_axis
+
+    def _get_date(self):
+        """ see GeoData._get_date(); uses the cached time axis """
+        T = self.get_time_axis()
+        if T is not None:
+            try:
+                return T.get_dates(tzinfo=pytz.UTC).copy()
+            except ValueError:  # dates which do not exist (e.g. 360_day)
+                pass
+        return super(Data, self)._get_date()
+    date = property(_get_date)
+
+    def _get_years(self):
+        """
+        get years from timestamp
+        """
+        T = self.get_time_axis()
+        if T is None:
+            return super(Data, self)._get_years()
+        return T.year.tolist()
 
-        # put data into final matrix by decoding in accordance to the filetype
+    def _get_months(self):
+        """
+        get months from timestamp
+        """
+        T = self.get_time_axis()
+        if T is None:
+            return super(Data, self)._get_months()
+        return T.month.tolist()
 
-        self.data = np.reshape(
-            np.asarray(struct.unpack(dtype_spec[dtype] * ny * nx * nt, file_content)), (ny, nx))
+    def _get_time_groups(self, groups):
+        """
+        group labels for each timestep
 
-        del file_content
+        Parameters
+        ----------
+        groups : str or ndarray
+            'year', 'month' (1...12), 'season' (0:DJF, 1:MAM, 2:JJA,
+            3:SON) or an array with a label for each timestep
+        """
+        if not isinstance(groups, str):
+            groups = np.asarray(groups)
+            if groups.ndim != 1 or len(groups) != len(self.time):
+                raise ValueError('Groups need to be 1-D of length of time!')
+            return groups
+        if groups == 'year':
+            return np.asarray(self._get_years())
+        elif groups == 'month':
+            return np.asarray(self._get_months())
+        elif groups == 'season':
+            T = self.get_time_axis()
+            if T is not None:
+                return T.season
+            return (np.asarray(self._get_months()) % 12) // 3
+        else:
+            raise ValueError('Invalid groups: %s' % groups)
 
-    def _read_binary_subset2D(self, f, nbytes, xbeg=None, xend=None, ybeg=None, yend=None, ny=None, nx=None):
+    def get_grouped_statistics(self, groups='year', stats=None, mask=None):
         """
-        read subset from binary file
-        deconding takes place outside of this routine!
+        calculate statistics of the data for groups of timesteps
+        (e.g. years, months or seasons). All statistics are
+        calculated in a single pass over the data
 
         Parameters
         ----------
-        f : file handler
-            file handler to read binary data
-        nbytes : int
-            size of a single value on the file [bytes]
-        ybeg : int
-            index of y coordinate start
-        yend : int
-            index of y coordinate end
-        xbeg : int
-            index of x coordinate start
-        xend : int
-            index of x coordinate end
-        ny : int
-            y-size of the original array on file
-        nx : int
-            x-size of the original array on file
+        groups : str or ndarray
+            'year', 'month' (1...12), 'season' (0:DJF, 1:MAM, 2:JJA,
+            3:SON) or an array with a group label for each timestep
+        stats : list
+            statistics to calculate
+            ['mean','sum','count','std','min','max']; default: ['mean']
+        mask : ndarray (bool)
+            temporal mask [time]; only timesteps where mask is True
+            are used
 
         Returns
         -------
-        string which needs to be decoded using struct
-        """
-        if ybeg is None:
-            raise ValueError('ERROR: Need to specify YBEG')
-        if xbeg is None:
-            raise ValueError('ERROR: Need to specify XBEG')
-        if yend is None:
-            raise ValueError('ERROR: Need to specify YEND')
-        if xend is None:
-            raise ValueError('ERROR: Need to specify XEND')
-
-        file_content = ''
-        for i in xrange(ny):
-            if i >= yend:
-                break
-            if i < ybeg:
-                continue
-            # position
-            #~ print i*nbytes*nx, i*nx
-            #~ stop
-            pos = i * nbytes * nx + xbeg * nbytes
-            f.seek(pos)
-            # read content
-            bytes_to_read = (xend - xbeg) * nbytes
-            r = f.read(bytes_to_read)
-            file_content += r
-        return file_content
+        labels : ndarray
+            sorted group labels
+        res : dict
+            masked array [ngroups,...] for each statistic
+        """
+        if self.data.ndim not in [1, 3]:
+            raise ValueError('Unsupported dimension!')
+        labels = self._get_time_groups(groups)
+        if self._is_lazy():
+            return group_reduce(self.data.load(), labels, stats=stats, mask=mask)
+        return group_reduce(self.data, labels, stats=stats, mask=mask)
 
     def get_yearmean(self, mask=None, return_data=False):
         """
@@ -421,50 +2158,14 @@ class Data(GeoData):
         return_data : bool
             specifies if results should be returned as C{Data} object
         """
-
-        if mask is None:
-            # if no mask is provided, take everything
-            mask = np.ones(len(self.time)).astype('bool')
-        else:
-            if mask.ndim != 1:
-                raise ValueError('Mask needs to be 1-D of length of time!')
-            if len(mask) != len(self.time):
-                raise ValueError('Mask needs to be 1-D of length of time!')
-
-        #/// get data
-        ye = np.asarray(self._get_years())
-        years = np.unique(ye)
-        dat = self.data
-
-        # calculate mean
-        if self.data.ndim == 1:
-            res = np.zeros(len(years)) * np.nan
-            su = np.zeros(len(years)) * np.nan
-        elif self.data.ndim == 3:
-            nt, ny, nx = self.data.shape
-            res = np.zeros((len(years), ny, nx))
-            su = np.zeros((len(years), ny, nx))
-        else:
-            raise ValueError('Unsupported dimension!')
-
-        for i in xrange(len(years)):
-            y = years[i]
-            hlp = (ye == y) & mask
-            if self.data.ndim == 1:
-                res[i] = dat[hlp].mean()
-                # calculate sum also (needed for masking in the end)
-                su[i] = dat[hlp].sum()
-            else:
-                res[i, :, :] = dat[hlp, :].mean(axis=0)
-                # calculate sum also (needed for masking in the end)
-                su[i, :, :] = dat[hlp].sum(axis=0)
-
+        years, r = self.get_grouped_statistics('year', stats=['mean', 'sum'],
+                                               mask=mask)
         # this is still not the best solution, but works
-        res = np.ma.array(res, mask=(su == 0.))
+        res = np.ma.array(r['mean'].data, mask=(r['sum'].data == 0.))
 
         if return_data:
             # generate data object
-            r = self.copy()
+            r = self._copy_result()
             r.data = res
             r.time = self.date2num(
                 np.asarray([datetime.datetime(year, 1, 1) for year in years]))
@@ -488,40 +2189,15 @@ class Data(GeoData):
         return_data : bool
             specifies if a Data object shall be returned
         """
-
-        if mask is None:
-            # if no mask is provided, take everything
-            mask = np.ones(len(self.time)).astype('bool')
-        else:
-            if mask.ndim != 1:
-                raise ValueError('Mask needs to be 1-D of length of time!')
-            if len(mask) != len(self.time):
-                raise ValueError('Mask needs to be 1-D of length of time!')
-
-        #/// get data
-        ye = pl.asarray(self._get_years())
-        years = pl.unique(ye)
-        dat = self.data
-
-        #/// calculate mean
-        res = []
-        for y in years:
-            hlp = (ye == y) & mask
-            if self.data.ndim == 1:
-                res.append(dat[hlp].sum())
-            else:
-                res.append(dat[hlp, :].sum(axis=0))
-
-        res = pl.asarray(res)
-        msk = dat.count(0) == 0
-
-        for i in xrange(len(res)):
-            res[i, msk] = np.nan
+        years, r = self.get_grouped_statistics('year', stats=['sum'],
+                                               mask=mask)
         # mask all data that contained no single valid value!
-        res = np.ma.array(res, mask=np.isnan(res))
+        msk = np.ma.count(self.data, axis=0) == 0
+        res = np.ma.array(r['sum'].data,
+                          mask=np.ones(r['sum'].shape, dtype='bool') & msk)
 
         if return_data:
-            r = self.copy()
+            r = self._copy_result()
             r.data = res
             r.time = self.date2num(
                 np.asarray([datetime.datetime(year, 1, 1) for year in years]))
@@ -530,8 +2206,6 @@ class Data(GeoData):
         else:
             return years, res
 
-
-
     def set_time(self):
         """
         convert times that are in a specific format
@@ -570,6 +2244,81 @@ class Data(GeoData):
 
 
 
+    def _set_time_from_dates(self, year, month, day, hour=0, minute=0):
+        """
+        set the time from the components of the dates as days since
+        0001-01-01 in the gregorian calendar
+        """
+        self.calendar = 'gregorian'
+        self.time_str = 'days since 0001-01-01 00:00:00'
+        self.time = timeaxis.date2num(year, month, day, hour, minute,
+                                      time_str=self.time_str,
+                                      calendar=self.calendar)
+
+    def _split_time_digits(self):
+        """
+        integer part of the time values and their fractions
+        """
+        t = np.asarray(self.time, dtype='float')
+        i = np.floor(t)
+        return i.astype('int64'), t - i
+
+    def _convert_time(self):
+        """
+        convert time that was given as YYYYMMDD.f
+        and set time variable of Data object
+        """
+        x, frac = self._split_time_digits()
+        h = np.floor(frac * 24.)
+        mi = np.floor((frac * 24. - h) * 60.)
+        self._set_time_from_dates(x // 10000, (x // 100) % 100, x % 100, h, mi)
+
+    def _convert_time_YYYYMMDD(self):
+        """
+        convert time that was given as YYYYMMDD
+        and set time variable of Data object
+        """
+        x, frac = self._split_time_digits()
+        self._set_time_from_dates(x // 10000, (x // 100) % 100, x % 100)
+
+    def _convert_time_YYYYMMDDhhmm(self):
+        """
+        convert time that was given as YYYYMMDDhhmm
+        and set time variable of Data object
+        """
+        x, frac = self._split_time_digits()
+        d = x // 10000
+        self._set_time_from_dates(d // 10000, (d // 100) % 100, d % 100,
+                                  (x // 100) % 100, x % 100)
+
+    def _convert_timeYYYYMM(self):
+        """
+        convert time that was given as YYYYMM.f
+        and set time variable of Data object
+        """
+        x, frac = self._split_time_digits()
+        self._set_time_from_dates(x // 100, x % 100, 1)
+
+    def _convert_monthly_timeseries(self):
+        """
+        convert monthly timeseries to a daily timeseries. The number
+        of months since the basedate are added to the basedate for all
+        timesteps at once.
+        """
+        if self.calendar not in ['standard', 'gregorian', None]:
+            raise ValueError('Not sure if monthly timeseries conversion \
+                                works with this calendar!')
+        per, ref = timeaxis.parse_time_units('days since ' + self.time_str.split('since')[1])
+        if ref[2] > 28:
+            # the day of month is not preserved in this case
+            return super(Data, self)._convert_monthly_timeseries()
+        n = np.maximum(np.trunc(np.asarray(self.time, dtype='float')), 0.).astype('int64')
+        y, m = divmod(ref[0] * 12 + ref[1] - 1 + n, 12)
+        self.calendar = 'standard'
+        self.time_str = 'days since 0001-01-01 00:00:00'
+        self.time = timeaxis.date2num(y, m + 1, ref[2], ref[3], ref[4], ref[5],
+                                      time_str=self.time_str, calendar=self.calendar)
+
     def apply_temporal_subsetting(self, start_date, stop_date):
         """
         perform temporal subsetting of data
@@ -613,7 +2362,9 @@ class Data(GeoData):
             i2 = len(self.time)
         self.time = self.time[i1:i2]
 
-        if self.data.ndim == 3:
+        if self._is_lazy():
+            self.data = self.data.window((slice(i1, i2),))
+        elif self.data.ndim == 3:
             self.data = self.data[i1:i2, :, :]
         elif self.data.ndim == 2:
             # data has already been squeezed and result was 2D (thus without
@@ -632,9 +2383,15 @@ class Data(GeoData):
     def get_aoi(self, region):
         """ region of class Region """
 
-        # copy self
-        d = self.copy()
-        d.data = region.get_subset(d.data)
+        # copy self; only the data of the region is duplicated
+        d = self._copy_result()
+        if d._is_lazy():
+            # only the region will be read later
+            d.data = d.data.window((slice(None), slice(region.y1, region.y2),
+                                    slice(region.x1, region.x2)))
+        else:
+            d.data = region.get_subset(d.data)
+            d._unshare('data')
         d.cell_area = region.get_subset(d.cell_area)
 
         if hasattr(d, '_climatology_raw'):
@@ -693,59 +2450,117 @@ class Data(GeoData):
 
     def shift_x(self, nx):
         """
-        shift data array in x direction by nx steps
+        shift data array in x direction by nx steps. Data, coordinates
+        and cell area are rotated with a single copy each; lazy data
+        is rotated by an index permutation which is applied when the
+        data is read
 
         Parameters
         ----------
         nx : int
             shift by nx steps
         """
-        if self.data.ndim == 3:
-            self.data = self.__shift3D(self.data, nx)
-        else:
-            self.data = self.__shift2D(self.data, nx)
-        self.lat = self.__shift2D(self.lat, nx)
-        self.lon = self.__shift2D(self.lon, nx)
+        self._roll_x(nx)
 
-    def __shift3D(self, x, n):
+    def _roll_x(self, n):
         """
-        shift 3D data
-
-        Parameters
-        ----------
-        x : ndarray
-            data to be shifted
-        n : int
-            shifting step
+        rotate all fields in x direction by n steps (see np.roll)
         """
-        tmp = x.copy()
-        y = x.copy()
-        y[:, :, :] = np.nan
-        y[:, :, 0:n] = tmp[:, :, -n:]
-        y[:, :, n:] = tmp[:, :, 0:-n]
-        return y
-
-
-
-    def __shift2D(self, x, n):
+        if n % self.nx == 0:
+            return
+        if self._is_lazy():
+            idx = np.roll(np.arange(self.nx), n)
+            self.data = self.data.window((slice(None), slice(None), idx))
+        elif self._is_packed():
+            P = get_packing_index(np.roll(self.data.index.valid, n, axis=-1))
+            self.data = PackedArray(P.pack(np.roll(self.data.load(), n, axis=-1)), P)
+        else:
+            self.data = np.roll(self.data, n, axis=-1)
+        for k in ['lat', 'lon', 'cell_area']:
+            x = getattr(self, k, None)
+            if x is not None and np.ndim(x) == 2 and np.shape(x)[1] == self.nx:
+                setattr(self, k, np.roll(x, n, axis=-1))
+        self._set_grid()
+
+    def normalize_lon(self, convention='180'):
         """
-        shift 2D data
+        rotate the data and the coordinates such that the longitudes
+        are ascending within [-180,180) or [0,360). The data is
+        rotated only once (see shift_x()); data which already follows
+        the convention is not touched.
 
         Parameters
         ----------
-        x : Data
-            data to be shifted
-        n : int
-            shifting step
+        convention : str
+            '180': -180 <= lon < 180; '360': 0 <= lon < 360
         """
-        tmp = x.copy()
-        y = x.copy()
-        y[:, :] = np.nan
-        y[:, 0:n] = tmp[:, -n:]
-        y[:, n:] = tmp[:, 0:-n]
-        return y
-
-
+        if convention not in ['180', '360']:
+            raise ValueError('Invalid longitude convention: %s' % convention)
+        G = self.get_grid()
+        if G is None:
+            raise ValueError('Longitudes can not be normalized without coordinates!')
+        if G.get_lon_convention() != convention:
+            lon = G.get_unique_lon()
+            if lon is None or np.ndim(self.lon) != 2:
+                raise ValueError('Longitudes are not unique for each column!')
+            if convention == '360':
+                new = np.mod(lon, 360.)
+            else:
+                new = np.mod(lon + 180., 360.) - 180.
+            k = int(np.argmin(new))
+            if np.any(np.diff(np.roll(new, -k)) <= 0.):
+                raise ValueError('Longitudes can not be rotated into ascending order!')
+            if k != 0 or np.any(new != lon):
+                self._roll_x(-k)
+                self.lon = np.ones(self.lat.shape) * np.roll(new, -k)[np.newaxis, :]
+                self._set_grid()
+        self._lon360 = convention == '360'
+
+    def correlate(self, Y, pthres=1.01, spearman=False, detrend=False):
+        """
+        see GeoData.correlate(); for packed data the Pearson correlation
+        is calculated for all stored cells at once and the results
+        are packed as well
+        """
+        if (not self._is_packed() or spearman or detrend or not isinstance(Y.data, PackedArray)
+                or Y.data.index is not self.data.index or Y.data.shape != self.data.shape):
+            x = self
+            if self._is_packed():
+                x = self.copy(share=True)
+                x.unpack()
+            if isinstance(Y.data, PackedArray):
+                Y = Y.copy(share=True)
+                Y.unpack()
+            return super(Data, x).correlate(Y, pthres=pthres, spearman=spearman, detrend=detrend)
+
+        P = self.data.index
+        valid = ~(np.ma.getmaskarray(self.data.values) | np.ma.getmaskarray(Y.data.values))
+        xv = np.where(valid, np.ma.getdata(self.data.values), 0.)
+        yv = np.where(valid, np.ma.getdata(Y.data.values), 0.)
+        n = valid.sum(axis=0)
+        nn = np.maximum(n, 1)
+        xa = np.where(valid, xv - xv.sum(axis=0) / nn, 0.)
+        ya = np.where(valid, yv - yv.sum(axis=0) / nn, 0.)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = (xa * ya).sum(axis=0) / np.sqrt((xa * xa).sum(axis=0) * (ya * ya).sum(axis=0))
+            r[n < 3] = np.nan
+            p = np.ones(len(r)) * np.nan
+            p[r >= 1.] = 0.
+            ok = r < 1.  # not NaN
+            if np.any(ok):
+                p[ok] = np.ma.getdata(get_significance(r[ok], n[ok]))
+            r[p > pthres] = np.nan
+
+        RO = self._copy_result()
+        RO.data = PackedArray(np.ma.array(r, mask=np.isnan(r)), P)
+        RO.label = '$r_{pear}$: ' + self.label + ' vs. ' + Y.label
+        RO.unit = ''
+
+        PO = self._copy_result()
+        PO.data = PackedArray(np.ma.array(p, mask=np.isnan(p)), P)
+        PO.label = 'p-value'
+        PO.unit = ''
+        return RO, PO
 
     def diff(self, x, axis=0, equal_var=True, mask_data=False,
              pthres=0.05):
@@ -758,7 +2573,7 @@ class Data(GeoData):
 
         The significance is calculated using a two-tailored t-test or a welch test
         in case of different variances. Independent samples are assumed!
-        (unittest test_diff)
+        Masked values are ignored. (unittest test_diff)
 
         Parameters
         ----------
@@ -784,10 +2599,6 @@ class Data(GeoData):
         returns a C{Data} object that includes a) the difference map,
         b) the p-value, c) a mask that can be used e.g. as an overlay
         for map_plot()
-
-        @todo: implementation of welch test. This should be actually already be implemented in stats.ttest_ind, but is not available in my python installation!
-        http://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.ttest_ind.html#scipy.stats.ttest_ind
-        but the code would be available here: https://github.com/scipy/scipy/blob/v0.11.0/scipy/stats/stats.py#L2957
         """
 
         #/// check consistency
@@ -799,97 +2610,229 @@ class Data(GeoData):
             raise ValueError('Invalid axis parameter: %s' % str(axis))
 
         #/// create new data object
-        d = self.copy()
+        d = self._copy_result()
         d.label = self.label + ' - ' + x.label
 
         #/// calculate statistical significance of the difference
-        if isinstance(d.data, np.ma.masked_array):
-            sta = stats.mstats
-            # use routine in pyCMBS.statistic.py
-            t, p = ttest_ind(d.data, x.data, axis=axis)
-        else:
-            t, p = stats.ttest_ind(d.data, x.data,
-                                   axis=axis)  # todo equal var for welch test not part of my psthon installation!
+        n1, m1, v1 = masked_moments(self.data, axis=axis)
+        n2, m2, v2 = masked_moments(x.data, axis=axis)
+        t, p = ttest_from_moments(n1, m1, v1, n2, m2, v2, equal_var=equal_var)
+
+        #/// significant changes
+        mask = p <= pthres
 
         # invert p-value, as a p-value of 1. would correspond to the same data
         p = 1. - p
 
-        #/// mean difference masked if p-value too low
-        mask = p <= pthres
+        #/// mean difference masked if change not significant
+        dm = m1 - m2
         if mask_data:
             # mean difference as masked array
-            d.data = np.ma.array(self.timmean() - x.timmean(), mask=~mask)
+            d.data = np.ma.array(dm, mask=~mask.filled(False) | np.isnan(dm))
         else:
-            d.data = np.ma.array(self.timmean() - x.timmean(),
-                                 mask=np.zeros(self.timmean().shape).astype('bool'))  # mean difference as masked array
+            d.data = np.ma.array(dm, mask=np.isnan(dm))  # mean difference as masked array
         d.p_value = p
-        # masks the grid cells that show significant changes (todo check this
-        # again!) needs additional validation
+        # masks the grid cells that show significant changes
         d.p_mask = mask
         d.t_value = t
 
         return d
 
-    def copy(self):
+    def copy(self, share=False):
         """
         copy complete C{Data} object including all attributes
+
+        Parameters
+        ----------
+        share : bool
+            if True, the data and the coordinates (see
+            shared_attributes) are not duplicated, but the copy gets
+            read-only views of the arrays of this object. This is not
+            a copy-on-write: writing directly into the shared arrays
+            of the copy (e.g. x.lat[0, 0] = 0.) raises a ValueError.
+            Assigning new arrays to the copy does not touch the
+            original object and the methods of the copy which modify
+            the data in place (e.g. _apply_mask(), mulc(copy=False))
+            duplicate the affected arrays before. The original object
+            must not be modified in place while the copy is in use.
+            Results of methods (e.g. timmean(), fldmean(), diff(),
+            get_aoi()) do not share any arrays with this object.
+
+        Without share, all arrays of the copy are duplicated and
+        writeable, also if the coordinates of this object are shared
+        with a C{Grid} (see share_grid).
         """
         d = Data(None, None)
-        return self._copy_all_attributes(d)
-
-    def _pad_timeseries(self, fill_value=-99.):
-
-        import numpy as np
-        from matplotlib import dates
-        from dateutil.rrule import rrule, MONTHLY
-
-        self._log_warning('Trying to pad timeseries')
-
-        data = self.data
-        time = self.time
-
-        dummy_data = np.ma.array(
-            np.ones(data[0, :, :].shape) * data.fill_value,
-            fill_value=data.fill_value,
-            mask=np.ones(data[0, :, :].shape) * True)
-
-        months = self._get_months()
-        mondif = np.diff(months)
+        if not share:
+            return self._copy_all_attributes(d)
+        for attr, value in self.__dict__.iteritems():
+            if attr in shared_attributes and isinstance(value, np.ndarray):
+                value = _readonly_view(value)
+            elif attr in shared_attributes and isinstance(value, (LazyArray, PackedArray)):
+                pass  # lazy and packed data are never modified in place
+            else:
+                try:
+                    value = value.copy()  # needed for arrays
+                except:
+                    pass
+            setattr(d, attr, value)
+        return d
 
-        gaps = np.where(mondif > 1)
-        new_time = self.num2date(time)
-        new_data = data.copy()
+    def _copy_result(self):
+        """
+        copy of this object for the results of methods. The data is
+        not duplicated, as it is replaced by the result afterwards,
+        but the copy gets own (writeable) coordinates and time.
+        """
+        d = self.copy(share=True)
+        d._unshare('lat', 'lon', 'cell_area', 'time')
+        return d
 
-        idx_shift = 0
+    def _unshare(self, *attrs):
+        """
+        duplicate arrays which are shared with other C{Data} objects
+        (see copy()), such that they can be modified in place
 
-        for i in gaps[0]:
-            start_time = new_time[i + idx_shift]
-            stop_time = new_time[i + 1 + idx_shift]
-            gap_months = rrule(MONTHLY, dtstart=start_time).between(
-                start_time, stop_time, inc=True)[1:-1]
+        Parameters
+        ----------
+        attrs : str
+            names of the attributes; all shared attributes if not given
+        """
+        if len(attrs) == 0:
+            attrs = shared_attributes
+        for attr in attrs:
+            value = getattr(self, attr, None)
+            if isinstance(value, np.ndarray) and not value.flags.writeable:
+                setattr(self, attr, value.copy())
+            if attr in ['lat', 'lon', 'cell_area']:
+                # coordinates are modified; the grid is looked up again
+                self._grid_arrays = None
+
+    # the following methods modify the data in place if copy=False;
+    # shared data needs to be duplicated before
+
+    add = _unshared_arithmetic('add')
+    sub = _unshared_arithmetic('sub')
+    mul = _unshared_arithmetic('mul')
+    div = _unshared_arithmetic('div')
+    addc = _unshared_arithmetic('addc')
+    subc = _unshared_arithmetic('subc')
+    mulc = _unshared_arithmetic('mulc')
+    divc = _unshared_arithmetic('divc')
+
+    def timeshift(self, n, return_data=False, shift_time=False):
+        """ see GeoData.timeshift(); shared data is duplicated before """
+        if not return_data:
+            self._unshare('data', 'time')
+        return super(Data, self).timeshift(n, return_data=return_data,
+                                           shift_time=shift_time)
+
+    def _apply_temporal_mask(self, mask):
+        """
+        see GeoData._apply_temporal_mask(); lazy data is loaded and
+        shared data is duplicated before. Packed data stays packed.
+        """
+        if self._is_lazy():
+            self.data = self.data.load()
+        if self._is_packed():
+            P = self.data.index
+            v = self.data.values
+            if v.ndim == 2 and len(mask) == len(v):
+                m = np.ma.getmaskarray(v).copy()
+                m[np.asarray(mask, dtype='bool'), :] = True
+                self.data = PackedArray(np.ma.array(v.data, mask=m), P)
+                return
+            self.unpack()
+        self._unshare('data')
+        return super(Data, self)._apply_temporal_mask(mask)
+
+    def _shift_lon(self):
+        """ see GeoData._shift_lon(); shared longitudes are duplicated before """
+        self._unshare('lon')
+        super(Data, self)._shift_lon()
+
+    def _shift_lon_360(self):
+        """ see GeoData._shift_lon_360(); shared longitudes are duplicated before """
+        self._unshare('lon')
+        super(Data, self)._shift_lon_360()
+
+    def _pad_timeseries(self, fill_value=-99., freq='monthly'):
+        """
+        pad the timeseries such that it contains all months (or days)
+        between the first and last timestep. The complete time axis
+        is determined at once and the existing timesteps are copied
+        into their slots; data of missing timesteps is masked.
 
-            new_time = np.insert(new_time, i + 1 + idx_shift, gap_months)
-            new_data = np.insert(
-                new_data, i + 1 + idx_shift, dummy_data, axis=0)
-            idx_shift = idx_shift + len(gap_months)
+        Parameters
+        ----------
+        fill_value : float
+            data equal to this value is masked as well
+        freq : str
+            frequency of the timeseries ['monthly','daily']
+        """
+        self._log_warning('Trying to pad timeseries')
 
-        data_masked = np.ma.array(new_data.data,
-                                  mask=new_data == fill_value,
-                                  fill_value=fill_value)
+        T = self.get_time_axis()
+        if T is None:
+            raise ValueError('Time axis can not be decoded: %s' % self.time_str)
+        if freq == 'monthly':
+            # month index for each timestep
+            k = T.year * 12 + T.month - 1
+        elif freq == 'daily':
+            if 'days since' not in self.time_str:
+                raise ValueError('Daily padding requires time units in days')
+            k = np.floor(np.asarray(self.time) - np.floor(self.time[0]) + 1.E-6).astype('int')
+        else:
+            raise ValueError('Invalid frequency: %s' % freq)
+        k0 = k.min()
+        slot = k - k0
+        n = k.max() - k0 + 1
+        if len(np.unique(slot)) != len(slot):
+            raise ValueError('Timeseries contains several timesteps for the same %s' % {'monthly': 'month', 'daily': 'day'}[freq])
+
+        # target time axis; existing timesteps keep their time
+        missing = np.ones(n, dtype='bool')
+        missing[slot] = False
+        new_time = np.zeros(n)
+        new_time[slot] = self.time
+        if np.any(missing):
+            if freq == 'monthly':
+                # same day and time as the first timestep, limited by
+                # the length of the month
+                y, m = divmod(k0 + np.nonzero(missing)[0], 12)
+                ndays = (timeaxis.day_number(y + (m + 1) // 12, (m + 1) % 12 + 1, 1, T.calendar) -
+                         timeaxis.day_number(y, m + 1, 1, T.calendar))
+                new_time[missing] = timeaxis.date2num(
+                    y, m + 1, np.minimum(T.day[0], ndays), T.hour[0], T.minute[0],
+                    T.second[0] + T.microsecond[0] * 1.E-6, time_str=self.time_str,
+                    calendar=T.calendar)
+            else:
+                new_time[missing] = self.time[0] + np.nonzero(missing)[0] - slot[0]
 
-        self.time = self.date2num(new_time)
-        self.data = data_masked.copy()
+        data = self.data
+        new_data = np.ma.array(np.ones((n,) + data.shape[1:], dtype=data.dtype) * fill_value,
+                               mask=np.ones((n,) + data.shape[1:], dtype='bool'),
+                               fill_value=fill_value)
+        new_data[slot] = data
+        new_data.mask |= new_data.data == fill_value
+
+        self.time = new_time
+        self.data = new_data
         self._set_timecycle()
 
-
-
-
-
-    def _rasterize(self, lon, lat, radius=None, return_object=True):
+    def _rasterize(self, lon, lat, radius=None, return_object=True,
+                   method='nearest', radius_units='deg'):
         """
         rasterize data to a target grid specified by the input arguments
 
-        CAUTION: this is a rather slow function!s
+        A KD-tree of the target grid is generated and all data points
+        are assigned to their nearest grid cell at once
+
+        Note that this changes the results of former versions, which
+        used the planar distance in lon/lat coordinates and in which
+        the value of the last data point assigned to a cell won. Now
+        distances are great circle distances and with 'nearest' each
+        cell gets the value of the closest data point.
 
         Parameters
         ----------
@@ -898,9 +2841,18 @@ class Data(GeoData):
         lon : ndarray
             longitude [deg]
         radius : float
-            threshold radius
+            threshold radius; data points are only assigned to a grid
+            cell if the distance is smaller than radius
         return_object : bool
             return a Data object
+        method : str
+            'nearest': value of the closest data point
+            'mean': mean of all data points assigned to a grid cell
+            'count': number of data points assigned to a grid cell
+        radius_units : str
+            units of radius ['deg','km']; 'deg' is the great
+            circle distance in degrees (formerly the planar
+            distance in lon/lat)
 
         Returns
         -------
@@ -911,38 +2863,32 @@ class Data(GeoData):
             raise ValueError('Inconsistent geometry!')
         if radius is None:
             raise ValueError('Search radius obligatory')
-
-        # flatten data
-        dlon = self.lon.flatten()
-        dlat = self.lat.flatten()
-        data = self.data.flatten()
-        res = np.ones_like(lon) * np.nan
-
-        for i in xrange(len(dlon)):
-            # distance
-            d = np.sqrt((lon - dlon[i]) ** 2. + (lat - dlat[i]) ** 2.)
-            #d = np.ma.array(d, mask= d <= radius)
-            dmin = d.min()
-            m = d == dmin
-            if dmin <= radius:  # threshold
-                res[m] = data[i]
-
-        if return_object:
-            x = self.copy()
-            x.lon = lon * 1.
-            x.lat = lat * 1.
-            x.data = np.ma.array(res, mask=np.isnan(res))
+        if radius_units == 'deg':
+            chord = deg2chord(radius)
+        elif radius_units == 'km':
+            chord = km2chord(radius)
         else:
+            raise ValueError('Invalid units for radius: %s' % radius_units)
+        if not return_object:
             raise ValueError('Not implemented yet!')
+        if self.data.ndim == 3:
+            raise ValueError('Rasterization only supported for 2D data')
 
-        return x
+        G = GridIndex(lon, lat)
+        res = G.rasterize(self.lon, self.lat, self.data, chord, method=method)
 
+        x = self._copy_result()
+        x.lon = lon * 1.
+        x.lat = lat * 1.
+        x.data = res
+        return x
 
-    def lomb_scargle_periodogram(self, P, return_object=True, frac=1., corr=True):
+    def lomb_scargle_periodogram(self, P, return_object=True, frac=1., corr=True,
+                                 nproc=1, blocksize=1024):
         """
         Calculate LOMB-SCARGLE periodogram
-        This routine provides a wrapper to the function
-        in statistic.py
+        The periodogram is calculated for blocks of pixels at once
+        (see pycmbs.spectral); invalid data is ignored
 
         Parameters
         ----------
@@ -954,9 +2900,11 @@ class Data(GeoData):
         frac : float
             minimum fraction of valid data needed for timesteps to perform calculation
             This is done also for performance improvement!
+        nproc : int
+            number of processes used for the calculation
+        blocksize : int
+            number of pixels processed at once
         """
-        from geoval.statistic import lomb_scargle_periodogram
-
         if self.ndim != 3:
             raise ValueError('Only 3D geometry supported!')
 
@@ -974,16 +2922,20 @@ class Data(GeoData):
         # get mask where at least
         vmask = self.get_valid_mask(frac=frac)
 
-        for i in xrange(self.ny):
-            print i, self.ny
-            for j in xrange(self.nx):
-                if vmask[i, j]:
-                    if corr:
-                        A[:, i, j], B[:, i, j], R[:, i, j], PV[:, i, j] = lomb_scargle_periodogram(
-                            t, P, self.data[:, i, j], corr=corr)
-                    else:
-                        A[:, i, j], B[:, i, j] = lomb_scargle_periodogram(
-                            t, P, self.data[:, i, j], corr=corr)
+        # timeseries of valid pixels [nt,npix]
+        ipix = np.nonzero(vmask.flatten())[0]
+        nt = len(self.data)
+        y = np.ma.getdata(self.data).reshape((nt, -1))[:, ipix]
+        valid = ~np.ma.getmaskarray(self.data).reshape((nt, -1))[:, ipix]
+        valid &= np.isfinite(y)
+
+        res = lomb_scargle_blocks(t, np.asarray(P), y, valid, corr=corr,
+                                  nproc=nproc, blocksize=blocksize)
+        A.reshape((n, -1))[:, ipix] = res[0]
+        B.reshape((n, -1))[:, ipix] = res[1]
+        if corr:
+            R.reshape((n, -1))[:, ipix] = res[2]
+            PV.reshape((n, -1))[:, ipix] = res[3]
 
         if return_object:
             Aout = Data(None, None)
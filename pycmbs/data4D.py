@@ -20,65 +20,277 @@ In addition to the Class Date has the Data4D class the attributs
 
   from_level  : the number of the lowest level, starting by 0
   to_level    : the number of the highest level
-  data4D      : is an array of the attribude 'data' from the Data-Class
+  data4D      : the data of all levels (LevelStack); data4D[i] is the
+                3D array [time,ny,nx] of the i-th level
+  levellist   : dictionary level --> index in data4D
 
 becase all data are stored in the data4D array, the normal data attribude is deleted.
+All levels are kept in a single masked array [time,level,ny,nx], thus
+arithmetic and sums over the levels are single numpy operations.
 
 """
 
 #### from pylab import *
 
-from data import Data
+import os
+
+import numpy as np
+
+from data import Data, _readonly_view
+from netcdf import NetCDFHandler
+from geoval.core.data import GeoData
 import matplotlib.colors as col
 import matplotlib.cm as cm
 from matplotlib import pyplot as plt
-from cdo import *
 
 
-class Data4D(Data):
+class LevelStack(object):
 
-#-----------------------------------------------------------------------
-    def read(self, shift_lon, start_time=None, stop_time=None, time_var='time', checklat=True):
-        cdo = Cdo()
+    def __init__(self, data=None):
+        """
+        list like container for the levels of a C{Data4D} object. The
+        data of all levels is stored in a single masked array
+        [time,level,ny,nx] with a full mask; indexing returns the
+        [time,ny,nx] array of a level as a view
 
-        if self.levellist == {}:
-            level = 0
-            L = cdo.showlevel(input='-selname,' +
-                              self.varname + ' ' + self.filename)
-            levell = L[0].split(' ')
-            for k in levell:
-                self.levellist[int(k)] = level
-                level += 1
+        Parameters
+        ----------
+        data : ndarray
+            data [time,level,ny,nx]
+        """
+        if data is not None:
+            data = np.ma.array(data, copy=False)
+            if data.ndim != 4:
+                raise ValueError('LevelStack requires data [time,level,ny,nx]')
+            data.mask = np.ma.getmaskarray(data)
+        self.data = data
+
+    @staticmethod
+    def from_levels(levels):
+        """
+        create a LevelStack from a list of arrays [time,ny,nx]
+        """
+        if len(levels) == 0:
+            return LevelStack()
+        shape = np.shape(levels[0])
+        dtype = np.result_type(*[np.asarray(x).dtype for x in levels])
+        d = np.ma.array(np.zeros((shape[0], len(levels)) + shape[1:], dtype=dtype),
+                        mask=np.zeros((shape[0], len(levels)) + shape[1:], dtype='bool'))
+        for i, x in enumerate(levels):
+            if np.shape(x) != shape:
+                raise ValueError('All levels need to have the same geometry!')
+            d[:, i] = x
+        return LevelStack(d)
+
+    def __len__(self):
+        if self.data is None:
+            return 0
+        return self.data.shape[1]
+
+    def __getitem__(self, i):
+        if self.data is None:
+            raise IndexError('LevelStack is empty')
+        return self.data[:, i]
+
+    def __setitem__(self, i, x):
+        if self.data is None:
+            raise IndexError('LevelStack is empty')
+        self.data[:, i] = x
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def append(self, x):
+        """
+        add a level [time,ny,nx]. The data of all levels is
+        reallocated; use from_levels() to create a stack of many
+        levels at once
+        """
+        x = np.ma.array(x, copy=False)
+        if x.ndim != 3:
+            raise ValueError('Levels need to be given as [time,ny,nx]')
+        x = x.reshape((x.shape[0], 1) + x.shape[1:])
+        if self.data is None:
+            self.data = np.ma.array(x.data.copy(), mask=np.ma.getmaskarray(x).copy())
+        else:
+            if x.shape[2:] != self.data.shape[2:] or x.shape[0] != self.data.shape[0]:
+                raise ValueError('All levels need to have the same geometry!')
+            self.data = np.ma.concatenate([self.data, x], axis=1)
+            self.data.mask = np.ma.getmaskarray(self.data)
+
+    def copy(self):
+        if self.data is None:
+            return LevelStack()
+        return LevelStack(self.data.copy())
 
-        self.level = int(self.levellist.get(self.levellist.keys()[0]))
 
+class Data4D(Data):
+
+#-----------------------------------------------------------------------
+    def read(self, shift_lon, start_time=None, stop_time=None, time_var='time', checklat=True):
+        """
+        read the data of all levels. The levels are determined from
+        the level coordinate in the file header and the data of all
+        selected levels is read with a single request for the
+        hyperslab [time,level,ny,nx]. Temporal and spatial windows
+        (start_time, stop_time, bbox, region) are applied when reading.
+
+        Levels are selected by the levellist or the level_range given
+        when creating the object; by default all levels are read.
+        """
+        idx, values = self._get_level_index()
+        self.level_values = values
+
+        # read the indices in ascending order, sort afterwards
+        order = np.argsort(idx)
+        sidx = idx[order]
+        if len(sidx) > 1 and np.all(np.diff(sidx) == 1):
+            self.level = slice(sidx[0], sidx[-1] + 1)
+        else:
+            self.level = sidx
+        self._level_order = None
+        if np.any(order != np.arange(len(order))):
+            self._level_order = np.argsort(order)
+
+        # the data of the first level is processed by Data.read(); all
+        # changes of the geometry are applied to all levels as well
+        # (see _flipud(), _temporal_subsetting(), ...)
+        self.lazy = False
         Data.read(self, shift_lon, start_time=start_time,
                   stop_time=stop_time, time_var=time_var, checklat=checklat)
 
         del self.data
-        for k in sorted(self.levellist.keys()):
-            self.level = int(self.levellist[int(k)])
-            self.data4D.append(Data.read_netcdf(self, self.varname))
+        self.level = None
+
+    def _get_level_index(self):
+        """
+        determine the indices of the levels to be read from the level
+        coordinate in the file. Sets the levellist if not given.
+
+        Returns
+        -------
+        idx : ndarray
+            indices of the levels on file in the order of data4D
+        values : ndarray
+            values of the level coordinate of these levels
+        """
+        if not os.path.exists(self.filename):
+            raise ValueError('Error: file not existing: %s' % self.filename)
+        File = NetCDFHandler()
+        File.open_file(self.filename, 'r')
+        try:
+            if self.varname not in File.get_variable_keys():
+                raise ValueError('The data variable %s in the file %s is not existing!' % (self.varname, self.filename))
+            dims = File.get_dimensions(self.varname)
+            if len(dims) != 4:
+                raise ValueError('Data4D requires a variable [time,level,ny,nx]: %s' % self.varname)
+            nlev = File.get_variable_handler(self.varname).shape[1]
+            if dims[1] in File.get_variable_keys():
+                coord = np.asarray(File.get_variable(dims[1])).flatten()
+                self.level_unit = File._get_unit(dims[1])
+            else:
+                coord = np.arange(nlev).astype('float')
+                self.level_unit = None
+        finally:
+            File.close()
+
+        def _key(v):
+            return int(v) if v == int(v) else float(v)
+
+        if self.levellist == {}:
+            idx = np.arange(nlev)
+            if self.level_range is not None:
+                idx = idx[(coord >= min(self.level_range)) & (coord <= max(self.level_range))]
+                if len(idx) == 0:
+                    raise ValueError('No levels within %s' % str(self.level_range))
+            for i, k in enumerate(idx):
+                self.levellist[_key(coord[k])] = i
+        else:
+            levels = sorted(self.levellist.keys(), key=lambda k: self.levellist[k])
+            keys = [_key(v) for v in coord]
+            if all([k in keys for k in levels]):
+                idx = np.asarray([keys.index(k) for k in levels])
+            else:
+                # levels are given as indices on file
+                idx = np.asarray(levels, dtype='int')
+            if np.any(idx >= nlev) or np.any(idx < 0):
+                raise ValueError('Invalid levels for variable %s' % self.varname)
+        return idx, coord[idx]
+
+    def read_netcdf(self, varname, netcdf_backend='netCDF4', filename=None):
+        """
+        see Data.read_netcdf(). The data of all levels is stored in
+        data4D; the data of the first level is returned
+        """
+        x = Data.read_netcdf(self, varname, netcdf_backend=netcdf_backend, filename=filename)
+        if varname == self.varname and x is not None and x.ndim == 4:
+            if self._level_order is not None:
+                x = x[:, self._level_order]
+            self.data4D = LevelStack(x)
+            return x[:, 0].copy()
+        return x
+
+    def _transform_levels(self, f):
+        """
+        replace the data [time,level,ny,nx] of all levels by f(data)
+        """
+        if self.data4D.data is not None:
+            self.data4D.data = f(self.data4D.data)
+
+    def _flipud(self):
+        """ see Data._flipud(); all levels are flipped """
+        Data._flipud(self)
+        self._transform_levels(lambda x: x[:, :, ::-1, :])
+
+    def _roll_x(self, n):
+        """ see Data._roll_x(); all levels are rotated """
+        Data._roll_x(self, n)
+        self._transform_levels(lambda x: np.roll(x, n, axis=-1))
+
+    def _temporal_subsetting(self, i1, i2):
+        """ see Data._temporal_subsetting(); applied to all levels """
+        nt = len(self.time)
+        Data._temporal_subsetting(self, i1, i2)
+        self._transform_levels(lambda x: x[i1:min(i2 + 1, nt)])
+
+    def _apply_mask(self, msk1, keep_mask=True):
+        """ see Data._apply_mask(); applied to all levels """
+        Data._apply_mask(self, msk1, keep_mask=keep_mask)
+        x = self.data4D.data
+        if x is None:
+            return
+        if isinstance(msk1, GeoData):
+            msk1 = msk1.data.mask
+        invalid = ~np.asarray(msk1, dtype='bool')
+        if invalid.ndim == 3:
+            invalid = invalid[:, np.newaxis, :, :]
+        if keep_mask:
+            x.mask |= invalid
+        else:
+            x.mask = np.ones(x.shape, dtype='bool') & invalid
 
 #-----------------------------------------------------------------------
     def _copy_Data4D_Info_to_Data(self):
         """
         copies all Data-attribut information from the Data4D type to the Data type.
+        The data is shared as read-only view, as it is replaced by the
+        callers; coordinates and time are copied (see Data.copy())
         @return C{Data} object
         """
         d = Data(None, None)
 
         for attr, value in self.__dict__.iteritems():
-            if attr != 'data4D' and attr != 'levellist':
-#         print " attr: " + attr + " value: "
+            if attr in ['data4D', 'levellist']:
+                continue
+            if attr == 'data' and isinstance(value, np.ndarray):
+                value = _readonly_view(value)
+            else:
                 try:
-                    #-copy (needed for arrays)
-                    cmd = "d." + attr + " = self." + attr + '.copy()'
-                    exec cmd
+                    value = value.copy()  # needed for arrays
                 except:
-                    #-copy
-                    cmd = "d." + attr + " = self." + attr
-                    exec cmd
+                    pass
+            setattr(d, attr, value)
 
         return d
 
@@ -90,37 +302,28 @@ class Data4D(Data):
         @return C{Data4D} object
         """
         d = Data4D(None, None)
-# ws        print "copy of data4D.py"
+        self._copy_attributes(d)
+        return d
 
+    def _copy_attributes(self, d, skip=()):
+        """
+        copy all attributes (except skip) to the object d
+        """
         for attr, value in self.__dict__.iteritems():
-#     print attr
-            if not attr == "data4D":
-#       print 'if'
-                try:
-                    #-copy (needed for arrays)
-                    cmd = "d." + attr + " = self." + attr + '.copy()'
-                    exec cmd
-#                print "A: "+cmd
-                except:
-                    #-copy
-                    cmd = "d." + attr + " = self." + attr
-                    exec cmd
-#                print "B: "+cmd
-            else:
-                # print 'else '+ str(self.levellist.keys())
-                #cmd = "d." + attr + " = self." + attr
-                exec cmd
-                for k in self.levellist.keys():
-#        print 'K: '+str(k)
-                    d.data4D.append(self.data4D[self.levellist[k]].copy())
-
-        return d
+            if attr in skip:
+                continue
+            try:
+                value = value.copy()  # needed for arrays
+            except:
+                pass
+            setattr(d, attr, value)
 
 #-----------------------------------------------------------------------
 
     def getDataFromLevel(self, l):
         """
-        returns a Data4D level as a Data object
+        returns a Data4D level as a Data object. The data of the
+        returned object is a view of the level in data4D
 
         Parameters
         ----------
@@ -129,11 +332,7 @@ class Data4D(Data):
         """
         if int(l) in self.levellist.keys():
             ret = self._copy_Data4D_Info_to_Data()
-            d = self
-            # print int(l)
-            # print self.levellist[int(l)]
-            # print self.levellist
-            ret.data = d.data4D[self.levellist[int(l)]]
+            ret.data = self.data4D[self.levellist[int(l)]]
             return ret
         else:
             raise ValueError('Given Level %s not in data4D!' % str(l))
@@ -152,154 +351,333 @@ class Data4D(Data):
         """
 
         if int(l) in self.levellist.keys():
-            d = self
-            d.data4D[self.levellist[int(l)]] = da.data
+            self.data4D[self.levellist[int(l)]] = da.data
         else:
             raise ValueError('Given Level %s not in data4D!' % str(l))
 
 #-----------------------------------------------------------------------
-    def mulc(self, x, copy=True):
+    def _get_operand(self, x):
+        """
+        returns the data of x such that it broadcasts against the
+        data [time,level,ny,nx] of all levels
+        """
+        if hasattr(x, 'data4D'):
+            return x.data4D.data
+        if np.ndim(x.data) == 3:
+            return x.data[:, np.newaxis, :, :]
+        return x.data
 
+    def _apply(self, op, x, copy):
+        """
+        apply an inplace operation to the data of all levels at once
+        """
         if copy:
             d = self.copy()
         else:
             d = self
+        if d.data4D.data is not None:
+            getattr(d.data4D.data, op)(x)
+        return d
 
-        for k in self.levellist.keys():
-            d.data4D[self.levellist[k]] *= x
+#-----------------------------------------------------------------------
+    def mulc(self, x, copy=True):
+        return self._apply('__imul__', x, copy)
 
-        return d
 #-----------------------------------------------------------------------
 
     def mul(self, x, copy=True):
+        return self._apply('__imul__', self._get_operand(x), copy)
 
-        if copy:
-            d = self.copy()
-        else:
-            d = self
-
-        for k in self.levellist.keys():
-            if hasattr(x, 'data4D'):
-                d.data4D[self.levellist[k]] *= x.data4D[self.levellist[k]]
-            else:
-                d.data4D[self.levellist[k]] *= x.data
-
-#        d.label = self.label + ' * ' + x.label
-        return d
 #-----------------------------------------------------------------------
 
     def divc(self, x, copy=True):
-
-        if copy:
-            d = self.copy()
-        else:
-            d = self
-
-        for k in self.levellist.keys():
-            d.data4D[self.levellist[k]] /= x
-
-        return d
+        return self._apply('__idiv__', x, copy)
 
 #-----------------------------------------------------------------------
     def div(self, x, copy=True):
-
-        if copy:
-            d = self.copy()
-        else:
-            d = self
-
-        for k in self.levellist.keys():
-            if hasattr(x, 'data4D'):
-                d.data4D[self.levellist[k]] /= x.data4D[self.levellist[k]]
-            else:
-                d.data4D[self.levellist[k]] /= x.data
-
-        return d
+        return self._apply('__idiv__', self._get_operand(x), copy)
 
 #-----------------------------------------------------------------------
     def addc(self, x, copy=True):
+        return self._apply('__iadd__', x, copy)
 
-        if copy:
-            d = self.copy()
-        else:
-            d = self
-
-        for k in self.levellist.keys():
-            d.data4D[self.levellist[k]] += x
-
-        return d
 #-----------------------------------------------------------------------
 
     def add(self, x, copy=True):
-
-        if copy:
-            d = self.copy()
-        else:
-            d = self
-
-        # print "01 copy self "+str(self.data4D[0][4,0,0])+" d "+str(d.data4D[0][4,0,0])
-        # print "a1 copy self "+self.label+" d "+str(d.label)
-        # print "a1 copy self "+self.label+" d "+str(d.label)
-#        d.data4D[0][4,0,0] = d.data4D[0][4,0,0] + 100.
+        d = self._apply('__iadd__', self._get_operand(x), copy)
         d.label = "myLabel"
-#        print "a2 copy self "+self.label+" d "+str(d.label)
-        for k in self.levellist.keys():
-# print "02 copy self "+str(self.data4D[0][4,0,0])+" d
-# "+str(d.data4D[0][4,0,0])
-            if hasattr(x, 'data4D'):
-                d.data4D[self.levellist[k]] += x.data4D[self.levellist[k]]
-            else:
-                d.data4D[self.levellist[k]] += x.data
-
-# print "03 copy self "+str(self.data4D[0][4,0,0])+" d
-# "+str(d.data4D[0][4,0,0])
         return d
 
 #-----------------------------------------------------------------------
     def subc(self, x, copy=True):
+        return self._apply('__isub__', x, copy)
 
-        if copy:
-            d = self.copy()
+#-----------------------------------------------------------------------
+
+    def sub(self, x, copy=True):
+        return self._apply('__isub__', self._get_operand(x), copy)
+
+#-----------------------------------------------------------------------
+    def sum_data4D(self):
+        """
+        summates all Data4D levels to one level. The sum is masked
+        where the data of any level is masked
+        @return C{Data} object
+        """
+
+        sum = self._copy_Data4D_Info_to_Data()
+        x = self.data4D.data
+        if x is None:
+            sum.data = 0.0
         else:
-            d = self
+            sum.data = np.ma.array(x.data.sum(axis=1), mask=np.ma.getmaskarray(x).any(axis=1))
 
-        for k in self.levellist.keys():
-            d.data4D[self.levellist[k]] -= x
+        return sum
 
-        return d
 #-----------------------------------------------------------------------
+    def mean_data4D(self):
+        """
+        mean of all Data4D levels. Masked values are ignored; the
+        mean is masked where the data of all levels is masked
+        @return C{Data} object
+        """
+        if self.data4D.data is None:
+            raise ValueError('No levels in data4D!')
+        res = self._copy_Data4D_Info_to_Data()
+        res.data = self.data4D.data.mean(axis=1)
+        return res
 
-    def sub(self, x, copy=True):
+#-----------------------------------------------------------------------
+    def _get_level_field(self, x, nextra=0):
+        """
+        returns a field given per level such that it can be broadcast
+        against data [time,level,ny,nx]. Accepted are vectors [level],
+        fields [level,ny,nx] and [time,level,ny,nx]; the level
+        dimension has length nlev + nextra
+        """
+        nt, nlev = self.data4D.data.shape[:2]
+        x = np.ma.asarray(x)
+        if x.ndim == 1:
+            x = x.reshape((1, -1, 1, 1))
+        elif x.ndim == 3:
+            x = x.reshape((1,) + x.shape)
+        elif x.ndim != 4 or x.shape[0] not in [1, nt]:
+            raise ValueError('Level fields need to be given as [level], [level,ny,nx] or [time,level,ny,nx]')
+        if x.shape[1] != nlev + nextra:
+            raise ValueError('Invalid number of levels: %i' % x.shape[1])
+        if x.shape[2:] not in [(1, 1), self.data4D.data.shape[2:]]:
+            raise ValueError('Level field has inconsistent geometry!')
+        return x
+
+    def vertical_integrate(self, weights=None, bounds=None):
+        """
+        vertical integral of the data over all levels, calculated as
+        sum(data * weights). Masked values do not contribute to the
+        integral; the result is masked where the data of all levels
+        is masked. All timesteps are processed at once; for files
+        which do not fit into memory, read portions of timesteps
+        (time_window) and concatenate the results.
 
-        if copy:
-            d = self.copy()
+        Parameters
+        ----------
+        weights : ndarray
+            weights of the levels (e.g. layer thickness or pressure
+            difference / g) as [level], [level,ny,nx] or
+            [time,level,ny,nx]
+        bounds : ndarray
+            bounds of the levels (e.g. pressure at half levels) as
+            [level+1], [level+1,ny,nx] or [time,level+1,ny,nx]; the
+            weights are then the absolute differences of the bounds
+
+        Returns
+        -------
+        C{Data} object
+        """
+        if (weights is None) == (bounds is None):
+            raise ValueError('Either weights or bounds need to be given!')
+        x = self.data4D.data
+        if x is None:
+            raise ValueError('No levels in data4D!')
+        if weights is None:
+            bounds = self._get_level_field(bounds, nextra=1)
+            w = np.abs(np.diff(bounds.filled(np.nan), axis=1))
         else:
-            d = self
+            w = self._get_level_field(weights).filled(0.)
+        w = np.where(np.isnan(w), 0., w)
 
-        for k in self.levellist.keys():
-            if hasattr(x, 'data4D'):
-                d.data4D[self.levellist[k]] -= x.data4D[self.levellist[k]]
-            else:
-                d.data4D[self.levellist[k]] -= x.data
+        return self._weighted_sum(w)
 
-        return d
+    def aggregate_tiles(self, fractions, veg_ratio_max=None):
+        """
+        aggregate tile values (e.g. of JSBACH) to grid box values as
+        sum(data * fractions [* veg_ratio_max]) over the tiles, which
+        are stored as the levels of data4D. Masked values do not
+        contribute; the result is masked where the data of all tiles
+        is masked.
 
-#-----------------------------------------------------------------------
-    def sum_data4D(self):
+        Parameters
+        ----------
+        fractions : Data4D or ndarray
+            cover fractions of the tiles; either a Data4D object with
+            the same tiles or an array [tile], [tile,ny,nx] or
+            [time,tile,ny,nx]
+        veg_ratio_max : Data or ndarray
+            maximum vegetated fraction of the grid box [ny,nx] or
+            [time,ny,nx] the cover fractions are scaled with. Masked
+            grid boxes are masked in the result
+
+        Returns
+        -------
+        C{Data} object
         """
-        summates all Data4D levels to one level
-        @return C{Data} object
+        if self.data4D.data is None:
+            raise ValueError('No levels in data4D!')
+        if hasattr(fractions, 'data4D'):
+            fractions = fractions.data4D.data
+        w = self._get_level_field(fractions).filled(0.)
+
+        scale = None
+        if veg_ratio_max is not None:
+            if hasattr(veg_ratio_max, 'lat'):
+                veg_ratio_max = veg_ratio_max.data
+            scale = np.ma.asarray(veg_ratio_max)
+            if scale.ndim == 2:
+                scale = scale.reshape((1,) + scale.shape)
+            if scale.ndim != 3 or scale.shape[0] not in [1, self.data4D.data.shape[0]] \
+                    or scale.shape[1:] != self.data4D.data.shape[2:]:
+                raise ValueError('veg_ratio_max needs to be given as [ny,nx] or [time,ny,nx]')
+        return self._weighted_sum(w, scale=scale)
+
+    def _weighted_sum(self, w, scale=None):
         """
+        sum(data * w [* scale]) over the levels as a single einsum
 
-        sum = self._copy_Data4D_Info_to_Data()
-        d = self
+        Parameters
+        ----------
+        w : ndarray
+            weights from _get_level_field()
+        scale : ndarray
+            masked array [1|time,ny,nx] the sum is multiplied with
+        """
+        x = self.data4D.data
+        dtype = np.result_type(x.dtype, np.float32)
+        m = np.ma.getmaskarray(x)
+        w = np.broadcast_to(w, x.shape)
+        xd = np.where(m, 0., x.data)
+        msk = m.all(axis=1)
+        if scale is None:
+            s = np.einsum('ijkl,ijkl->ikl', xd, w, dtype='float64')
+        else:
+            msk = msk | np.ma.getmaskarray(scale)
+            sc = np.broadcast_to(scale.filled(0.), msk.shape)
+            s = np.einsum('ijkl,ijkl,ikl->ikl', xd, w, sc, dtype='float64')
 
-        sum.data = 0.0
+        r = self._copy_Data4D_Info_to_Data()
+        r.data = np.ma.array(s.astype(dtype), mask=msk)
+        return r
 
-        for k in self.levellist.keys():
-            sum.data += self.data4D[self.levellist[k]]
+    def interpolate_levels(self, target_levels, method='linear', levels=None):
+        """
+        interpolate the data to other levels (e.g. standard pressure
+        or depth levels). The bracketing levels of each target level
+        are determined for all columns at once; values outside the
+        range of the levels and values for which one of the
+        bracketing values is masked are masked.
+        All timesteps are processed at once (see vertical_integrate()).
 
-        return sum
+        Parameters
+        ----------
+        target_levels : ndarray
+            levels to interpolate to
+        method : str
+            'linear': linear in the level coordinate
+            'log': linear in the logarithm of the level coordinate
+            (e.g. for pressure)
+        levels : ndarray
+            level coordinate of the data as [level], [level,ny,nx] or
+            [time,level,ny,nx] (e.g. pressure of model levels). It
+            needs to be monotonic along the levels. If None, the
+            level coordinate of the file (level_values) is used
+
+        Returns
+        -------
+        C{Data4D} object with the levels target_levels
+        """
+        if method not in ['linear', 'log']:
+            raise ValueError('Invalid interpolation method: %s' % method)
+        x = self.data4D.data
+        if x is None:
+            raise ValueError('No levels in data4D!')
+        if levels is None:
+            levels = self.level_values
+        if levels is None:
+            raise ValueError('Level coordinate required for interpolation!')
+        nlev = x.shape[1]
+        if nlev < 2:
+            raise ValueError('Interpolation requires at least two levels!')
+        t = np.asarray(target_levels, dtype='float').flatten()
+        z = self._get_level_field(levels).filled(np.nan).astype('float')
+        if method == 'log':
+            if np.any(t <= 0.) or np.any(z <= 0.):
+                raise ValueError('Logarithmic interpolation requires positive levels!')
+            t = np.log(t)
+            z = np.log(z)
+
+        # ascending levels
+        d = np.diff(z, axis=1)
+        if np.all(d > 0.):
+            lev = np.arange(nlev)
+        elif np.all(d < 0.):
+            lev = np.arange(nlev)[::-1]
+            z = z[:, ::-1]
+        else:
+            raise ValueError('Levels need to be monotonic!')
+
+        dtype = np.result_type(x.dtype, np.float32)
+        res = np.ma.array(np.zeros((x.shape[0], len(t)) + x.shape[2:], dtype=dtype),
+                          mask=np.zeros((x.shape[0], len(t)) + x.shape[2:], dtype='bool'))
+        if z.shape[2:] == (1, 1):
+            # same levels for all columns
+            z = z.flatten()
+            k = np.clip(np.searchsorted(z, t), 1, nlev - 1)
+            w = ((t - z[k - 1]) / (z[k] - z[k - 1])).reshape((1, -1, 1, 1))
+            outside = ((t < z[0]) | (t > z[-1])).reshape((1, -1, 1, 1))
+            x0 = x[:, lev[k - 1]]
+            x1 = x[:, lev[k]]
+            m = ((np.ma.getmaskarray(x0) & (w < 1.)) | (np.ma.getmaskarray(x1) & (w > 0.)) |
+                 outside)
+            res[:] = np.ma.array(x0.data * (1. - w) + x1.data * w, mask=m)
+        else:
+            # levels which differ between the columns; the position of
+            # the target levels is determined by counting the levels
+            # below (searchsorted for all columns at once)
+            xc = x[:, lev]
+            xd = xc.data
+            xm = np.ma.getmaskarray(xc)
+            for j, tj in enumerate(t):
+                k = (z < tj).sum(axis=1)
+                k = np.clip(k, 1, nlev - 1)[:, np.newaxis]
+                z0 = np.take_along_axis(z, k - 1, axis=1)
+                z1 = np.take_along_axis(z, k, axis=1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    w = (tj - z0) / (z1 - z0)
+                outside = np.isnan(w) | (tj < z[:, :1]) | (tj > z[:, -1:])
+                w = np.where(outside, 0., w)
+                zb = np.broadcast_to(k, (xd.shape[0], 1) + xd.shape[2:])
+                x0 = np.take_along_axis(xd, zb - 1, axis=1)
+                x1 = np.take_along_axis(xd, zb, axis=1)
+                m = ((np.take_along_axis(xm, zb - 1, axis=1) & (w < 1.)) |
+                     (np.take_along_axis(xm, zb, axis=1) & (w > 0.)) | outside)
+                res[:, j] = np.ma.array(x0 * (1. - w) + x1 * w, mask=m)[:, 0]
+
+        r = Data4D(None, None)
+        self._copy_attributes(r, skip=['data4D', 'levellist', 'level_values', '_level_order'])
+        r.data4D = LevelStack(res)
+        r.level_values = np.asarray(target_levels, dtype='float').flatten()
+        r.levellist = {}
+        for j, v in enumerate(r.level_values):
+            r.levellist[int(v) if v == int(v) else float(v)] = j
+        return r
 #-------------------------------------------------------------------------
 
     def __init__(self, filename, varname, levellist=None, **kwargs):
@@ -309,11 +687,26 @@ class Data4D(Data):
         This class implements the functionality to generate Data4D objekt.
 
 
+        Parameters
+        ----------
+        levellist : list
+            levels to be read (values of the level coordinate of the
+            file). If not all of them are values of the coordinate,
+            they are used as indices of the levels on file. If None,
+            all levels are read
+        level_range : tuple
+            (min, max) range of the level coordinate values of the
+            levels which are read (alternative to levellist)
+
         EXAMPLES
         ========
 
         """
         self.levellist = {}
+        self.level_range = kwargs.pop('level_range', None)
+        self.level_values = None
+        self.level_unit = None
+        self._level_order = None
 
         if not levellist is None:
             level = 0
@@ -321,7 +714,7 @@ class Data4D(Data):
                 self.levellist[int(k)] = level
                 level += 1
 
-        self.data4D = []
+        self.data4D = LevelStack()
 
         Data.__init__(self, filename, varname, **kwargs)
         self.mulc(self.scale_factor, copy=False)
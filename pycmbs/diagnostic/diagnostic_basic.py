@@ -22,6 +22,7 @@ import pickle
 from pycmbs.plots import pm_bar, add_nice_legend
 from pycmbs.mapping import map_plot
 from pycmbs.data import Data
+from pycmbs.packed import PackedArray
 from pycmbs.anova import *
 from pycmbs.taylor import Taylor
 
@@ -243,7 +244,7 @@ class EOF(object):
             print '    WARNING: it is recommended to use area weighting for EOFs'
             wmat = np.sqrt(np.ones(x.data.shape))
         self._sum_weighting = np.sum(wmat)
-        x.data *= wmat
+        x.data = x.data * wmat
         del wmat
 
         # estimate only valid data, discard any masked values
@@ -1443,19 +1444,32 @@ class Diagnostic(object):
         if not self.y._is_monthly():
             raise ValueError('Variable Y has no monthly stepping!')
 
+        # packed data: only the stored cells are used
+        packed = isinstance(self.x.data, PackedArray) and self.x.data.ndim == 3
+
         # spatial weights
         if weights is None:
             if self.x.cell_area is None:
                 print 'WARNING: Reichler: can not calculated weighted index, as no cell_area given!'
                 weights = np.ones(self.x.data.shape)
+            elif packed:
+                weights = self.x._get_packed_weights()
             else:
                 weights = self.x._get_weighting_matrix()
         else:
             weights = weights.copy()
 
-        x = self.x.data.copy()
-        y = self.y.data.copy()
-        std_x = self.x.std.copy()
+        if packed:
+            P = self.x.data.index
+            if np.shape(weights) == self.x.data.shape:
+                weights = P.pack(weights)
+            x = P.pack(self.x.data).copy()
+            y = P.pack(self.y.data).copy()
+            std_x = P.pack(self.x.std).copy()
+        else:
+            x = self.x.data.copy()
+            y = self.y.data.copy()
+            std_x = self.x.std.copy()
 
         if np.shape(x) != np.shape(y):
             print np.shape(x), np.shape(y)
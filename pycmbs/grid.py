@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module provides a descriptor of the geometry of a grid which is
+shared by all C{Data} objects on the same grid. Grids are interned by
+a hash of their coordinates and cell areas. Quantities which only
+depend on the grid (area weights, unique coordinates, zonal bands)
+are calculated once and cached. Datasets read with share_grid=True
+refer to the (read-only) coordinate arrays of the grid, thus e.g. all
+datasets on a T63 grid keep their coordinates only once in memory.
+"""
+
+import hashlib
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# all grids currently in use; a grid is removed as soon as no object
+# refers to it anymore
+_grids = weakref.WeakValueDictionary()
+
+
+def _readonly(x):
+    """ returns a read-only copy of an array (or None) """
+    if x is None:
+        return None
+    x = np.asanyarray(x).copy()
+    x.flags.writeable = False
+    if isinstance(x, np.ma.MaskedArray) and x._mask is not np.ma.nomask:
+        x._mask.flags.writeable = False
+        x._sharedmask = True
+    return x
+
+
+def _same_array(a, b):
+    """
+    check if two arrays refer to the same memory with the same layout
+    """
+    if a is b:
+        return True
+    if not isinstance(a, np.ndarray) or not isinstance(b, np.ndarray):
+        return False
+    return (a.__array_interface__['data'][0] == b.__array_interface__['data'][0] and
+            a.shape == b.shape and a.strides == b.strides and a.dtype == b.dtype)
+
+
+def grid_key(lat, lon, cell_area=None):
+    """
+    hash of the coordinates and cell areas of a grid
+
+    Parameters
+    ----------
+    lat : ndarray
+        latitudes
+    lon : ndarray
+        longitudes
+    cell_area : ndarray
+        cell area [m**2]; optional
+
+    Returns
+    -------
+    str
+    """
+    h = hashlib.sha1()
+    for x in [lat, lon, cell_area]:
+        if x is None:
+            h.update('None')
+            continue
+        m = np.ma.getmask(x)
+        x = np.ascontiguousarray(np.ma.getdata(x))
+        h.update('%s%s' % (x.dtype.str, str(x.shape)))
+        h.update(x.data)
+        if m is not np.ma.nomask:
+            h.update(np.ascontiguousarray(m).data)
+    return h.hexdigest()
+
+
+def get_grid(lat, lon, cell_area=None):
+    """
+    returns the shared C{Grid} object for the given coordinates. A new
+    grid is only created if no grid with the same coordinates and cell
+    areas is in use yet.
+
+    Parameters
+    ----------
+    lat : ndarray
+        latitudes
+    lon : ndarray
+        longitudes
+    cell_area : ndarray
+        cell area [m**2]; optional
+
+    Returns
+    -------
+    C{Grid} object
+    """
+    key = grid_key(lat, lon, cell_area)
+    G = _grids.get(key)
+    if G is None:
+        G = Grid(lat, lon, cell_area=cell_area, key=key)
+        _grids[key] = G
+    return G
+
+
+def get_number_of_grids():
+    """ returns the number of grids currently in use """
+    return len(_grids)
+
+
+class Grid(object):
+
+    def __init__(self, lat, lon, cell_area=None, key=None, maxmasks=32):
+        """
+        geometry of a grid; use get_grid() to obtain shared instances.
+        The arrays of a grid are read-only.
+
+        Parameters
+        ----------
+        lat : ndarray
+            latitudes
+        lon : ndarray
+            longitudes
+        cell_area : ndarray
+            cell area [m**2]; optional
+        key : str
+            hash of the grid; calculated if not given
+        maxmasks : int
+            maximum number of masks for which normalized weights are
+            cached
+        """
+        if key is None:
+            key = grid_key(lat, lon, cell_area)
+        self.key = key
+        self.lat = _readonly(lat)
+        self.lon = _readonly(lon)
+        self.cell_area = _readonly(cell_area)
+        self.shape = np.shape(self.lat)
+        if np.shape(self.lon) != self.shape:
+            raise ValueError('Inconsistent geometry!')
+        self.maxmasks = maxmasks
+        self._weights = OrderedDict()
+        self._cache = {}
+
+    def is_grid_of(self, lat, lon, cell_area):
+        """
+        check if the given arrays are (views of) the arrays of the grid
+        """
+        return (_same_array(lat, self.lat) and _same_array(lon, self.lon) and
+                _same_array(cell_area, self.cell_area))
+
+    def get_total_area(self):
+        """ returns the area of all cells """
+        if 'total_area' not in self._cache:
+            self._cache['total_area'] = np.ma.getdata(self.cell_area).sum()
+        return self._cache['total_area']
+
+    def get_weights(self, mask=None):
+        """
+        area weights of the grid cells normalized by the area of the
+        valid cells. Results are cached for the most recently used masks.
+
+        Parameters
+        ----------
+        mask : ndarray (bool)
+            cells which are not valid; if None, all cells are used
+
+        Returns
+        -------
+        w : masked array
+            read-only array of weights; the sum of all weights is one
+        total : float
+            area of all valid cells
+        """
+        if self.cell_area is None:
+            raise ValueError('Grid has no cell areas!')
+        if mask is None:
+            mask = np.zeros(self.shape, dtype='bool')
+        mask = np.asarray(mask, dtype='bool')
+        if mask.shape != self.shape:
+            raise ValueError('Mask has inconsistent geometry!')
+        key = hashlib.sha1(np.ascontiguousarray(mask).data).hexdigest()
+        if key in self._weights:
+            res = self._weights.pop(key)
+        else:
+            valid = ~mask
+            ca = np.ma.getdata(self.cell_area)
+            total = ca[valid].sum()
+            w = np.zeros(self.shape)
+            w[valid] = ca[valid] / total
+            w = np.ma.array(w, mask=mask.copy())
+            w.flags.writeable = False
+            w.mask.flags.writeable = False
+            res = (w, total)
+        self._weights[key] = res
+        while len(self._weights) > self.maxmasks:
+            self._weights.popitem(last=False)
+        return res
+
+    def get_unique_lat(self):
+        """
+        returns the latitude of each row of the grid, or None if the
+        latitudes vary within the rows (accuracy 1.E-5 deg)
+        """
+        if 'unique_lat' not in self._cache:
+            lat = np.ma.getdata(self.lat)
+            if lat.ndim == 1:
+                res = lat
+            elif lat.ndim == 2 and not np.any(np.abs(lat.mean(axis=1) - lat[:, 0]) > 1.E-5):
+                res = lat[:, 0]
+            else:
+                res = None
+            self._cache['unique_lat'] = res
+        return self._cache['unique_lat']
+
+    def get_unique_lon(self):
+        """
+        returns the longitude of each column of the grid, or None if
+        the longitudes vary within the columns (accuracy 1.E-5 deg)
+        """
+        if 'unique_lon' not in self._cache:
+            lon = np.ma.getdata(self.lon)
+            if lon.ndim == 1:
+                res = lon
+            elif lon.ndim == 2 and not np.any(np.abs(lon.mean(axis=0) - lon[0, :]) > 1.E-5):
+                res = lon[0, :]
+            else:
+                res = None
+            self._cache['unique_lon'] = res
+        return self._cache['unique_lon']
+
+    def get_lon_convention(self):
+        """
+        convention of the longitudes of the grid
+
+        Returns
+        -------
+        '360' if the longitudes of the columns are ascending within
+        [0,360), '180' if they are ascending within [-180,180) and
+        None otherwise
+        """
+        if 'lon_convention' not in self._cache:
+            lon = self.get_unique_lon()
+            res = None
+            if lon is not None and len(lon) > 0 and np.all(np.diff(lon) > 0.):
+                if lon.min() >= 0. and lon.max() < 360.:
+                    res = '360'
+                elif lon.min() >= -180. and lon.max() < 180.:
+                    res = '180'
+            self._cache['lon_convention'] = res
+        return self._cache['lon_convention']
+
+    def get_zonal_bands(self, resolution=None):
+        """
+        assignment of grid cells to latitude bands
+
+        Parameters
+        ----------
+        resolution : float
+            width of the bands [deg]. If None, each row of the grid is
+            a band (requires unique latitudes per row), otherwise the
+            cells are binned by latitude
+
+        Returns
+        -------
+        lat : ndarray
+            latitude of the bands
+        idx : ndarray (int)
+            index of the band of each cell [ny,nx]
+        """
+        if len(self.shape) != 2:
+            raise ValueError('Zonal bands are only supported for 2D grids!')
+        key = ('zonal_bands', resolution)
+        if key not in self._cache:
+            if resolution is None:
+                lat = self.get_unique_lat()
+                if lat is None:
+                    raise ValueError('Latitudes are not unique for each row!')
+                ny, nx = self.shape
+                idx = np.arange(ny).repeat(nx).reshape(self.shape)
+            else:
+                b = np.floor(np.ma.getdata(self.lat) / resolution).astype('int')
+                ub, idx = np.unique(b, return_inverse=True)
+                lat = (ub + 0.5) * resolution
+                idx = idx.reshape(self.shape)
+            idx.flags.writeable = False
+            self._cache[key] = (lat, idx)
+        return self._cache[key]
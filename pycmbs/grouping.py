@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements reductions of data over groups of timesteps
+(e.g. years, seasons or months). The time indices are sorted and
+segmented once and all statistics are then calculated for all groups
+at once using numpy reduceat kernels.
+"""
+
+import numpy as np
+
+valid_statistics = ['mean', 'sum', 'count', 'std', 'min', 'max']
+
+
+def group_reduce(x, groups, stats=None, mask=None):
+    """
+    calculate statistics of data for groups along the first axis
+
+    Parameters
+    ----------
+    x : ndarray or masked array
+        data [nt,...]; masked values are not taken into account
+    groups : ndarray
+        group label for each timestep [nt]
+    stats : list
+        list of statistics to calculate
+        ['mean','sum','count','std','min','max']
+    mask : ndarray (bool)
+        temporal mask [nt]; only timesteps where mask is True
+        are used
+
+    Returns
+    -------
+    labels : ndarray
+        sorted unique group labels. All labels occuring in groups are
+        returned, also if no timestep of the group is selected by mask
+    res : dict
+        for each statistic a masked array [ngroups,...]. Results are
+        masked where a group does not contain any valid value; the
+        count is never masked.
+    """
+    if stats is None:
+        stats = ['mean']
+    for s in stats:
+        if s not in valid_statistics:
+            raise ValueError('Invalid statistic: %s' % s)
+
+    groups = np.asarray(groups)
+    nt = len(x)
+    if groups.ndim != 1 or len(groups) != nt:
+        raise ValueError('Groups need to be 1-D of length of time!')
+    if mask is None:
+        mask = np.ones(nt, dtype='bool')
+    else:
+        mask = np.asarray(mask).astype('bool')
+        if mask.ndim != 1 or len(mask) != nt:
+            raise ValueError('Mask needs to be 1-D of length of time!')
+
+    labels, gidx = np.unique(groups, return_inverse=True)
+
+    # sort and segment the selected timesteps by group once
+    idx = np.nonzero(mask)[0]
+    order = np.argsort(gidx[idx], kind='mergesort')
+    idx = idx[order]
+    g = gidx[idx]
+    present, starts = np.unique(g, return_index=True)
+
+    shape = (len(labels),) + np.shape(x)[1:]
+    res = {}
+    if len(idx) == 0:
+        # no timestep selected at all
+        for s in stats:
+            if s == 'count':
+                res[s] = np.ma.array(np.zeros(shape, dtype='int'))
+            else:
+                res[s] = np.ma.array(np.zeros(shape), mask=np.ones(shape, dtype='bool'))
+        return labels, res
+
+    # avoid a copy of the data if no reordering is needed
+    if np.array_equal(idx, np.arange(nt)):
+        data = np.ma.getdata(x)
+        valid = ~np.ma.getmaskarray(x)
+    else:
+        data = np.ma.getdata(x)[idx]
+        valid = ~np.ma.getmaskarray(x)[idx]
+    valid &= ~np.isnan(data)
+
+    n = np.add.reduceat(valid, starts, axis=0, dtype='int')
+    d = np.where(valid, data, 0.)
+    s = np.add.reduceat(d, starts, axis=0, dtype='float64')
+    nn = np.maximum(n, 1)
+    invalid = n == 0
+
+    def _scatter(r, fill):
+        # results for all labels; groups without selected timesteps
+        # get the fill value
+        out = np.ones(shape, dtype=r.dtype) * fill
+        out[present] = r
+        return out
+
+    count = _scatter(n, 0)
+    msk = count == 0
+    for stat in stats:
+        if stat == 'count':
+            res[stat] = np.ma.array(count)
+        elif stat == 'sum':
+            res[stat] = np.ma.array(_scatter(s, 0.), mask=msk)
+        elif stat == 'mean':
+            res[stat] = np.ma.array(_scatter(s / nn, 0.), mask=msk)
+        elif stat == 'std':
+            # second pass on the deviations for numerical stability
+            m = np.repeat(s / nn, np.diff(np.append(starts, len(g))), axis=0)
+            v = np.add.reduceat(np.where(valid, (data - m) ** 2, 0.), starts, axis=0, dtype='float64')
+            res[stat] = np.ma.array(_scatter(np.sqrt(v / nn), 0.), mask=msk)
+        elif stat == 'min':
+            r = np.minimum.reduceat(np.where(valid, data, np.inf), starts, axis=0)
+            res[stat] = np.ma.array(_scatter(np.where(invalid, 0., r), 0.), mask=msk)
+        elif stat == 'max':
+            r = np.maximum.reduceat(np.where(valid, data, -np.inf), starts, axis=0)
+            res[stat] = np.ma.array(_scatter(np.where(invalid, 0., r), 0.), mask=msk)
+    return labels, res
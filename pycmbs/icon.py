@@ -8,6 +8,7 @@ For COPYING and LICENSE details, please refer to the LICENSE file
 from pycmbs.data import Data
 import os
 from pycmbs.netcdf import *
+from pycmbs.regrid import get_regridder, apply_weights, get_cell_area
 import numpy as np
 
 
@@ -37,6 +38,7 @@ class Icon(Data):
         Data.__init__(self, filename, varname, **kwargs)
         self.gridfile = gridfile
         self.gridtype = 'unstructured'
+        self.grid_uuid = None
 
 #---
 
@@ -87,6 +89,12 @@ class Icon(Data):
         self.vlon = File.get_variable('clon_vertices') * 180. / np.pi
         self.vlat = File.get_variable('clat_vertices') * 180. / np.pi
 
+        # unique identifier of the grid
+        if 'uuidOfHGrid' in File.F.ncattrs():
+            self.grid_uuid = str(File.F.getncattr('uuidOfHGrid'))
+        else:
+            self.grid_uuid = None
+
         File.close()
 
         #--- read time variable
@@ -107,3 +115,50 @@ class Icon(Data):
         #--- determine time --> convert to python timestep
         if self.time is not None:
             self.set_time()
+
+    def regrid(self, target='t63grid', method='nearest', cache=True, cache_dir=None, **kwargs):
+        """
+        regrid the data to a regular lat/lon grid. The weights are
+        calculated once per grid file and target grid with a KD-tree
+        of the cell centers and cached on disk (see pycmbs.regrid);
+        all timesteps are regridded with a single sparse matrix product
+
+        Parameters
+        ----------
+        target : str, tuple or Data
+            target grid; e.g. 't63grid', 'r360x180', (lon, lat) or a
+            Data object (see pycmbs.regrid.get_target_grid())
+        method : str
+            'nearest': value of the nearest cell
+            'idw': inverse distance weighting of the nearest cells
+            'overlap': weighting with the area of the cells within
+            the target cell
+        cache : bool
+            cache the weights on disk
+        cache_dir : str
+            directory of the disk cache; default is the temporary
+            directory of the system
+        kwargs : dict
+            parameters of the weights (k, power, nsub; see
+            pycmbs.regrid.Regridder.get_weights())
+
+        Returns
+        -------
+        C{Data} object on the target grid
+        """
+        if self.data is None or self.lon is None:
+            raise ValueError('ICON data needs to be read before regridding!')
+        R = get_regridder(self.lon, self.lat, vlon=getattr(self, 'vlon', None),
+                          vlat=getattr(self, 'vlat', None), key=self.grid_uuid)
+        W, lon, lat = R.get_weights(target, method=method, cache=cache,
+                                    cache_dir=cache_dir, **kwargs)
+
+        x = self._copy_result()
+        for attr in ['gridfile', 'gridtype', 'grid_uuid', 'vlon', 'vlat', 'ncell']:
+            x.__dict__.pop(attr, None)
+        x.lon, x.lat = np.meshgrid(lon, lat)
+        x.cell_area = get_cell_area(lon, lat)
+        d = apply_weights(W, self.data)
+        x.data = d.reshape(d.shape[:-2] + (len(lat), len(lon)))
+        x._set_grid()
+        return x
@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements on-demand access to netCDF variables. A LazyArray
+behaves like a read-only [time,ny,nx] array, but data is only read from
+file for the hyperslabs which are actually requested. All reads go
+through a bounded LRU cache of time chunks.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from pycmbs.netcdf import NetCDFHandler
+
+
+def _nbytes(x):
+    """ memory size of an array including its mask """
+    n = x.nbytes
+    if isinstance(x, np.ma.masked_array):
+        n += np.ma.getmaskarray(x).nbytes
+    return n
+
+
+class ChunkCache(object):
+
+    def __init__(self, maxbytes=512 * 1024 ** 2):
+        """
+        LRU cache for chunks read from files. The total size of all
+        cached chunks is bounded by maxbytes; least recently used
+        chunks are removed first
+
+        Parameters
+        ----------
+        maxbytes : int
+            maximum size of all cached chunks [bytes]
+        """
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """
+        return cached chunk or None if not in cache
+        """
+        if key not in self._items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value = self._items.pop(key)
+        self._items[key] = value  # most recently used now
+        return value
+
+    def put(self, key, value):
+        """
+        store a chunk in the cache. Chunks larger than the cache
+        are not stored at all
+        """
+        n = _nbytes(value)
+        if key in self._items:
+            self.nbytes -= _nbytes(self._items.pop(key))
+        if n > self.maxbytes:
+            return
+        self._evict(self.maxbytes - n)
+        self._items[key] = value
+        self.nbytes += n
+
+    def _evict(self, maxbytes):
+        while self.nbytes > maxbytes and len(self._items) > 0:
+            k, v = self._items.popitem(last=False)
+            self.nbytes -= _nbytes(v)
+
+    def set_size(self, maxbytes):
+        """
+        change maximum size of cache [bytes]
+        """
+        self.maxbytes = maxbytes
+        self._evict(maxbytes)
+
+    def clear(self):
+        self._items.clear()
+        self.nbytes = 0
+
+
+# cache shared by all LazyArray objects of the process
+default_cache = ChunkCache()
+
+
+def _index_to_slice(idx):
+    """
+    convert an index vector into a slice with positive step
+    which is used for reading from file
+
+    Returns
+    -------
+    the slice and the index which needs to be applied to the data
+    read with this slice (None if no further indexing is needed)
+    """
+    if len(idx) == 0:
+        return slice(0, 0), None
+    if len(idx) == 1:
+        return slice(idx[0], idx[0] + 1), None
+    d = np.diff(idx)
+    step = d[0]
+    if np.all(d == step) and step > 0:
+        return slice(idx[0], idx[-1] + 1, step), None
+    elif np.all(d == step) and step < 0:
+        return slice(idx[-1], idx[0] + 1, -step), slice(None, None, -1)
+    else:
+        # irregular index (e.g. regions crossing the dateline)
+        i1 = idx.min()
+        return slice(i1, idx.max() + 1), idx - i1
+
+
+# attributes of masked arrays which are available for LazyArray
+_array_attributes = set(['mask', 'data', 'filled', 'compressed', 'count',
+                         'mean', 'sum', 'std', 'var', 'min', 'max', 'ptp',
+                         'any', 'all', 'argmin', 'argmax', 'cumsum',
+                         'reshape', 'flatten', 'ravel', 'squeeze', 'T',
+                         'transpose', 'astype', 'tolist', 'nonzero',
+                         'clip', 'round', 'recordmask'])
+
+
+class LazyArray(object):
+
+    def __init__(self, filename, varname, level=None, fill_value=None,
+                 scale_factor=1., valid_mask=None, chunksize=None,
+                 cache=None, dtype='float64', netcdf_backend='netCDF4'):
+        """
+        read-only array proxy for a netCDF variable with geometry
+        [time,ny,nx] or [time,level,ny,nx]
+
+        Indexing a LazyArray returns a masked array and reads only the
+        required time chunks from file. window() returns a new
+        LazyArray for a subset of the data without any I/O.
+        All other array operations trigger reading of the full data.
+
+        Parameters
+        ----------
+        filename : str
+            name of netCDF file
+        varname : str
+            name of variable
+        level : int
+            level index for 4D variables
+        fill_value : float
+            values equal to fill_value are masked
+        scale_factor : float
+            factor the data is multiplied with after reading
+        valid_mask : ndarray (bool)
+            mask [ny,nx] on file geometry; data where valid_mask
+            is False is masked
+        chunksize : int
+            number of timesteps per chunk. If None, chunks of
+            about 16MB are used
+        cache : ChunkCache
+            cache to be used. If None, the default cache of the
+            process is used
+        dtype : str
+            datatype of the data returned ['float32','float64']
+        """
+        self.filename = filename
+        self.varname = varname
+        self.level = level
+        self.fill_value = fill_value
+        self.scale_factor = scale_factor
+        self.valid_mask = valid_mask
+        self.dtype = np.dtype(dtype)
+        self.netcdf_backend = netcdf_backend
+        if cache is None:
+            cache = default_cache
+        self.cache = cache
+
+        F = NetCDFHandler(netcdf_backend=netcdf_backend)
+        F.open_file(filename, 'r')
+        fshape = F.get_variable_handler(varname).shape
+        F.close()
+
+        if len(fshape) == 4:
+            if level is None:
+                raise ValueError('4-dimensional variables need a level!')
+            fshape = (fshape[0], fshape[2], fshape[3])
+        elif len(fshape) != 3:
+            raise ValueError('LazyArray only supports [time,ny,nx] or [time,level,ny,nx] variables')
+        self._fshape = fshape
+
+        if chunksize is None:
+            chunksize = max(1, (16 * 1024 ** 2) // (self.dtype.itemsize * fshape[1] * fshape[2]))
+        self.chunksize = chunksize
+
+        # absolute indices on file for each dimension of the current window
+        self._index = tuple([np.arange(n) for n in fshape])
+
+        # cyclic field which is subtracted from the data (see subtract_cycle())
+        self._cycle = None
+
+    def _get_shape(self):
+        return tuple([len(x) for x in self._index])
+    shape = property(_get_shape)
+
+    def _get_ndim(self):
+        return len(self._index)
+    ndim = property(_get_ndim)
+
+    def _get_size(self):
+        return int(np.prod(self.shape))
+    size = property(_get_size)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _normalize_key(self, key):
+        """
+        expand key to a tuple with one entry per dimension
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        ell = [i for i, k in enumerate(key) if k is Ellipsis]
+        if len(ell) > 0:
+            i = ell[0]
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1:]
+        if len(key) > self.ndim:
+            raise IndexError('too many indices for LazyArray')
+        return key + (slice(None),) * (self.ndim - len(key))
+
+    def _is_basic(self, key):
+        for k in key:
+            if not isinstance(k, (slice, int, long, np.integer)):
+                return False
+        return True
+
+    def window(self, key):
+        """
+        return a new LazyArray for a subset of the current data.
+        No data is read.
+
+        Parameters
+        ----------
+        key : tuple
+            tuple of slices or integer index vectors
+        """
+        key = self._normalize_key(key)
+        for k in key:
+            if isinstance(k, slice):
+                continue
+            if np.ndim(k) != 1 or not np.issubdtype(np.asarray(k).dtype, np.integer):
+                raise ValueError('Only slices or index vectors are supported for windows')
+        r = self.copy()
+        r._index = tuple([i[k] for i, k in zip(self._index, key)])
+        if self._cycle is not None:
+            cycle, phase = self._cycle
+            r._cycle = (cycle[:, key[1], :][:, :, key[2]], phase)
+        return r
+
+    def copy(self):
+        """
+        shallow copy sharing file and cache
+        """
+        r = object.__new__(self.__class__)
+        r.__dict__.update(self.__dict__)
+        r.__dict__.pop('_loaded', None)
+        return r
+
+    def _chunk_key(self, c):
+        return (self.filename, self.varname, self.level, c, self.chunksize,
+                self.dtype.name, tuple(self._index[1]), tuple(self._index[2]))
+
+    def _read_hyperslab(self, tslice):
+        """
+        read data for a range of timesteps on file and the
+        spatial window of the current object
+        """
+        ysl, ysel = _index_to_slice(self._index[1])
+        xsl, xsel = _index_to_slice(self._index[2])
+
+        F = NetCDFHandler(netcdf_backend=self.netcdf_backend)
+        F.open_file(self.filename, 'r')
+        var = F.get_variable_handler(self.varname)
+        if self.level is None:
+            x = var[tslice, ysl, xsl]
+        else:
+            x = var[tslice, self.level, ysl, xsl]
+        F.close()
+
+        if ysel is not None:
+            x = x[:, ysel, :]
+        if xsel is not None:
+            x = x[:, :, xsel]
+        return x
+
+    def _read_chunk(self, c):
+        """
+        get chunk number c either from cache or from file
+
+        Returns
+        -------
+        masked array [nt_chunk,ny,nx] where invalid values are set to NaN
+        """
+        key = self._chunk_key(c)
+        x = self.cache.get(key)
+        if x is not None:
+            return x
+
+        t1 = c * self.chunksize
+        t2 = min(t1 + self.chunksize, self._fshape[0])
+        x = np.ma.asarray(self._read_hyperslab(slice(t1, t2))).astype(self.dtype)
+        msk = np.ma.getmaskarray(x) | np.isnan(x.data)
+        if self.fill_value is not None:
+            msk |= x.data == self.fill_value
+        d = x.data
+        d[msk] = np.nan
+        x = np.ma.array(d, mask=msk)
+
+        self.cache.put(key, x)
+        return x
+
+    def __getitem__(self, key):
+        key = self._normalize_key(key)
+        if not self._is_basic(key):
+            return self.load()[key]
+
+        tkey, ykey, xkey = key
+        tidx = np.atleast_1d(self._index[0][tkey])
+        cidx = tidx // self.chunksize
+
+        res = None
+        for c in np.unique(cidx):
+            pos = np.nonzero(cidx == c)[0]
+            x = self._read_chunk(c)[tidx[pos] - c * self.chunksize][:, ykey, xkey]
+            if res is None:
+                res = np.ma.array(np.ones((len(tidx),) + x.shape[1:], dtype=self.dtype) * np.nan,
+                                  mask=np.ones((len(tidx),) + x.shape[1:], dtype='bool'))
+            res[pos] = x
+        if res is None:  # empty selection
+            res = np.ma.array(np.zeros((0,) + np.zeros(self.shape[1:])[ykey, xkey].shape,
+                                       dtype=self.dtype))
+
+        if self.scale_factor != 1.:
+            res *= self.scale_factor
+        if self.valid_mask is not None:
+            invalid = ~self.valid_mask[self._index[1], :][:, self._index[2]][ykey, xkey]
+            res = np.ma.array(np.where(invalid, np.nan, res.data).astype(self.dtype),
+                              mask=np.ma.getmaskarray(res) | invalid)
+        if self._cycle is not None:
+            cycle, phase = self._cycle
+            off = cycle[phase[tidx]][:, ykey, xkey]
+            res = res - off
+            msk = np.ma.getmaskarray(res)
+            res = np.ma.array(np.where(msk, np.nan, res.data).astype(self.dtype), mask=msk)
+
+        if not isinstance(tkey, slice):
+            res = res[0]
+        return res
+
+    def __setitem__(self, key, value):
+        raise TypeError('LazyArray is read-only; load() the data first')
+
+    def iter_chunks(self, chunksize=None, cache=None):
+        """
+        iterate over the data in portions of the chunk size
+
+        Parameters
+        ----------
+        chunksize : int
+            number of timesteps per portion; default: self.chunksize
+        cache : ChunkCache
+            cache used for reading instead of the cache of the
+            object, e.g. a small private cache which keeps a pass
+            over a large file within a memory budget
+
+        Returns
+        -------
+        generator of (i1, i2, data) with data = self[i1:i2]
+        """
+        x = self
+        if chunksize is not None or cache is not None:
+            x = self.copy()
+            if chunksize is not None:
+                x.chunksize = chunksize
+            if cache is not None:
+                x.cache = cache
+        nt = self.shape[0]
+        for i1 in xrange(0, nt, x.chunksize):
+            i2 = min(i1 + x.chunksize, nt)
+            yield i1, i2, x[i1:i2]
+
+    def subtract_cycle(self, cycle):
+        """
+        returns a new LazyArray from which a cyclic field (e.g. a mean
+        seasonal cycle) is subtracted when data is read. No data is
+        read.
+
+        Parameters
+        ----------
+        cycle : ndarray
+            field [ncycle,ny,nx] on the geometry of the current
+            window; cycle[i % ncycle] is subtracted from timestep i
+            of the current window
+        """
+        if self._cycle is not None:
+            raise ValueError('A cycle was already subtracted!')
+        cycle = np.ma.asarray(cycle).astype(self.dtype)
+        nc = len(cycle)
+        if cycle.shape[1:] != self.shape[1:]:
+            raise ValueError('Cycle has inconsistent geometry!')
+        # phase of the cycle for each timestep on file
+        phase = np.zeros(self._fshape[0], dtype='int')
+        phase[self._index[0]] = np.arange(len(self._index[0])) % nc
+        r = self.copy()
+        r._cycle = (cycle, phase)
+        return r
+
+    def load(self):
+        """
+        read all data of the current window
+
+        Returns
+        -------
+        masked array
+        """
+        return self[:]
+
+    def __array__(self, dtype=None):
+        x = self.load()
+        if dtype is not None:
+            x = x.astype(dtype)
+        return x
+
+    def _get_loaded(self):
+        # data of the window, read on first use and kept. It is
+        # read-only, as modifications would not be seen by reductions
+        # and other readers, which read from file again
+        x = self.__dict__.get('_loaded')
+        if x is None:
+            x = self.load()
+            x.flags.writeable = False
+            if x._mask is not np.ma.nomask:
+                x._mask.flags.writeable = False
+                x._sharedmask = True
+            self.__dict__['_loaded'] = x
+        return x
+
+    def __getattr__(self, name):
+        # the array attributes/methods of _array_attributes operate on
+        # the full data of the window, which is read only once. Arrays
+        # obtained this way (e.g. mask, data) are read-only; load() the
+        # data to modify it
+        if name not in _array_attributes:
+            raise AttributeError(name)
+        return getattr(self._get_loaded(), name)
+
+    def __repr__(self):
+        return 'LazyArray(%s, %s, shape=%s)' % (self.filename, self.varname, str(self.shape))
+
+
+def _forward(name):
+    def f(self, *args):
+        return getattr(self.load(), name)(*args)
+    f.__name__ = name
+    return f
+
+# arithmetic operations are done on the loaded data; inplace operations
+# thus also result in a normal masked array
+for _name in ['__add__', '__radd__', '__sub__', '__rsub__', '__mul__',
+              '__rmul__', '__div__', '__rdiv__', '__truediv__',
+              '__rtruediv__', '__pow__', '__neg__', '__abs__',
+              '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__']:
+    setattr(LazyArray, _name, _forward(_name))
+for _name in ['add', 'sub', 'mul', 'div', 'truediv', 'pow']:
+    setattr(LazyArray, '__i%s__' % _name, _forward('__%s__' % _name))
@@ -188,7 +188,7 @@ class MapPlotGeneric(object):
         else:
             self.savefile = self.savefile[:-3] + tok + '.nc'
         self.x.save(self.savefile, timmean=timmean, delete=True,
-                    mean=False)
+                    mean=False, chunking='map')
 
     def save(self, save_mean=True, save_all=False):
         """
@@ -726,6 +726,10 @@ class SingleMap(MapPlotGeneric):
         """
         #~ assert(isinstance(x, Data))
         super(SingleMap, self).__init__(**kwargs)
+        if hasattr(x, '_is_packed') and x._is_packed():
+            # maps are plotted from the expanded data
+            x = x.copy()
+            x.unpack()
         self.x = x
 
         self.pax = None  # axis for plot
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module provides the helpers to handle a dataset which is split
+into several files along the time axis (e.g. CMIP5 time slices) as a
+single dataset (see Data.read()). Only the time variables of the files
+are read to decide which files are needed.
+"""
+
+import os
+import glob
+
+import numpy as np
+
+from pycmbs.netcdf import NetCDFHandler
+
+
+def is_file_pattern(filename):
+    """
+    check if a filename specifies several files
+
+    Parameters
+    ----------
+    filename : str or list
+        list of filenames or filename with wildcards (*, ?, [])
+
+    Returns
+    -------
+    True for lists and wildcard patterns which are not the name of
+    an existing file
+    """
+    if isinstance(filename, (list, tuple)):
+        return True
+    if not isinstance(filename, basestring) or os.path.exists(filename):
+        return False
+    return glob.has_magic(filename)
+
+
+def expand_filenames(filename):
+    """
+    returns the sorted list of files for a list of filenames or
+    wildcard patterns
+    """
+    if isinstance(filename, basestring):
+        filename = [filename]
+    res = []
+    for f in filename:
+        if glob.has_magic(f) and not os.path.exists(f):
+            res += glob.glob(f)
+        else:
+            res.append(f)
+    return sorted(set(res))
+
+
+def read_time_header(filename, time_var='time'):
+    """
+    read the time variable of a file without reading any data
+
+    Parameters
+    ----------
+    filename : str
+        name of netCDF file
+    time_var : str
+        name of time variable
+
+    Returns
+    -------
+    time : ndarray
+        time values; None if the file has no time variable
+    time_str : str
+        units of the time variable
+    calendar : str
+        calendar of the time variable
+    """
+    if not os.path.exists(filename):
+        raise ValueError('Error: file not existing: %s' % filename)
+    File = NetCDFHandler()
+    File.open_file(filename, 'r')
+    try:
+        if time_var not in File.get_variable_keys():
+            return None, None, None
+        tvar = File.get_variable_handler(time_var)
+        time_str = getattr(tvar, 'units', None)
+        calendar = getattr(tvar, 'calendar', 'standard')
+        if calendar == 'climatology_bounds':
+            calendar = 'standard'
+        return np.asarray(File.get_variable(time_var)).flatten(), time_str, calendar
+    finally:
+        File.close()
@@ -9,9 +9,193 @@ This module allows a flexible choice of the netCDF backend
 """
 
 import os
+from collections import OrderedDict
+
+import numpy as np
 
 valid_backends = ['netCDF4']
 
+# chunking strategies for variables [time,ny,nx]
+# 'time': chunks contain the full time series of spatial tiles
+# 'map': chunks contain single timesteps
+valid_chunkings = ['time', 'map']
+
+# names of variables which are treated as coordinates in addition to
+# variables which have the same name as their dimension
+coordinate_names = ['lat', 'lon', 'latitude', 'longitude', 'time']
+
+
+class FilePool(object):
+
+    def __init__(self, maxfiles=32):
+        """
+        pool of netCDF files opened for reading
+
+        Files are kept open after they have been closed by a
+        NetCDFHandler, so that opening the same file again does not
+        require to parse the file header again. Files are identified
+        by their path and modification time, thus modified files are
+        opened again. If more than maxfiles files are open, the least
+        recently used files which are not in use are closed.
+        Decoded coordinate variables are cached for each file.
+
+        Parameters
+        ----------
+        maxfiles : int
+            maximum number of open files; 0 disables the pool
+        """
+        self.maxfiles = maxfiles
+        self.hits = 0
+        self.misses = 0
+        self._files = OrderedDict()  # key --> file handler
+        self._users = {}  # key --> number of handlers using the file
+        self._coordinates = {}  # key --> {varname: data}
+
+    def __len__(self):
+        return len(self._files)
+
+    def _get_key(self, filename):
+        filename = os.path.realpath(filename)
+        return (filename, os.stat(filename).st_mtime)
+
+    def open(self, filename, handler):
+        """
+        get a file handler for reading
+
+        Parameters
+        ----------
+        filename : str
+            name of file
+        handler : module
+            netCDF backend module which is used to open the file
+
+        Returns
+        -------
+        key and file handler. The key needs to be provided to
+        release() when the file is not used anymore
+        """
+        key = self._get_key(filename)
+        if key in self._files:
+            self.hits += 1
+            F = self._files.pop(key)
+        else:
+            self.misses += 1
+            # a previous version of the file is not valid anymore
+            self.remove(filename)
+            F = handler.Dataset(filename, mode='r')
+            self._coordinates[key] = {}
+        self._files[key] = F  # most recently used now
+        self._users[key] = self._users.get(key, 0) + 1
+        self._evict(self.maxfiles)
+        return key, F
+
+    def release(self, key):
+        """
+        release a file which was obtained by open()
+        """
+        self._users[key] -= 1
+        self._evict(self.maxfiles)
+
+    def _close(self, key):
+        self._files.pop(key).close()
+        del self._users[key]
+        del self._coordinates[key]
+
+    def _evict(self, maxfiles):
+        for key in list(self._files.keys()):
+            if len(self._files) <= maxfiles:
+                break
+            if self._users[key] == 0:
+                self._close(key)
+
+    def remove(self, filename):
+        """
+        close all versions of a file which are not in use anymore.
+        This needs to be done before a file is written
+        """
+        filename = os.path.realpath(filename)
+        for key in list(self._files.keys()):
+            if key[0] == filename and self._users[key] == 0:
+                self._close(key)
+
+    def get_coordinate(self, key, varname):
+        """
+        return cached coordinate variable or None if not in cache
+        """
+        return self._coordinates[key].get(varname)
+
+    def set_coordinate(self, key, varname, value):
+        self._coordinates[key][varname] = value
+
+    def set_size(self, maxfiles):
+        """
+        change the maximum number of open files
+        """
+        self.maxfiles = maxfiles
+        self._evict(maxfiles)
+
+    def clear(self):
+        """
+        close all files which are not in use
+        """
+        self._evict(0)
+
+
+def get_chunksizes(shape, chunking, itemsize=8, chunkbytes=2 ** 20):
+    """
+    determine chunk sizes for a variable
+
+    Parameters
+    ----------
+    shape : tuple
+        shape of the variable [ny,nx] or [nt,ny,nx]
+    chunking : str
+        'time': time contiguous chunks of spatial tiles; this results
+        in fast access to timeseries
+        'map': each chunk contains spatial tiles of a single timestep;
+        this results in fast access to maps
+    itemsize : int
+        size of a single value [bytes]
+    chunkbytes : int
+        approximate size of a chunk [bytes]
+
+    Returns
+    -------
+    tuple with chunk size for each dimension
+    """
+    if chunking not in valid_chunkings:
+        raise ValueError('Invalid chunking: %s' % chunking)
+    if len(shape) not in [2, 3]:
+        raise ValueError('Chunking only supported for 2D or 3D variables')
+    shape = tuple([max(int(n), 1) for n in shape])
+    n = max(chunkbytes // itemsize, 1)
+    if len(shape) == 3 and chunking == 'time':
+        nt = (min(shape[0], n),)
+        n = max(n // nt[0], 1)
+    elif len(shape) == 3:
+        nt = (1,)
+    else:
+        nt = ()
+
+    # about square spatial tile with n values
+    ny, nx = shape[-2:]
+    ty = min(ny, max(int(np.sqrt(n)), 1))
+    tx = min(nx, max(n // ty, 1))
+    ty = min(ny, max(n // tx, 1))
+    return nt + (ty, tx)
+
+
+# pool shared by all NetCDFHandler objects of the process
+default_pool = FilePool()
+
+
+def set_max_open_files(n):
+    """
+    set the maximum number of netCDF files which are kept open
+    for reading. n=0 disables keeping files open.
+    """
+    default_pool.set_size(n)
+
 
 class NetCDFHandler(object):
 
@@ -26,6 +210,7 @@ class NetCDFHandler(object):
 
         """
         self.type = netcdf_backend
+        self._pool_key = None
 
         if self.type not in valid_backends:
             raise ValueError('Invalid data backend!')
@@ -46,7 +231,7 @@ class NetCDFHandler(object):
         filename : str
             name of file to read
         mode : str
-            specify read or write data access ['w','r']
+            specify read, write or append data access ['w','r','a']
         format : str
             output file format specifieralue
             ['NETCDF4', 'NETCDF4_CLASSIC', 'NETCDF3_64BIT', or 'NETCDF3_CLASSIC']
@@ -56,9 +241,9 @@ class NetCDFHandler(object):
         F : file handler
             returns a file handler
         """
-        if mode not in ['w', 'r']:
-            raise ValueError('ERROR: Invalid mode! [w,r], %s' % mode)
-        if mode == 'r':
+        if mode not in ['w', 'r', 'a']:
+            raise ValueError('ERROR: Invalid mode! [w,r,a], %s' % mode)
+        if mode in ['r', 'a']:
             if not os.path.exists(filename):
                 raise ValueError('ERROR: File not existing: %s' % filename)
         elif mode == 'w':
@@ -72,10 +257,17 @@ class NetCDFHandler(object):
 
         if self.type.lower() == 'netcdf4':
             if mode == 'r':
-                self.F = self.handler.Dataset(filename, mode=mode)
+                if default_pool.maxfiles > 0:
+                    self._pool_key, self.F = default_pool.open(filename, self.handler)
+                else:
+                    self.F = self.handler.Dataset(filename, mode=mode)
             elif mode == 'w':
+                default_pool.remove(filename)
                 self.F = self.handler.Dataset(filename, mode=mode,
                                               format=format)  # TODO check format
+            elif mode == 'a':
+                default_pool.remove(filename)
+                self.F = self.handler.Dataset(filename, mode=mode)
             self.create_dimension = self.F.createDimension
             self.create_variables = self.F.createVariable
         else:
@@ -124,7 +316,8 @@ class NetCDFHandler(object):
         else:
             raise ValueError('Invalid backend!')
 
-    def get_variable(self, varname):
+    def get_variable(self, varname, time_slice=None, level=None,
+                     y_slice=None, x_slice=None, dtype='float'):
         """
         Get data for a particular variable
 
@@ -132,6 +325,22 @@ class NetCDFHandler(object):
         ----------
         varname : str
             variable name of the netcdf variable to read
+        time_slice : slice
+            if given, only this range of the first (time) dimension
+            is read from file
+        level : int, slice or ndarray
+            if given, only this index (or these indices, given as
+            slice or ascending index vector) of the second (level)
+            dimension of a 4D variable is read from file
+        y_slice : slice
+            if given, only this range of the second last (y) dimension
+            is read from file
+        x_slice : slice or tuple of slices
+            if given, only this range of the last (x) dimension is
+            read. If several slices are given, the results are
+            concatenated (e.g. for regions crossing the dateline)
+        dtype : str
+            datatype of the returned array ['float','float32', ...]
 
         Returns
         -------
@@ -139,7 +348,79 @@ class NetCDFHandler(object):
             returns data as a 2D,3D numpy array
         """
         if self.type.lower() == 'netcdf4':
-            return self.F.variables[varname][:].astype('float').copy()
+            var = self.F.variables[varname]
+            if self._is_coordinate(varname):
+                var = self._get_coordinate(varname)
+                # copy, as the cached array must not be modified
+                if var.ndim == 0:
+                    return var.astype(dtype)
+                key = [slice(None)] * var.ndim
+                if time_slice is not None:
+                    key[0] = time_slice
+                if y_slice is not None and var.ndim >= 2:
+                    key[-2] = y_slice
+                if x_slice is None or isinstance(x_slice, slice):
+                    if x_slice is not None:
+                        key[-1] = x_slice
+                    return var[tuple(key)].astype(dtype)
+            # the netCDF library returns a new array; thus astype
+            # does not need to copy it again if the datatype is the same
+            if var.ndim == 0:
+                return var[:].astype(dtype)
+            key = [slice(None)] * var.ndim
+            if time_slice is not None:
+                key[0] = time_slice
+            if level is not None:
+                if var.ndim != 4:
+                    raise ValueError('A level can only be specified for 4D variables: %s' % varname)
+                key[1] = level
+            if y_slice is not None:
+                if var.ndim < 2:
+                    raise ValueError('Can not apply y slice to 1D variable %s' % varname)
+                key[-2] = y_slice
+            if x_slice is None or isinstance(x_slice, slice):
+                if x_slice is not None:
+                    key[-1] = x_slice
+                x = var[tuple(key)]
+                if x.dtype == np.dtype(dtype):
+                    return x
+                return x.astype(dtype)
+
+            res = []
+            for xs in x_slice:
+                key[-1] = xs
+                res.append(var[tuple(key)].astype(dtype))
+            return np.ma.concatenate(res, axis=-1)
+        else:
+            raise ValueError('Something went wrong!')
+
+    def _is_coordinate(self, varname):
+        """
+        check if a variable is a coordinate variable which is cached
+        """
+        if self._pool_key is None:
+            return False
+        if varname in coordinate_names:
+            return True
+        return self.F.variables[varname].dimensions == (varname,)
+
+    def _get_coordinate(self, varname):
+        """
+        get the data of a coordinate variable from the cache of the
+        pool; the variable is read if not cached yet
+        """
+        x = default_pool.get_coordinate(self._pool_key, varname)
+        if x is None:
+            x = self.F.variables[varname][:]
+            default_pool.set_coordinate(self._pool_key, varname, x)
+        return x
+
+    def get_dimensions(self, varname):
+        """
+        return the names of the dimensions of a variable
+        """
+        if self.type.lower() == 'netcdf4':
+            return self.F.variables[varname].dimensions
         else:
             raise ValueError('Something went wrong!')
 
@@ -206,17 +487,44 @@ class NetCDFHandler(object):
         else:
             return None
 
-    def assign_value(self, varname, value):
+    def assign_value(self, varname, value, slabbytes=2 ** 26):
         """
         assign a value to a variable to be written to a netCDF file
+
+        3D arrays are written in slabs along the first dimension, thus
+        the data is never converted to the datatype of the variable as
+        a whole (useful for e.g. memory mapped or lazy data)
+
+        Parameters
+        ----------
+        varname : str
+            name of variable
+        value : ndarray
+            data to be written
+        slabbytes : int
+            approximate size of the slabs written at once [bytes]
         """
         if self.type.lower() == 'netcdf4':
+            var = self.F.variables[varname]
             if value.ndim == 1:
-                self.F.variables[varname][:] = value[:]
+                var[:] = value[:]
             elif value.ndim == 2:
-                self.F.variables[varname][:, :] = value[:, :]
+                var[:, :] = value[:, :]
             elif value.ndim == 3:
-                self.F.variables[varname][:, :, :] = value[:, :, :]
+                nt = value.shape[0]
+                n = max(1, slabbytes // max(1, var.dtype.itemsize * value[0].size))
+                # align slabs with chunks in time to avoid that chunks
+                # are compressed several times
+                chunks = var.chunking()
+                if chunks != 'contiguous' and chunks[0] > 1:
+                    n = max(1, n // chunks[0]) * chunks[0]
+                slabs = [(i, min(i + n, nt)) for i in xrange(0, nt, n)]
+
+                # slabs are read and written one after the other, as
+                # lazy data is read through the (not thread safe) file
+                # pool and chunk cache
+                for i1, i2 in slabs:
+                    var[i1:i2, :, :] = np.ma.asarray(value[i1:i2, :, :]).astype(var.dtype)
             else:
                 raise ValueError('Unsupported dimension!')
         else:
@@ -239,7 +547,8 @@ class NetCDFHandler(object):
         else:
             raise ValueError('Something went wrong!')
 
-    def create_variable(self, varname, dtype, dim, complevel=6, zlib=True, fill_value=None):
+    def create_variable(self, varname, dtype, dim, complevel=6, zlib=True,
+                        fill_value=None, shuffle=True, chunking=None):
         """
         create a new variable in a netCDF file
 
@@ -255,17 +564,41 @@ class NetCDFHandler(object):
             compression level
         fill_value : float
             fill value for data
+        shuffle : bool
+            apply the HDF5 shuffle filter before compression
+        chunking : str or tuple
+            chunking of the variable; either a tuple with chunk sizes,
+            a strategy ['time','map'] (see get_chunksizes()) or None
+            for the default chunking of the library
         """
 
         if self.type.lower() == 'netcdf4':
-            if fill_value is not None:
-                self.F.createVariable(varname, dtype, dimensions=dim,
-                                      fill_value=fill_value, zlib=zlib, complevel=complevel)
-            else:
-                self.F.createVariable(
-                    varname, dtype, dimensions=dim, zlib=zlib, complevel=complevel)
+            chunksizes = chunking
+            if isinstance(chunking, str):
+                shape = [len(self.F.dimensions[d]) for d in dim]
+                if len(shape) not in [2, 3]:
+                    chunksizes = None
+                else:
+                    chunksizes = get_chunksizes(shape, chunking,
+                                                itemsize=np.dtype(dtype).itemsize)
+            self.F.createVariable(varname, dtype, dimensions=dim,
+                                  fill_value=fill_value, zlib=zlib,
+                                  complevel=complevel, shuffle=shuffle,
+                                  chunksizes=chunksizes)
         else:
             raise ValueError('Something went wrong!')
 
     def close(self):
-        self.F.close()
+        """
+        close the file; files opened for reading are only released to
+        the pool. Closing a handler again has no effect
+        """
+        if getattr(self, 'F', None) is None:
+            return
+        if self._pool_key is not None:
+            # file is kept open in the pool
+            default_pool.release(self._pool_key)
+            self._pool_key = None
+        else:
+            self.F.close()
+        self.F = None
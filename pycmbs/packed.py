@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements a packed storage of fields for which only a part
+of the grid cells is valid (e.g. land only data). A PackedArray stores
+the data as [time,ncells] for the valid cells only, together with a
+PackingIndex which maps these cells back to the [ny,nx] grid. Indices
+are shared by all arrays with the same set of valid cells.
+"""
+
+import hashlib
+import weakref
+
+import numpy as np
+
+# all packing indices currently in use
+_indices = weakref.WeakValueDictionary()
+
+
+def get_packing_index(valid):
+    """
+    returns the shared C{PackingIndex} for a set of valid cells
+
+    Parameters
+    ----------
+    valid : ndarray (bool)
+        cells [ny,nx] which are stored
+
+    Returns
+    -------
+    C{PackingIndex} object
+    """
+    valid = np.asarray(valid, dtype='bool')
+    if valid.ndim != 2:
+        raise ValueError('Packing requires a 2D mask of valid cells!')
+    h = hashlib.sha1(str(valid.shape))
+    h.update(np.ascontiguousarray(valid).data)
+    key = h.hexdigest()
+    P = _indices.get(key)
+    if P is None:
+        P = PackingIndex(valid, key=key)
+        _indices[key] = P
+    return P
+
+
+class PackingIndex(object):
+
+    def __init__(self, valid, key=None):
+        """
+        index of the valid cells of a [ny,nx] grid; use
+        get_packing_index() to obtain shared instances
+
+        Parameters
+        ----------
+        valid : ndarray (bool)
+            cells [ny,nx] which are stored
+        key : str
+            hash of the mask
+        """
+        self.key = key
+        self.valid = np.array(valid, dtype='bool')
+        self.valid.flags.writeable = False
+        self.shape = self.valid.shape
+        self.cells = np.flatnonzero(self.valid)
+        self.cells.flags.writeable = False
+
+    def __len__(self):
+        return len(self.cells)
+
+    def pack(self, x):
+        """
+        extract the valid cells of an array
+
+        Parameters
+        ----------
+        x : ndarray or PackedArray
+            array [...,ny,nx]
+
+        Returns
+        -------
+        array [...,ncells]; None if x is None
+        """
+        if x is None:
+            return None
+        if isinstance(x, PackedArray):
+            if x.index is self:
+                return x.values
+            x = x.load()
+        if np.shape(x)[-2:] != self.shape:
+            raise ValueError('Array has inconsistent geometry!')
+        if not isinstance(x, np.ma.MaskedArray):
+            x = np.asarray(x)
+        return x.reshape(x.shape[:-2] + (-1,))[..., self.cells]
+
+    def unpack(self, values):
+        """
+        expand packed values to the full grid. Cells which are not
+        stored are masked
+
+        Parameters
+        ----------
+        values : ndarray
+            array [...,ncells]
+
+        Returns
+        -------
+        masked array [...,ny,nx]
+        """
+        values = np.ma.asarray(values)
+        lead = values.shape[:-1]
+        n = int(np.prod(lead))
+        if values.dtype.kind == 'f':
+            d = np.ones((n, self.valid.size), dtype=values.dtype) * np.nan
+        else:
+            d = np.zeros((n, self.valid.size), dtype=values.dtype)
+        m = np.ones((n, self.valid.size), dtype='bool')
+        d[:, self.cells] = values.data.reshape(n, -1)
+        m[:, self.cells] = np.ma.getmaskarray(values).reshape(n, -1)
+        return np.ma.array(d.reshape(lead + self.shape), mask=m.reshape(lead + self.shape))
+
+
+class PackedArray(object):
+
+    def __init__(self, values, index):
+        """
+        array proxy for fields [time,ny,nx] or [ny,nx] of which only
+        the cells of a C{PackingIndex} are stored
+
+        Reductions of C{Data} (e.g. timmean(), fldmean()) work on
+        the packed values directly. Elementwise arithmetic with
+        scalars or arrays packed with the same index returns a
+        PackedArray again. All other array operations are done on
+        the expanded data. A PackedArray is never modified in place.
+
+        Parameters
+        ----------
+        values : masked array
+            data [time,ncells] or [ncells]
+        index : PackingIndex
+            index of the stored cells
+        """
+        values = np.ma.asarray(values)
+        if values.shape[-1:] != (len(index),):
+            raise ValueError('Values do not match the packing index!')
+        if values.ndim not in [1, 2]:
+            raise ValueError('PackedArray only supports [time,ny,nx] or [ny,nx] fields')
+        self.values = values
+        self.index = index
+
+    def _get_shape(self):
+        return self.values.shape[:-1] + self.index.shape
+    shape = property(_get_shape)
+
+    def _get_ndim(self):
+        return self.values.ndim + 1
+    ndim = property(_get_ndim)
+
+    def _get_size(self):
+        return int(np.prod(self.shape))
+    size = property(_get_size)
+
+    def _get_dtype(self):
+        return self.values.dtype
+    dtype = property(_get_dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def copy(self):
+        return PackedArray(self.values.copy(), self.index)
+
+    def load(self):
+        """
+        expand the data to the full grid
+
+        Returns
+        -------
+        masked array
+        """
+        return self.index.unpack(self.values)
+
+    def __getitem__(self, key):
+        if self.ndim == 3:
+            # timesteps are selected before expanding
+            if not isinstance(key, tuple):
+                key = (key,)
+            if len(key) > 0 and key[0] is not Ellipsis:
+                x = self.index.unpack(self.values[key[0]])
+                if np.ndim(x) == 2:  # single timestep
+                    return x[key[1:]]
+                return x[(slice(None),) + key[1:]]
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        raise TypeError('PackedArray is read-only; unpack() the data first')
+
+    def __array__(self, dtype=None):
+        x = self.load()
+        if dtype is not None:
+            x = x.astype(dtype)
+        return x
+
+    def __getattr__(self, name):
+        # all other array attributes/methods operate on the full data,
+        # which is expanded on each access. Arrays obtained this way
+        # (e.g. mask, data) are read-only, as modifications would be
+        # lost; unpack() the data to modify it
+        if name.startswith('__') or name in ['values', 'index']:
+            raise AttributeError(name)
+        x = self.load()
+        x.flags.writeable = False
+        if x._mask is not np.ma.nomask:
+            x._mask.flags.writeable = False
+            x._sharedmask = True
+        return getattr(x, name)
+
+    def __repr__(self):
+        return 'PackedArray(shape=%s, ncells=%i)' % (str(self.shape), len(self.index))
+
+
+def _elementwise(name):
+    def f(self, *args):
+        if len(args) == 0:
+            return PackedArray(getattr(self.values, name)(), self.index)
+        o = args[0]
+        if isinstance(o, PackedArray) and o.index is self.index and o.ndim == self.ndim:
+            return PackedArray(getattr(self.values, name)(o.values), self.index)
+        if np.isscalar(o):
+            return PackedArray(getattr(self.values, name)(o), self.index)
+        return getattr(self.load(), name)(*args)
+    f.__name__ = name
+    return f
+
+
+def _forward(name):
+    def f(self, *args):
+        return getattr(self.load(), name)(*args)
+    f.__name__ = name
+    return f
+
+# arithmetic with scalars or arrays of the same packing stays packed;
+# inplace operations return a new PackedArray
+for _name in ['__add__', '__radd__', '__sub__', '__rsub__', '__mul__',
+              '__rmul__', '__div__', '__rdiv__', '__truediv__',
+              '__rtruediv__', '__pow__', '__neg__', '__abs__']:
+    setattr(PackedArray, _name, _elementwise(_name))
+for _name in ['add', 'sub', 'mul', 'div', 'truediv', 'pow']:
+    setattr(PackedArray, '__i%s__' % _name, _elementwise('__%s__' % _name))
+for _name in ['__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__']:
+    setattr(PackedArray, _name, _forward(_name))
@@ -827,9 +827,10 @@ class LinePlot(object):
             raise ValueError('Currently only 1D data supported')
 
         segments = []
+        dates = x.date
         for i in xrange(x.nt):
             yref = x.data[i]
-            dnum = pl.date2num(x.date[i])  # the conversion using pylab is required as otherwise there is a 1-day shift! Reason seems to be that matplotlib converts the numerical value automatically using num2date()
+            dnum = pl.date2num(dates[i])  # the conversion using pylab is required as otherwise there is a 1-day shift! Reason seems to be that matplotlib converts the numerical value automatically using num2date()
             xx = [dnum, dnum]
             yy = [yref - s.data[i], yref + s.data[i]]
             segments.append(list(zip(xx, yy)))
@@ -2579,12 +2580,10 @@ def map_season(x, figsize=(8, 6), **kwargs):
 
     # check dates
     if year:
-        mo = 1
-        for t in x.time:
-            if x.num2date(t).month != mo:
-                print x.num2date(t), mo
-                raise ValueError('Invalid monthly sequence! Can not plot results!')
-            mo += 1
+        months = np.asarray(x._get_months())
+        if np.any(months != np.arange(len(months)) + 1):
+            print months
+            raise ValueError('Invalid monthly sequence! Can not plot results!')
 
     #/// in case that an overlay is provided, this needs to be processed for each timestep individually
     if 'overlay' in kwargs.keys():
@@ -3028,6 +3027,9 @@ def xx_map_plot(x, use_basemap=False, ax=None, cticks=None, region=None,
                 #    * http://pl.digipedia.org/usenet/thread/15998/16891/
                 if plot_method == 'colormesh':
                     print 'Projection: ', proj
+                    # the mean field is shifted for this plot only; objects
+                    # normalized before with Data.normalize_lon('180') are
+                    # plotted without shifting
                     if x._lon360:  # if lon 0 ... 360, then shift data
                         tmp_lon = x._get_unique_lon()  # get unique longitudes
                         tmplon1 = tmp_lon.copy()
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module provides the regridding of unstructured data (e.g. ICON)
+to regular lat/lon grids. The interpolation weights are stored in a
+sparse matrix [target cells, source cells], such that all timesteps
+are regridded with a single sparse matrix product. The weights are
+calculated once per source and target grid using a KD-tree of the
+source cell centers (see pycmbs.spatial) and cached on disk as
+snapshot files (see pycmbs.snapshot).
+"""
+
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+from pycmbs.spatial import GridIndex, lonlat2xyz
+from pycmbs.constants import EarthRadius
+from pycmbs.snapshot import write_snapshot, read_snapshot
+
+valid_regrid_methods = ['nearest', 'idw', 'overlap']
+
+# number of gaussian latitudes of the spectral truncations (CDO tXXgrid)
+gaussian_grids = {21: 32, 31: 48, 42: 64, 63: 96, 85: 128, 106: 160,
+                  127: 192, 159: 240, 255: 384, 319: 480}
+
+# source grid indices of the most recently used grids (see get_regridder())
+_regridders = OrderedDict()
+max_regridders = 8
+
+
+def gaussian_latitudes(nlat):
+    """
+    latitudes of a gaussian grid [deg], from north to south
+    """
+    x, w = np.polynomial.legendre.leggauss(nlat)
+    return np.rad2deg(np.arcsin(x))[::-1]
+
+
+def get_target_grid(target):
+    """
+    returns the coordinates of a regular lat/lon target grid
+
+    Parameters
+    ----------
+    target : str, tuple or Data
+        'tXXgrid': gaussian grid of the spectral truncation XX (e.g.
+        't63grid') with longitudes starting at 0
+        'rNXxNY': regular grid with NX x NY cells (e.g. 'r360x180')
+        tuple (lon, lat) of vectors or 2D arrays
+        object with the attributes lon and lat (e.g. Data)
+
+    Returns
+    -------
+    lon : ndarray
+        longitudes of the grid columns [nx]
+    lat : ndarray
+        latitudes of the grid rows [ny]
+    """
+    if isinstance(target, basestring):
+        name = target.lower()
+        if name.startswith('t') and name.endswith('grid') and name[1:-4].isdigit():
+            trunc = int(name[1:-4])
+            if trunc not in gaussian_grids:
+                raise ValueError('Unsupported spectral truncation: %s' % target)
+            nlat = gaussian_grids[trunc]
+            return np.arange(2 * nlat) * 180. / nlat, gaussian_latitudes(nlat)
+        if name.startswith('r') and 'x' in name:
+            try:
+                nx, ny = [int(s) for s in name[1:].split('x')]
+            except ValueError:
+                raise ValueError('Invalid target grid: %s' % target)
+            return np.arange(nx) * 360. / nx, -90. + (np.arange(ny) + 0.5) * 180. / ny
+        raise ValueError('Invalid target grid: %s' % target)
+
+    if isinstance(target, tuple):
+        lon, lat = target
+    else:
+        lon = target.lon
+        lat = target.lat
+    lon = np.asarray(lon, dtype='float')
+    lat = np.asarray(lat, dtype='float')
+    if lon.ndim == 2:
+        if lon.shape != lat.shape or np.any(lon != lon[0]) or np.any(lat != lat[:, :1]):
+            raise ValueError('Target grid needs to be a regular lat/lon grid!')
+        lon = lon[0]
+        lat = lat[:, 0]
+    if lon.ndim != 1 or lat.ndim != 1:
+        raise ValueError('Invalid target grid geometry!')
+    return lon, lat
+
+
+def _cell_bounds(x, lower, upper):
+    # bounds of cells with the centers x as the midpoints of the centers
+    b = np.empty(len(x) + 1)
+    b[1:-1] = 0.5 * (x[1:] + x[:-1])
+    if len(x) > 1:
+        b[0] = x[0] - 0.5 * (x[1] - x[0])
+        b[-1] = x[-1] + 0.5 * (x[-1] - x[-2])
+    else:
+        b[0] = lower
+        b[-1] = upper
+    return np.clip(b, lower, upper)
+
+
+def get_cell_area(lon, lat):
+    """
+    area of the cells of a regular lat/lon grid [m**2]; the cell
+    bounds are the midpoints of the coordinates
+
+    Parameters
+    ----------
+    lon : ndarray
+        longitudes of the grid columns [nx]
+    lat : ndarray
+        latitudes of the grid rows [ny]
+
+    Returns
+    -------
+    ndarray [ny,nx]
+    """
+    dlon = np.abs(np.diff(np.deg2rad(_cell_bounds(lon, -np.inf, np.inf))))
+    dsin = np.abs(np.diff(np.sin(np.deg2rad(_cell_bounds(lat, -90., 90.)))))
+    return EarthRadius ** 2 * dsin[:, np.newaxis] * dlon[np.newaxis, :]
+
+
+def _grid_key(lon, lat):
+    # identifier of a grid without uuid
+    h = hashlib.sha1()
+    h.update(np.asarray(lon, dtype='float').tostring())
+    h.update(np.asarray(lat, dtype='float').tostring())
+    return h.hexdigest()
+
+
+class Regridder(object):
+
+    def __init__(self, lon, lat, vlon=None, vlat=None, key=None):
+        """
+        regridding of unstructured source cells to regular grids
+
+        Parameters
+        ----------
+        lon : ndarray
+            longitude of the source cell centers [ncell] [deg]
+        lat : ndarray
+            latitude of the source cell centers [ncell] [deg]
+        vlon : ndarray
+            longitude of the cell vertices [ncell,nv] [deg]; required
+            for the 'overlap' method
+        vlat : ndarray
+            latitude of the cell vertices [ncell,nv] [deg]
+        key : str
+            unique identifier of the source grid (e.g. the uuid of an
+            ICON grid), used for the disk cache. If None, it is
+            derived from the cell coordinates
+        """
+        lon = np.asarray(lon, dtype='float').flatten()
+        lat = np.asarray(lat, dtype='float').flatten()
+        if lon.shape != lat.shape:
+            raise ValueError('Inconsistent geometry!')
+        self.ncell = len(lon)
+        self.index = GridIndex(lon, lat)
+        self.vlon = vlon
+        self.vlat = vlat
+        self._normals = None
+        if key is None:
+            key = _grid_key(lon, lat)
+        self.key = key
+        self._weights = {}
+
+    def _get_normals(self):
+        """
+        inward normals of the edges of the source cells [ncell,nv,3];
+        a point p is within a cell if the dot products of p with all
+        normals of the cell are not negative
+        """
+        if self._normals is None:
+            if self.vlon is None or self.vlat is None:
+                raise ValueError('Cell vertices required for overlap weights!')
+            nv = np.shape(self.vlon)[-1]
+            v = lonlat2xyz(self.vlon, self.vlat).reshape((self.ncell, nv, 3))
+            n = np.cross(v, np.roll(v, -1, axis=1))
+            # orientation of the vertices, given by the cell center
+            sign = np.sign(np.einsum('ijk,ik->ij', n, self.index.tree.data).sum(axis=1))
+            self._normals = n * sign[:, np.newaxis, np.newaxis]
+        return self._normals
+
+    def get_weights(self, target, method='nearest', k=4, power=2., nsub=8,
+                    cache=True, cache_dir=None):
+        """
+        returns the regridding weights to a regular target grid
+
+        Parameters
+        ----------
+        target : str, tuple or Data
+            target grid (see get_target_grid())
+        method : str
+            'nearest': value of the nearest source cell
+            'idw': inverse distance weighting of the k nearest cells
+            'overlap': weighting with the area of the source cells
+            within the target cell, estimated from nsub x nsub
+            subcells of equal area
+        k : int
+            number of neighbors for 'idw'
+        power : float
+            power of the inverse distance for 'idw'
+        nsub : int
+            number of subcells per direction for 'overlap'
+        cache : bool
+            cache the weights on disk
+        cache_dir : str
+            directory of the disk cache. If None, the temporary
+            directory of the system is used
+
+        Returns
+        -------
+        W : sparse matrix [ny*nx, ncell]
+        lon : ndarray
+            longitudes of the target grid [nx]
+        lat : ndarray
+            latitudes of the target grid [ny]
+        """
+        if method not in valid_regrid_methods:
+            raise ValueError('Invalid regridding method: %s' % method)
+        lon, lat = get_target_grid(target)
+
+        h = hashlib.sha1()
+        h.update(str(self.key))
+        h.update(method)
+        if method == 'idw':
+            h.update('%i %f' % (k, power))
+        elif method == 'overlap':
+            h.update('%i' % nsub)
+        h.update(lon.tostring())
+        h.update(lat.tostring())
+        wkey = h.hexdigest()
+
+        if wkey in self._weights:
+            return self._weights[wkey], lon, lat
+
+        filename = None
+        if cache:
+            if cache_dir is None:
+                cache_dir = tempfile.gettempdir()
+            filename = os.path.join(cache_dir, 'regrid_' + wkey + '.snap')
+        if filename is not None and os.path.exists(filename):
+            arrays, attributes = read_snapshot(filename)
+            W = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                  shape=tuple(attributes['shape']))
+        else:
+            if method == 'nearest':
+                W = self._nearest_weights(lon, lat)
+            elif method == 'idw':
+                W = self._idw_weights(lon, lat, k, power)
+            else:
+                W = self._overlap_weights(lon, lat, nsub)
+            if filename is not None:
+                if not os.path.exists(cache_dir):
+                    os.makedirs(cache_dir)
+                # the file is renamed when complete, thus other
+                # processes never read a partially written file
+                fd, tmpname = tempfile.mkstemp(suffix='.tmp', prefix='regrid_', dir=cache_dir)
+                os.close(fd)
+                try:
+                    write_snapshot(tmpname, {'data': W.data, 'indices': W.indices, 'indptr': W.indptr},
+                                   attributes={'shape': list(W.shape), 'method': method,
+                                               'grid': self.key}, delete=True)
+                    os.rename(tmpname, filename)
+                finally:
+                    if os.path.exists(tmpname):
+                        os.remove(tmpname)
+        self._weights[wkey] = W
+        return W, lon, lat
+
+    def _target_points(self, lon, lat):
+        LON, LAT = np.meshgrid(lon, lat)
+        return lonlat2xyz(LON, LAT)
+
+    def _nearest_weights(self, lon, lat):
+        d, idx = self.index.tree.query(self._target_points(lon, lat), k=1)
+        n = len(idx)
+        return sparse.csr_matrix((np.ones(n), idx, np.arange(n + 1)), shape=(n, self.ncell))
+
+    def _idw_weights(self, lon, lat, k, power):
+        k = min(k, self.ncell)
+        d, idx = self.index.tree.query(self._target_points(lon, lat), k=k)
+        d = d.reshape((len(d), k))
+        idx = idx.reshape((len(idx), k))
+        exact = d[:, 0] < 1.E-12
+        w = 1. / np.maximum(d, 1.E-12) ** power
+        w[exact] = 0.
+        w[exact, 0] = 1.
+        w /= w.sum(axis=1)[:, np.newaxis]
+        n = len(d)
+        return sparse.csr_matrix((w.flatten(), idx.flatten(), np.arange(n + 1) * k),
+                                 shape=(n, self.ncell))
+
+    def _overlap_weights(self, lon, lat, nsub, blocksize=2 ** 18, ncandidates=8):
+        N = self._get_normals()
+        nx = len(lon)
+        ny = len(lat)
+        lonb = _cell_bounds(lon, -np.inf, np.inf)
+        # subcells of equal area: uniform in longitude and sin(latitude)
+        s = (np.arange(nsub) + 0.5) / nsub
+        slon = (lonb[:-1, np.newaxis] + s * np.diff(lonb)[:, np.newaxis]).flatten()
+        sinb = np.sin(np.deg2rad(_cell_bounds(lat, -90., 90.)))
+        slat = np.rad2deg(np.arcsin(sinb[:-1, np.newaxis] + s * np.diff(sinb)[:, np.newaxis])).flatten()
+        # target cell of each subcell
+        col = np.repeat(np.arange(nx), nsub)
+        row = np.repeat(np.arange(ny), nsub)
+
+        k = min(ncandidates, self.ncell)
+        rows = []
+        cols = []
+        nlat_block = max(1, blocksize // len(slon))
+        for i1 in xrange(0, len(slat), nlat_block):
+            i2 = min(i1 + nlat_block, len(slat))
+            LON, LAT = np.meshgrid(slon, slat[i1:i2])
+            p = lonlat2xyz(LON, LAT)
+            tgt = (row[i1:i2, np.newaxis] * nx + col[np.newaxis, :]).flatten()
+            # most points are within the cell with the nearest center;
+            # more candidates are only searched for the remaining points
+            d, src = self.index.tree.query(p, k=1)
+            src[~self._inside(N, src, p)] = -1
+            todo = np.nonzero(src < 0)[0]
+            if len(todo) > 0 and k > 1:
+                d, cand = self.index.tree.query(p[todo], k=k)
+                for j in xrange(1, k):
+                    inside = self._inside(N, cand[:, j], p[todo])
+                    src[todo[inside]] = cand[inside, j]
+                    todo = todo[~inside]
+                    cand = cand[~inside]
+                    if len(todo) == 0:
+                        break
+            valid = src >= 0
+            rows.append(tgt[valid])
+            cols.append(src[valid])
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        W = sparse.coo_matrix((np.ones(len(rows)) / nsub ** 2, (rows, cols)),
+                              shape=(nx * ny, self.ncell)).tocsr()
+        W.sum_duplicates()
+        return W
+
+    @staticmethod
+    def _inside(N, idx, p):
+        # check if the points p are within the cells idx
+        return (np.einsum('mvk,mk->mv', N[idx], p) >= -1.E-12).all(axis=1)
+
+
+def get_regridder(lon, lat, vlon=None, vlat=None, key=None):
+    """
+    returns the Regridder of a source grid. The Regridder (and thus
+    its KD-tree and weights) is kept for all data on the same grid;
+    only the max_regridders most recently used grids are kept
+    """
+    if key is None:
+        key = _grid_key(lon, lat)
+    if key in _regridders:
+        R = _regridders.pop(key)
+    else:
+        R = Regridder(lon, lat, vlon=vlon, vlat=vlat, key=key)
+    _regridders[key] = R
+    while len(_regridders) > max_regridders:
+        _regridders.popitem(last=False)
+    if R.vlon is None and vlon is not None:
+        R.vlon = vlon
+        R.vlat = vlat
+    return R
+
+
+def apply_weights(W, x):
+    """
+    regrid data with a weight matrix. Masked source values are
+    ignored and the weights of the remaining values are normalized;
+    target cells without any valid source value are masked
+
+    Parameters
+    ----------
+    W : sparse matrix [ntarget, ncell]
+        weights (see Regridder.get_weights())
+    x : ndarray
+        source data [..., ncell]
+
+    Returns
+    -------
+    masked array [..., ntarget]
+    """
+    x = np.ma.asarray(x)
+    shape = x.shape[:-1]
+    if x.shape[-1] != W.shape[1]:
+        raise ValueError('Data and weights are inconsistent!')
+    m = np.ma.getmaskarray(x).reshape((-1, W.shape[1]))
+    d = x.data.reshape((-1, W.shape[1]))
+    if m.any():
+        valid = ~m & np.isfinite(d)
+        d = np.where(valid, d, 0.)
+        wsum = W.dot(valid.T.astype('float')).T
+    else:
+        wsum = np.asarray(W.sum(axis=1)).T
+    res = W.dot(d.T).T
+    empty = wsum <= 0.
+    res = res / np.where(empty, 1., wsum)
+    res = np.ma.array(res.astype(np.result_type(x.dtype, np.float32)),
+                      mask=np.ones(res.shape, dtype='bool') & empty)
+    return res.reshape(shape + (W.shape[0],))
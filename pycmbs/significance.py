@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements pixelwise significance tests for the
+difference of means of two samples (Student's t-test and Welch test).
+Masked and NaN values are ignored.
+"""
+
+import numpy as np
+from scipy import special
+
+
+def masked_moments(x, axis=0):
+    """
+    number of valid values, mean and variance along an axis
+
+    Parameters
+    ----------
+    x : ndarray or masked array
+        data; masked and NaN values are ignored
+    axis : int
+        axis along which the statistics are calculated
+
+    Returns
+    -------
+    n, mean, var : ndarrays
+        number of valid values, mean and unbiased variance (ddof=1).
+        mean and var are NaN where not enough data is available.
+    """
+    d = np.ma.getdata(x)
+    valid = ~np.ma.getmaskarray(x) & np.isfinite(d)
+    n = valid.sum(axis=axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, d, 0.).sum(axis=axis) / n
+        dev = np.where(valid, d - np.expand_dims(mean, axis), 0.)
+        var = (dev * dev).sum(axis=axis) / (n - 1.)
+    mean = np.where(n > 0, mean, np.nan)
+    var = np.where(n > 1, var, np.nan)
+    return n, mean, var
+
+
+def ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var=True):
+    """
+    two sided t-test for the difference of means of two independent
+    samples given their statistics
+
+    Parameters
+    ----------
+    n1, mean1, var1 : ndarray
+        number of values, mean and variance (ddof=1) of first sample
+    n2, mean2, var2 : ndarray
+        number of values, mean and variance (ddof=1) of second sample
+    equal_var : bool
+        if True, a Student's t-test with pooled variance is
+        performed, otherwise a Welch test
+
+    Returns
+    -------
+    t, p : masked arrays
+        t statistic and p-value; masked where the test can not be
+        performed (e.g. too few values or zero variance)
+    """
+    n1 = np.asarray(n1, dtype='float')
+    n2 = np.asarray(n2, dtype='float')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if equal_var:
+            df = n1 + n2 - 2.
+            svar = ((n1 - 1.) * var1 + (n2 - 1.) * var2) / df
+            denom = np.sqrt(svar * (1. / n1 + 1. / n2))
+        else:
+            vn1 = var1 / n1
+            vn2 = var2 / n2
+            df = (vn1 + vn2) ** 2 / (vn1 ** 2 / (n1 - 1.) + vn2 ** 2 / (n2 - 1.))
+            denom = np.sqrt(vn1 + vn2)
+        t = (mean1 - mean2) / denom
+        invalid = ~np.isfinite(t) | ~np.isfinite(df) | (df <= 0.)
+        df = np.where(invalid, 1., df)
+        t = np.where(invalid, 0., t)
+        p = special.betainc(0.5 * df, 0.5, df / (df + t * t))
+    return np.ma.array(t, mask=invalid), np.ma.array(p, mask=invalid)
+
+
+def ttest_ind(a, b, axis=0, equal_var=True):
+    """
+    two sided t-test for the difference of means of two independent
+    samples along an axis
+
+    Parameters
+    ----------
+    a, b : ndarray or masked array
+        samples; masked and NaN values are ignored
+    axis : int
+        axis along which the test is performed
+    equal_var : bool
+        if True, a Student's t-test with pooled variance is
+        performed, otherwise a Welch test
+
+    Returns
+    -------
+    t, p : masked arrays
+        t statistic and p-value
+    """
+    n1, m1, v1 = masked_moments(a, axis=axis)
+    n2, m2, v2 = masked_moments(b, axis=axis)
+    return ttest_from_moments(n1, m1, v1, n2, m2, v2, equal_var=equal_var)
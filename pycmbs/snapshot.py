@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements a binary snapshot format for fast storage of
+intermediate results. A snapshot file consists of
+
+    magic (8 bytes) | header size (8 bytes, little endian) |
+    JSON header | array 1 | array 2 | ...
+
+The header holds the datatype, shape and file offset of each array
+together with a dictionary of simple attributes. The arrays are stored
+uncompressed in C order and aligned to 64 bytes, such that they can
+be mapped into memory without copying (np.memmap).
+"""
+
+import os
+import json
+import struct
+
+import numpy as np
+
+_magic = 'PYCMBSS1'
+
+# alignment of arrays in the file [bytes]
+_align = 64
+
+
+def _aligned(n):
+    return ((n + _align - 1) // _align) * _align
+
+
+def _decode(x):
+    # JSON returns unicode strings
+    if isinstance(x, unicode):
+        try:
+            return str(x)
+        except UnicodeEncodeError:
+            return x
+    if isinstance(x, list):
+        return [_decode(v) for v in x]
+    if isinstance(x, dict):
+        return dict([(_decode(k), _decode(v)) for k, v in x.iteritems()])
+    return x
+
+
+def write_snapshot(filename, arrays, attributes=None, delete=False):
+    """
+    write arrays and attributes to a snapshot file
+
+    Parameters
+    ----------
+    filename : str
+        name of the output file
+    arrays : dict
+        arrays to store; entries which are None are skipped
+    attributes : dict
+        attributes which can be serialized with JSON
+    delete : bool
+        delete file if existing without asking. If *False*, and the
+        file is existing already, then an error is raised
+    """
+    if os.path.exists(filename):
+        if delete:
+            os.remove(filename)
+        else:
+            raise ValueError('File already existing: %s' % filename)
+    if attributes is None:
+        attributes = {}
+
+    arrays = dict([(k, np.ascontiguousarray(v)) for k, v in arrays.iteritems()
+                   if v is not None])
+    names = sorted(arrays.keys())
+
+    # the offsets depend on the size of the header; the header is
+    # therefore padded to a size which does not change with the offsets
+    info = dict([(k, {'dtype': arrays[k].dtype.str, 'shape': list(arrays[k].shape),
+                      'offset': 0}) for k in names])
+    header = {'arrays': info, 'attributes': attributes}
+    nhdr = _aligned(len(json.dumps(header)) + 32 * len(names) + 16) - 16
+    offset = 16 + nhdr
+    for k in names:
+        info[k]['offset'] = offset
+        offset = _aligned(offset + arrays[k].nbytes)
+    hdr = json.dumps(header)
+    if len(hdr) > nhdr:
+        raise ValueError('Snapshot header too large')
+
+    f = open(filename, 'wb')
+    try:
+        f.write(_magic)
+        f.write(struct.pack('<Q', nhdr))
+        f.write(hdr.ljust(nhdr))
+        for k in names:
+            f.seek(info[k]['offset'])
+            arrays[k].tofile(f)
+        f.truncate(offset)
+    finally:
+        f.close()
+
+
+def read_snapshot(filename, mmap=True):
+    """
+    read a snapshot file
+
+    Parameters
+    ----------
+    filename : str
+        name of the snapshot file
+    mmap : bool
+        if True, the arrays are mapped into memory (copy-on-write) and
+        only read from disk when they are accessed. Modifying the
+        arrays does not change the file.
+
+    Returns
+    -------
+    arrays : dict
+        arrays stored in the file
+    attributes : dict
+        attributes stored in the file
+    """
+    if not os.path.exists(filename):
+        raise ValueError('File not existing: %s' % filename)
+    f = open(filename, 'rb')
+    try:
+        if f.read(8) != _magic:
+            raise ValueError('Not a snapshot file: %s' % filename)
+        nhdr = struct.unpack('<Q', f.read(8))[0]
+        header = _decode(json.loads(f.read(nhdr)))
+    finally:
+        f.close()
+
+    arrays = {}
+    info = header['arrays']
+    if mmap and len(info) > 0 and os.path.getsize(filename) > 16 + nhdr:
+        # a single mapping of the file; arrays are views of it
+        buf = np.memmap(filename, dtype='uint8', mode='c')
+        for k, v in info.iteritems():
+            dt = np.dtype(v['dtype'])
+            n = int(np.prod(v['shape'])) * dt.itemsize
+            x = buf[v['offset']:v['offset'] + n].view(dt).reshape(v['shape'])
+            arrays[k] = np.asarray(x)
+    else:
+        f = open(filename, 'rb')
+        try:
+            for k, v in info.iteritems():
+                dt = np.dtype(v['dtype'])
+                f.seek(v['offset'])
+                x = np.fromfile(f, dtype=dt, count=int(np.prod(v['shape'])))
+                arrays[k] = x.reshape(v['shape'])
+        finally:
+            f.close()
+    return arrays, header['attributes']
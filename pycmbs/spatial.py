@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module provides spatial search on the sphere. Coordinates are
+converted to cartesian coordinates on the unit sphere and indexed with
+a KD-tree, so that nearest neighbor searches are done for all points
+at once.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from pycmbs.constants import EarthRadius
+
+valid_rasterize_methods = ['nearest', 'mean', 'count']
+
+
+def lonlat2xyz(lon, lat):
+    """
+    convert geographical coordinates to cartesian coordinates
+    on the unit sphere
+
+    Parameters
+    ----------
+    lon : ndarray
+        longitude [deg]
+    lat : ndarray
+        latitude [deg]
+
+    Returns
+    -------
+    ndarray [N,3] of coordinates for the flattened input
+    """
+    lon = np.deg2rad(np.asarray(lon, dtype='float').flatten())
+    lat = np.deg2rad(np.asarray(lat, dtype='float').flatten())
+    coslat = np.cos(lat)
+    return np.column_stack((coslat * np.cos(lon), coslat * np.sin(lon), np.sin(lat)))
+
+
+def km2chord(d):
+    """
+    convert a distance on the earth surface [km] to the chord length
+    on the unit sphere
+    """
+    return arc2chord(d * 1000. / EarthRadius)
+
+
+def deg2chord(d):
+    """
+    convert a great circle distance [deg] to the chord length
+    on the unit sphere
+    """
+    return arc2chord(np.deg2rad(d))
+
+
+def arc2chord(a):
+    """
+    convert an angle [rad] to the chord length on the unit sphere
+    """
+    return 2. * np.sin(np.minimum(a, np.pi) / 2.)
+
+
+class GridIndex(object):
+
+    def __init__(self, lon, lat):
+        """
+        spatial index of the cells of a target grid
+
+        Parameters
+        ----------
+        lon : ndarray
+            longitude of grid cells [deg]
+        lat : ndarray
+            latitude of grid cells [deg]
+        """
+        lon = np.asarray(lon)
+        lat = np.asarray(lat)
+        if lon.shape != lat.shape:
+            raise ValueError('Inconsistent geometry!')
+        self.shape = lon.shape
+        self.size = lon.size
+        self.tree = cKDTree(lonlat2xyz(lon, lat))
+
+    def query(self, lon, lat, radius):
+        """
+        find the nearest grid cell for each point
+
+        Parameters
+        ----------
+        lon : ndarray
+            longitude of points [deg]
+        lat : ndarray
+            latitude of points [deg]
+        radius : float
+            maximum distance as chord length on the unit sphere
+
+        Returns
+        -------
+        dist : ndarray
+            chord distance to the nearest cell (inf if no cell within radius)
+        idx : ndarray
+            index of nearest cell in the flattened grid (self.size
+            if no cell within radius)
+        """
+        return self.tree.query(lonlat2xyz(lon, lat), k=1,
+                               distance_upper_bound=radius * (1. + 1.E-12))
+
+    def rasterize(self, lon, lat, data, radius, method='nearest'):
+        """
+        map point data to the grid
+
+        Parameters
+        ----------
+        lon : ndarray
+            longitude of points [deg]
+        lat : ndarray
+            latitude of points [deg]
+        data : ndarray
+            data of points; masked or NaN values are ignored
+        radius : float
+            maximum distance between a point and a grid cell as chord
+            length on the unit sphere (see km2chord(), deg2chord())
+        method : str
+            'nearest': each cell gets the value of the closest point
+            'mean': mean of all points assigned to the cell
+            'count': number of points assigned to the cell
+
+        Returns
+        -------
+        masked array with the geometry of the grid; cells without
+        any point are masked
+        """
+        if method not in valid_rasterize_methods:
+            raise ValueError('Invalid rasterization method: %s' % method)
+        data = np.ma.asarray(data).flatten()
+        if data.size != np.size(lon):
+            raise ValueError('Data and coordinates are inconsistent!')
+        dist, idx = self.query(lon, lat, radius)
+
+        valid = (idx < self.size) & ~np.ma.getmaskarray(data) & ~np.isnan(data.data)
+        idx = idx[valid]
+        dist = dist[valid]
+        x = data.data[valid]
+
+        n = np.bincount(idx, minlength=self.size)
+        if method == 'count':
+            return np.ma.array(n.reshape(self.shape))
+        elif method == 'mean':
+            res = np.bincount(idx, weights=x, minlength=self.size) / np.maximum(n, 1)
+        else:
+            # first entry of each cell after sorting by distance
+            order = np.lexsort((dist, idx))
+            cells, first = np.unique(idx[order], return_index=True)
+            res = np.zeros(self.size)
+            res[cells] = x[order][first]
+        return np.ma.array(res.reshape(self.shape), mask=(n == 0).reshape(self.shape))
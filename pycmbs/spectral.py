@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements a Lomb-Scargle periodogram for many timeseries
+at once. For each period, the model y = A * cos(2*pi*t/period + B)
+is fitted to all timeseries by solving the linear least squares problem
+for y = a * cos(2*pi*t/period) + b * sin(2*pi*t/period) with matrix
+operations. Invalid values are ignored, thus the timeseries may contain
+gaps.
+"""
+
+import multiprocessing
+
+import numpy as np
+from scipy import stats
+
+# input data shared with worker processes; set before the pool is
+# created, thus the processes inherit it without copying
+_shared = {}
+
+
+def lomb_scargle_batch(t, P, y, valid=None, corr=True):
+    """
+    calculate the Lomb-Scargle periodogram for several timeseries
+
+    Parameters
+    ----------
+    t : ndarray
+        time [nt]; e.g. in units of days
+    P : ndarray
+        periods [np] in the same units as the time
+    y : ndarray
+        timeseries [nt,npix]
+    valid : ndarray (bool)
+        flag for valid data [nt,npix]; if None, all finite
+        values are used
+    corr : bool
+        calculate also correlation of model with data (quality of fit)
+
+    Returns
+    -------
+    A, B (, R, PV) arrays [np,npix] with amplitude, phase and
+    optionally correlation coefficient of model with data and p-value
+    of the correlation. Results are NaN where the model can not be
+    fitted.
+    """
+    t = np.asarray(t, dtype='float')
+    P = np.asarray(P, dtype='float')
+    y = np.asarray(y, dtype='float')
+    if y.ndim == 1:
+        y = y.reshape((len(y), 1))
+    if valid is None:
+        valid = np.isfinite(y)
+    W = valid.astype('float')
+    Y = np.where(valid, y, 0.)
+
+    x = 2. * np.pi * t[:, np.newaxis] / P[np.newaxis, :]  # [nt,np]
+    C = np.cos(x)
+    S = np.sin(x)
+    del x
+
+    Scc = (C * C).T.dot(W)
+    Sss = (S * S).T.dot(W)
+    Scs = (C * S).T.dot(W)
+    Syc = C.T.dot(Y)
+    Sys = S.T.dot(Y)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = Scc * Sss - Scs ** 2
+        a = (Syc * Sss - Sys * Scs) / det
+        b = (Sys * Scc - Syc * Scs) / det
+
+        # a*cos(x) + b*sin(x) = A*cos(x+B)
+        A = np.sqrt(a ** 2 + b ** 2)
+        B = np.arctan2(-b, a)
+        B[~np.isfinite(A)] = np.nan
+        if not corr:
+            return A, B
+
+        # pearson correlation of the model with the data
+        n = W.sum(axis=0)
+        Sy = Y.sum(axis=0)
+        Syy = (Y * Y).sum(axis=0)
+        Sm = a * C.T.dot(W) + b * S.T.dot(W)
+        Smm = a ** 2 * Scc + 2. * a * b * Scs + b ** 2 * Sss
+        Smy = a * Syc + b * Sys
+        cov = Smy - Sm * Sy / n
+        varm = Smm - Sm ** 2 / n
+        vary = Syy - Sy ** 2 / n
+        R = np.clip(cov / np.sqrt(varm * vary), -1., 1.)
+
+        # two sided p-value of the correlation
+        df = n - 2.
+        tval = R * np.sqrt(df / np.maximum(1. - R ** 2, 1.E-300))
+        PV = 2. * stats.t.sf(np.abs(tval), df)
+    PV[~np.isfinite(R)] = np.nan
+    return A, B, R, PV
+
+
+def _lomb_scargle_worker(block):
+    i1, i2 = block
+    return lomb_scargle_batch(_shared['t'], _shared['P'],
+                              _shared['y'][:, i1:i2],
+                              valid=_shared['valid'][:, i1:i2],
+                              corr=_shared['corr'])
+
+
+def lomb_scargle_blocks(t, P, y, valid, corr=True, nproc=1, blocksize=1024):
+    """
+    calculate the Lomb-Scargle periodogram for many timeseries by
+    processing blocks of timeseries, optionally in parallel
+
+    Parameters
+    ----------
+    t : ndarray
+        time [nt]
+    P : ndarray
+        periods [np]
+    y : ndarray
+        timeseries [nt,npix]
+    valid : ndarray (bool)
+        flag for valid data [nt,npix]
+    corr : bool
+        calculate also correlation of model with data
+    nproc : int
+        number of worker processes; 1 does all calculations in the
+        current process
+    blocksize : int
+        number of timeseries processed at once
+
+    Returns
+    -------
+    list of arrays [np,npix] as returned by lomb_scargle_batch()
+    """
+    npix = y.shape[1]
+    blocks = [(i, min(i + blocksize, npix)) for i in xrange(0, npix, blocksize)]
+
+    _shared.update({'t': t, 'P': P, 'y': y, 'valid': valid, 'corr': corr})
+    try:
+        if nproc > 1 and len(blocks) > 1:
+            pool = multiprocessing.Pool(min(nproc, len(blocks)))
+            try:
+                res = pool.map(_lomb_scargle_worker, blocks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            res = map(_lomb_scargle_worker, blocks)
+    finally:
+        _shared.clear()
+
+    if len(res) == 0:
+        n = 4 if corr else 2
+        return [np.zeros((len(P), 0)) for i in xrange(n)]
+    return [np.concatenate([r[k] for r in res], axis=1) for k in xrange(len(res[0]))]
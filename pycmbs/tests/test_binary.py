@@ -10,10 +10,12 @@ from unittest import TestCase
 import unittest
 
 from pycmbs.data import Data
+from pycmbs.binary import BinaryHandler
 import os
 import numpy as np
 import tempfile
 import struct
+import gzip
 
 from nose.tools import assert_raises
 
@@ -84,23 +86,15 @@ class TestData(unittest.TestCase):
         f.write(self.x)
         f.close()
 
-        D = Data(None, None)
-        f = open(fname, 'r')
         ny, nx = self.x.shape
-        nt = 1
+        F = BinaryHandler(fname, 'double', nt=1, ny=ny, nx=nx)
 
         # test 1: read entire file
-        file_content = D._read_binary_subset2D(f, 8, ny=ny, nx=nx, xbeg=0, xend=nx, ybeg=0, yend=ny)
-        d = np.reshape(np.asarray(struct.unpack('d'*ny*nx*nt, file_content)), (ny, nx))
+        d = F.get_subset(xbeg=0, xend=nx, ybeg=0, yend=ny)[0]
         self.assertTrue(np.all(d-self.x == 0.))
 
         # test 2: read subset with 1-values only
-        ny1 = self.ymax - self.ymin
-        nx1 = self.xmax - self.xmin
-        nt1 = 1
-
-        file_content = D._read_binary_subset2D(f, 8, ny=ny, nx=nx, xbeg=self.xmin, xend=self.xmax, ybeg=self.ymin, yend=self.ymax)
-        d1 = np.reshape(np.asarray(struct.unpack('d'*ny1*nx1*nt1, file_content)), (ny1, nx1))
+        d1 = F.get_subset(xbeg=self.xmin, xend=self.xmax, ybeg=self.ymin, yend=self.ymax)[0]
         self.assertTrue(np.all(d1 - self.x[self.ymin:self.ymax, self.xmin:self.xmax] == 0.))
 
     def test_read_binary_subset_int(self):
@@ -111,23 +105,15 @@ class TestData(unittest.TestCase):
         f.write(ref)
         f.close()
 
-        D = Data(None, None)
-        f = open(fname, 'r')
         ny, nx = self.x.shape
-        nt = 1
+        F = BinaryHandler(fname, 'int16', nt=1, ny=ny, nx=nx)
 
         # test 1: read entire file
-        file_content = D._read_binary_subset2D(f, 2, ny=ny, nx=nx, xbeg=0, xend=nx, ybeg=0, yend=ny)
-        d = np.reshape(np.asarray(struct.unpack('H'*ny*nx*nt, file_content)), (ny, nx))
+        d = F.get_subset(xbeg=0, xend=nx, ybeg=0, yend=ny)[0]
         self.assertTrue(np.all(d-ref == 0.))
 
         # test 2: read subset with 1-values only
-        ny1 = self.ymax - self.ymin
-        nx1 = self.xmax - self.xmin
-        nt1 = 1
-
-        file_content = D._read_binary_subset2D(f, 2, ny=ny, nx=nx, xbeg=self.xmin, xend=self.xmax, ybeg=self.ymin, yend=self.ymax)
-        d1 = np.reshape(np.asarray(struct.unpack('H'*ny1*nx1*nt1, file_content)), (ny1, nx1))
+        d1 = F.get_subset(xbeg=self.xmin, xend=self.xmax, ybeg=self.ymin, yend=self.ymax)[0]
         self.assertTrue(np.all(d1 - ref[self.ymin:self.ymax, self.xmin:self.xmax] == 0.))
 
     def test_read_binary_subset_Data_double(self):
@@ -176,6 +162,68 @@ class TestData(unittest.TestCase):
         D._read_binary_file(nt=1, dtype='int16', latmin=latmin, latmax=latmax, lonmin=lonmin, lonmax=lonmax, lat=self.lat, lon=self.lon)
         self.assertTrue(np.all(D.data-tmp[self.ymin:self.ymax+1,self.xmin:self.xmax+1] == 0.))
 
+    def test_read_binary_file_3D_temporal_window(self):
+        fname = tempfile.mktemp()
+        x = np.random.random((5,) + self.x.shape)
+        f = open(fname, 'w')
+        f.write(x)
+        f.close()
+
+        D = Data(None, None)
+        D.filename = fname
+        nt, ny, nx = x.shape
+        D._read_binary_file(ny=ny, nx=nx, nt=nt, dtype='double', tbeg=1, tend=4)
+        self.assertEqual(D.data.shape, (3, ny, nx))
+        self.assertTrue(np.all(D.data - x[1:4] == 0.))
+
+        # spatial and temporal window
+        D._read_binary_file(nt=nt, dtype='double', tbeg=2, tend=3, lat=self.lat, lon=self.lon,
+                            latmin=self.lat[self.ymin], latmax=self.lat[self.ymax],
+                            lonmin=self.lon[self.xmin], lonmax=self.lon[self.xmax])
+        self.assertTrue(np.all(D.data - x[2, self.ymin:self.ymax+1, self.xmin:self.xmax+1] == 0.))
+
+        # inplace operations do not modify the file
+        D.data *= 2.
+        D._read_binary_file(ny=ny, nx=nx, nt=nt, dtype='double')
+        self.assertTrue(np.all(D.data - x == 0.))
+        os.remove(fname)
+
+    def test_read_binary_file_gzip(self):
+        fname = tempfile.mktemp() + '.gz'
+        x = np.random.random((3,) + self.x.shape).astype('float32')
+        f = gzip.open(fname, 'wb')
+        f.write(x.tostring())
+        f.close()
+
+        D = Data(None, None)
+        D.filename = fname
+        nt, ny, nx = x.shape
+        D._read_binary_file(ny=ny, nx=nx, nt=nt, dtype='float')
+        self.assertTrue(np.all(D.data - x == 0.))
+
+        # file smaller than specified geometry
+        with self.assertRaises(ValueError):
+            D._read_binary_file(ny=ny, nx=nx, nt=nt+1, dtype='float')
+        os.remove(fname)
+
+    def test_read_binary_file_byteorder(self):
+        fname = tempfile.mktemp()
+        f = open(fname, 'w')
+        f.write(struct.pack('>' + 'i' * self.x.size, *self.x.astype('int32').flatten()))
+        f.close()
+
+        D = Data(None, None)
+        D.filename = fname
+        ny, nx = self.x.shape
+        D._read_binary_file(ny=ny, nx=nx, nt=1, dtype='int32', byteorder='>')
+        self.assertTrue(np.all(D.data - self.x == 0.))
+        self.assertTrue(D.data.dtype.isnative)
+
+        with self.assertRaises(ValueError):
+            D._read_binary_file(ny=ny, nx=nx, nt=1, dtype='int32', byteorder='x')
+        os.remove(fname)
+
+
 
 
 
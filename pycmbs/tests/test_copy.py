@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+
+import numpy as np
+
+from pycmbs.data import Data
+
+
+class TestCopy(unittest.TestCase):
+
+    def setUp(self):
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=10, ny=4, nx=5)
+        self.D.data[2, 1, 1] = np.ma.masked
+        self.D.cell_area = np.ones((4, 5))
+
+    def test_copy_deep(self):
+        x = self.D.copy()
+        x.data[0, 0, 0] = 999.
+        x.lat[0, 0] = 999.
+        x.time[0] = 999.
+        self.assertNotEqual(self.D.data[0, 0, 0], 999.)
+        self.assertNotEqual(self.D.lat[0, 0], 999.)
+        self.assertNotEqual(self.D.time[0], 999.)
+
+    def test_copy_share(self):
+        ref = self.D.data.copy()
+        x = self.D.copy(share=True)
+        for k in ['data', 'lat', 'lon', 'time', 'cell_area']:
+            self.assertTrue(np.may_share_memory(getattr(x, k), getattr(self.D, k)))
+        self.assertTrue(np.all(x.data == self.D.data))
+        self.assertTrue(x.data.mask[2, 1, 1])
+
+        # direct modifications of shared arrays are not allowed
+        with self.assertRaises(ValueError):
+            x.data[0, 0, 0] = 999.
+        with self.assertRaises(ValueError):
+            x.data.mask[0, 0, 0] = True
+        with self.assertRaises(ValueError):
+            x.lat[0, 0] = 999.
+
+        # ... but the original is still writeable
+        self.D.label = 'original'
+        self.assertNotEqual(x.label, 'original')
+        self.assertTrue(self.D.data.flags.writeable)
+
+        # assigning new arrays does not touch the original
+        x.data = x.data * 2.
+        x.lon = x.lon + 10.
+        self.assertTrue(np.all(self.D.data == ref))
+        self.assertFalse(np.may_share_memory(x.lon, self.D.lon))
+
+    def test_copy_share_modify(self):
+        ref = self.D.data.copy()
+        lon = self.D.lon.copy()
+
+        x = self.D.copy(share=True)
+        x.mulc(2., copy=False)
+        self.assertTrue(np.all(x.data == ref * 2.))
+        self.assertTrue(np.all(self.D.data == ref))
+
+        x = self.D.copy(share=True)
+        x.addc(1., copy=False)
+        x.sub(self.D, copy=False)
+        self.assertTrue(np.all(np.abs(x.data - 1.) < 1.E-12))
+        self.assertTrue(np.all(self.D.data == ref))
+
+        x = self.D.copy(share=True)
+        msk = np.ones((4, 5)).astype('bool')
+        msk[0, :] = False
+        x._apply_mask(msk)
+        self.assertTrue(np.all(x.data.mask[:, 0, :]))
+        self.assertFalse(np.any(self.D.data.mask[:, 0, :]))
+        self.assertTrue(np.all(self.D.data == ref))
+
+        x = self.D.copy(share=True)
+        x._shift_lon_360()
+        x._shift_lon()
+        self.assertTrue(np.all(self.D.lon == lon))
+
+    def test_copy_share_derived(self):
+        # results of methods do not share any arrays
+        r = self.D.timmean()
+        self.assertFalse(np.may_share_memory(r.lat, self.D.lat))
+        r.data[0, 0] = 999.
+        r.lat[0, 0] = 999.
+        r.cell_area[0, 0] = 999.
+        self.assertFalse(np.any(self.D.data == 999.))
+        self.assertFalse(np.any(self.D.lat == 999.))
+
+        # ... also for results of shared copies
+        x = self.D.copy(share=True)
+        for r in [x.fldmean(return_data=True), x.diff(self.D), x.get_yearmean(return_data=True)]:
+            for k in ['data', 'lat', 'lon', 'time']:
+                if hasattr(r, k):
+                    self.assertTrue(getattr(r, k).flags.writeable)
+
+if __name__ == "__main__":
+    unittest.main()
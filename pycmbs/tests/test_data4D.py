@@ -6,16 +6,231 @@ For COPYING and LICENSE details, please refer to the LICENSE file
 """
 
 import unittest
+import os
+import tempfile
+import datetime
+
+import numpy as np
+from netCDF4 import Dataset
+
 from pycmbs import data4D
+from pycmbs.data4D import Data4D, LevelStack
+from pycmbs.data import Data
 
 class TestPycmbsData4D(unittest.TestCase):
 
     def setUp(self):
-        pass
+        np.random.seed(5)
+        self.levels = [np.ma.array(np.random.random((6, 2, 3)),
+                                   mask=np.random.random((6, 2, 3)) > 0.8) for i in xrange(3)]
+        self.D = Data4D(None, None)
+        self.D.data4D = LevelStack.from_levels(self.levels)
+        self.D.levellist = {10: 0, 20: 1, 30: 2}
+        self.D.time = np.arange(6.)
 
     def test_DummyTest(self):
         pass
 
+    def test_storage(self):
+        S = LevelStack()
+        for x in self.levels:
+            S.append(x)
+        self.assertEqual(S.data.shape, (6, 3, 2, 3))
+        self.assertEqual(len(S), 3)
+        for i, x in enumerate(S):
+            self.assertTrue(np.all(x.mask == self.levels[i].mask))
+            self.assertTrue(np.all(x == self.levels[i]))
+        self.assertTrue(np.all(S.data == self.D.data4D.data))
+        with self.assertRaises(ValueError):
+            S.append(np.zeros((5, 2, 3)))
+
+    def test_level_views(self):
+        L = self.D.getDataFromLevel(20)
+        self.assertTrue(np.may_share_memory(L.data, self.D.data4D.data))
+        self.D.mulc(2., copy=False)
+        self.assertTrue(np.all(L.data == self.levels[1] * 2.))
+        # time of the level is not shared
+        L.time[0] = 999.
+        self.assertEqual(self.D.time[0], 0.)
+
+        C = self.D.copy()
+        self.assertFalse(np.may_share_memory(C.data4D.data, self.D.data4D.data))
+        C.setDataFromLevel(C.getDataFromLevel(10), 30)
+        self.assertTrue(np.all(C.data4D[2] == C.data4D[0]))
+        self.assertTrue(np.all(self.D.data4D[2] == self.levels[2] * 2.))
+
+    def test_arithmetic(self):
+        X = Data(None, None)
+        X.data = np.ma.array(np.random.random((6, 2, 3)) + 1.)
+        r = self.D.div(X)
+        for i in xrange(3):
+            self.assertTrue(np.all(np.abs(r.data4D[i] - self.levels[i] / X.data) < 1.E-12))
+        r = self.D.sub(self.D)
+        self.assertTrue(np.all(r.data4D.data == 0.))
+
+    def test_sum_mean(self):
+        s = self.D.sum_data4D()
+        ref = self.levels[0] + self.levels[1] + self.levels[2]
+        self.assertTrue(np.all(s.data.mask == ref.mask))
+        self.assertTrue(np.all(np.abs(s.data - ref) < 1.E-12))
+        m = self.D.mean_data4D()
+        ref = np.ma.array(self.levels).mean(axis=0)
+        self.assertTrue(np.all(m.data.mask == ref.mask))
+        self.assertTrue(np.all(np.abs(m.data - ref) < 1.E-12))
+
+    def test_vertical_integrate(self):
+        x = np.ma.array(self.levels)
+        r = self.D.vertical_integrate(bounds=[0., 5., 15., 40.])
+        ref = (x * np.array([5., 10., 25.])[:, None, None, None]).sum(axis=0)
+        self.assertTrue(np.all(r.data.mask == ref.mask))
+        self.assertTrue(np.all(np.abs(r.data - ref) < 1.E-12))
+        self.assertEqual(r.data.shape, (6, 2, 3))
+
+        w = np.random.random((6, 3, 2, 3))
+        r1 = self.D.vertical_integrate(weights=w)
+        r2 = self.D.vertical_integrate(weights=w[:1])
+        ref = (x * np.rollaxis(w, 1)).sum(axis=0)
+        self.assertTrue(np.all(np.abs(r1.data - ref) < 1.E-12))
+        ref = (x * np.rollaxis(w[:1], 1)).sum(axis=0)
+        self.assertTrue(np.all(np.abs(r2.data - ref) < 1.E-12))
+        with self.assertRaises(ValueError):
+            self.D.vertical_integrate()
+        with self.assertRaises(ValueError):
+            self.D.vertical_integrate(weights=[1., 2.])
+
+    def test_aggregate_tiles(self):
+        x = np.ma.array(self.levels)
+        F = self.D.copy()
+        F.data4D = LevelStack(np.random.random((1, 3, 2, 3)))
+        vrm = np.ma.array(np.random.random((2, 3)), mask=[[0, 0, 1], [0, 0, 0]])
+        r = self.D.aggregate_tiles(F, veg_ratio_max=vrm)
+        ref = (x * np.rollaxis(F.data4D.data, 1)).sum(axis=0) * vrm
+        self.assertTrue(np.all(r.data.mask == ref.mask))
+        self.assertTrue(np.all(np.abs(r.data - ref) < 1.E-12))
+
+        r = self.D.aggregate_tiles(F.data4D.data[0])
+        self.assertTrue(np.all(np.abs(r.data - (x * F.data4D.data[0][:, None]).sum(axis=0)) < 1.E-12))
+        with self.assertRaises(ValueError):
+            self.D.aggregate_tiles(F, veg_ratio_max=np.ones((3, 2)))
+
+    def test_interpolate_levels(self):
+        self.D.level_values = np.array([10., 20., 30.])
+        self.D.data4D.data.mask[:] = False
+        r = self.D.interpolate_levels([10., 12.5, 25., 30., 35.])
+        self.assertEqual(r.levellist, {10: 0, 12.5: 1, 25: 2, 30: 3, 35: 4})
+        self.assertEqual(r.data4D.data.shape, (6, 5, 2, 3))
+        x = self.D.data4D.data.data
+        for i, j in [(0, 0), (1, 2), (0, 1)]:
+            for t in xrange(6):
+                ref = np.interp([10., 12.5, 25., 30.], [10., 20., 30.], x[t, :, i, j])
+                self.assertTrue(np.all(np.abs(r.data4D.data[t, :4, i, j] - ref) < 1.E-12))
+        self.assertTrue(np.all(r.data4D.data.mask[:, 4]))
+        self.assertFalse(np.any(r.data4D.data.mask[:, :4]))
+
+        # masked values only affect the neighbouring target levels
+        self.D.data4D.data.mask[2, 2, 1, 1] = True
+        r = self.D.interpolate_levels([10., 12.5, 25., 30.])
+        self.assertEqual(list(r.data4D.data.mask[2, :, 1, 1]), [False, False, True, True])
+
+        # descending levels given per column
+        z = np.ones((3, 2, 3)) * np.array([30., 20., 10.])[:, None, None]
+        z[:, 0, 0] = [300., 200., 100.]
+        D = self.D.copy()
+        D.data4D = LevelStack(self.D.data4D.data[:, ::-1].copy())
+        r2 = D.interpolate_levels([10., 12.5, 25., 30.], levels=z)
+        self.assertTrue(np.all(r2.data4D.data.mask[:, :, 1:, 1:] == r.data4D.data.mask[:, :, 1:, 1:]))
+        self.assertTrue(np.all(np.abs(r2.data4D.data[:, :, 1, :] - r.data4D.data[:, :, 1, :]) < 1.E-12))
+        self.assertTrue(np.all(r2.data4D.data.mask[:, 1:, 0, 0]))
+
+        r = self.D.interpolate_levels([15.], method='log')
+        w = np.log(1.5) / np.log(2.)
+        self.assertTrue(np.all(np.abs(r.data4D[0] - (x[:, 0] * (1. - w) + x[:, 1] * w)) < 1.E-12))
+        with self.assertRaises(ValueError):
+            self.D.interpolate_levels([15.], method='cubic')
+        with self.assertRaises(ValueError):
+            self.D.interpolate_levels([15.], levels=[10., 30., 20.])
+
+
+class TestData4DRead(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(9)
+        self.x = np.random.random((12, 4, 3, 5))
+        self.x[2, 1, 0, 0] = -999.
+        self.filename = tempfile.mktemp(suffix='.nc')
+        F = Dataset(self.filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lev', 4)
+        F.createDimension('lat', 3)
+        F.createDimension('lon', 5)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t.calendar = 'standard'
+        t[:] = np.arange(12) * 30.5 + 15.
+        lev = F.createVariable('lev', 'f8', ('lev',))
+        lev.units = 'm'
+        lev[:] = [10., 20., 50., 100.]
+        F.createVariable('lat', 'f8', ('lat',))[:] = [-30., 0., 30.]  # flipped
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(5) * 72.
+        v = F.createVariable('var', 'f8', ('time', 'lev', 'lat', 'lon'), fill_value=-999.)
+        v[:] = self.x
+        F.close()
+        self.ref = np.ma.array(self.x[:, :, ::-1, :], mask=self.x[:, :, ::-1, :] == -999.)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_read(self):
+        D = Data4D(self.filename, 'var', read=True, scale_factor=2.)
+        self.assertEqual(D.levellist, {10: 0, 20: 1, 50: 2, 100: 3})
+        self.assertTrue(np.all(D.level_values == [10., 20., 50., 100.]))
+        self.assertEqual(D.level_unit, 'm')
+        self.assertTrue(np.all(D.data4D.data.mask == self.ref.mask))
+        self.assertTrue(np.all(np.abs(D.data4D.data - self.ref * 2.) < 1.E-12))
+        self.assertTrue(np.all(D.lat[:, 0] == [30., 0., -30.]))
+        self.assertTrue(np.all(np.abs(D.getDataFromLevel(50).data - self.ref[:, 2] * 2.) < 1.E-12))
+
+    def test_read_window(self):
+        D = Data4D(self.filename, 'var', read=True, level_range=(15., 60.),
+                   start_time=datetime.datetime(2000, 3, 1),
+                   stop_time=datetime.datetime(2000, 6, 30))
+        self.assertEqual(D.levellist, {20: 0, 50: 1})
+        self.assertEqual(D.data4D.data.shape, (4, 2, 3, 5))
+        self.assertTrue(np.all(np.abs(D.data4D.data - self.ref[2:6, 1:3]) < 1.E-12))
+
+        D = Data4D(self.filename, 'var', read=True, levellist=[100, 10])
+        self.assertEqual(D.levellist, {100: 0, 10: 1})
+        self.assertTrue(np.all(np.abs(D.data4D[0] - self.ref[:, 3]) < 1.E-12))
+        self.assertTrue(np.all(np.abs(D.data4D[1] - self.ref[:, 0]) < 1.E-12))
+
+        # levels which are not values of the coordinate are indices
+        D = Data4D(self.filename, 'var', read=True, levellist=[0, 3])
+        self.assertEqual(D.levellist, {0: 0, 3: 1})
+        self.assertTrue(np.all(D.level_values == [10., 100.]))
+        self.assertTrue(np.all(np.abs(D.data4D[0] - self.ref[:, 0]) < 1.E-12))
+        self.assertTrue(np.all(np.abs(D.data4D[1] - self.ref[:, 3]) < 1.E-12))
+        with self.assertRaises(ValueError):
+            Data4D(self.filename, 'var', read=True, levellist=[0, 4])
+
+        # window of time indices
+        D = Data4D(self.filename, 'var', read=True, time_window=(3, 7))
+        self.assertEqual(D.data4D.data.shape, (4, 4, 3, 5))
+        self.assertTrue(np.all(np.abs(D.time - (np.arange(3, 7) * 30.5 + 15.)) < 1.E-10))
+        self.assertTrue(np.all(np.abs(D.data4D.data - self.ref[3:7]) < 1.E-12))
+        with self.assertRaises(ValueError):
+            Data4D(self.filename, 'var', read=True, time_window=(3, 7),
+                   start_time=datetime.datetime(2000, 3, 1))
+
+    def test_read_mask(self):
+        msk = np.ones((3, 5), dtype='bool')
+        msk[1, :] = False
+        D = Data4D(self.filename, 'var', read=True, mask=msk,
+                   start_time=datetime.datetime(2000, 1, 1),
+                   stop_time=datetime.datetime(2000, 12, 31))
+        self.assertEqual(D.data4D.data.shape, (12, 4, 3, 5))
+        self.assertTrue(np.all(D.data4D.data.mask[:, :, 1, :]))
+        self.assertTrue(np.all(D.data4D.data.mask[:, :, 0, :] == self.ref.mask[:, :, 0, :]))
+
 if __name__ == "__main__":
     unittest.main()
-
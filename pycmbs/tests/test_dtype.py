@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+import datetime
+
+import numpy as np
+from netCDF4 import Dataset, date2num
+
+from pycmbs.data import Data, set_default_dtype, get_default_dtype
+
+
+class TestDtype(unittest.TestCase):
+
+    def setUp(self):
+        self.nt = 36
+        self.ny = 5
+        self.nx = 7
+        self.filename = tempfile.mktemp(suffix='.nc')
+        self.outfile = tempfile.mktemp(suffix='.nc')
+        x = (np.random.random((self.nt, self.ny, self.nx)) * 300.).astype('float32')
+        x[4, 2, 3] = -999.
+
+        F = Dataset(self.filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lat', self.ny)
+        F.createDimension('lon', self.nx)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t.calendar = 'standard'
+        dates = [datetime.datetime(2000 + i // 12, i % 12 + 1, 15) for i in xrange(self.nt)]
+        t[:] = date2num(dates, t.units, calendar=t.calendar)
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.linspace(60., -60., self.ny)
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(self.nx) * 50.
+        F.createVariable('var', 'f4', ('time', 'lat', 'lon'), fill_value=-999.)[:] = x
+        F.close()
+        self.cell_area = np.ones((self.ny, self.nx))
+
+    def tearDown(self):
+        for f in [self.filename, self.outfile]:
+            if os.path.exists(f):
+                os.remove(f)
+        set_default_dtype('float64')
+
+    def _read(self, **kwargs):
+        return Data(self.filename, 'var', read=True, cell_area=self.cell_area.copy(), time_cycle=12, **kwargs)
+
+    def _compare(self, a, b, tol=1.E-4):
+        self.assertTrue(np.all(np.ma.getmaskarray(a) == np.ma.getmaskarray(b)))
+        a = np.ma.asarray(a).compressed()
+        b = np.ma.asarray(b).compressed()
+        self.assertTrue(np.all(np.abs(a - b) <= tol * np.abs(b).max()))
+
+    def test_float32_read(self):
+        S = self._read(dtype='float32')
+        D = self._read()
+        self.assertEqual(S.data.dtype, np.dtype('float32'))
+        self.assertEqual(D.data.dtype, np.dtype('float64'))
+        self.assertEqual(S.lat.dtype, np.dtype('float64'))
+        self.assertTrue(S.data.mask[4, 2, 3])
+        self._compare(S.data, D.data)
+
+    def test_float32_operations(self):
+        S = self._read(dtype='float32')
+        D = self._read()
+
+        s = S.mulc(2.5).addc(-3.)
+        d = D.mulc(2.5).addc(-3.)
+        self.assertEqual(s.data.dtype, np.dtype('float32'))
+        self._compare(s.data, d.data)
+
+        s = S.timmean(return_object=False)
+        self.assertEqual(s.dtype, np.dtype('float32'))
+        self._compare(s, D.timmean(return_object=False))
+
+        s = S.get_climatology()
+        self.assertEqual(s.dtype, np.dtype('float32'))
+        self._compare(s, D.get_climatology())
+
+        msk = np.ones((self.ny, self.nx)).astype('bool')
+        msk[0, :] = False
+        s = S.timmean()
+        s._apply_mask(msk)
+        d = D.timmean()
+        d._apply_mask(msk)
+        self.assertEqual(s.data.dtype, np.dtype('float32'))
+        self._compare(s.data, d.data)
+
+    def test_float32_lazy(self):
+        S = self._read(dtype='float32', lazy=True)
+        D = self._read()
+        self.assertEqual(S.data[0:3].dtype, np.dtype('float32'))
+        self._compare(S.data[:], D.data)
+        self._compare(S.timmean(return_object=False), D.timmean(return_object=False))
+
+    def test_float32_save(self):
+        S = self._read(dtype='float32')
+        S.save(self.outfile, delete=True)
+        F = Dataset(self.outfile, 'r')
+        self.assertEqual(F.variables['var'].dtype, np.dtype('float32'))
+        F.close()
+
+        R = Data(self.outfile, 'var', read=True, dtype='float32')
+        self.assertEqual(R.data.dtype, np.dtype('float32'))
+        self._compare(R.data, S.data, tol=0.)
+
+    def test_save_chunked(self):
+        S = self._read(dtype='float32', lazy=True)
+        S.save(self.outfile, delete=True, chunking='map', complevel=2)
+        F = Dataset(self.outfile, 'r')
+        self.assertEqual(F.variables['var'].chunking(), [1, self.ny, self.nx])
+        F.close()
+        R = Data(self.outfile, 'var', read=True)
+        self._compare(R.data, S.data[:], tol=0.)
+
+    def test_default_dtype(self):
+        self.assertEqual(get_default_dtype(), 'float64')
+        set_default_dtype('float32')
+        S = self._read()
+        self.assertEqual(S.data.dtype, np.dtype('float32'))
+        self.assertEqual(S.copy().data.dtype, np.dtype('float32'))
+        with self.assertRaises(ValueError):
+            set_default_dtype('int16')
+        with self.assertRaises(ValueError):
+            self._read(dtype='int32')
+
+if __name__ == "__main__":
+    unittest.main()
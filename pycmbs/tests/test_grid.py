@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+
+import numpy as np
+from netCDF4 import Dataset
+
+import pycmbs.data
+from pycmbs.data import Data
+from pycmbs.grid import Grid, get_grid, get_number_of_grids
+from geoval.core.data import GeoData
+
+
+class TestGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.lon, self.lat = np.meshgrid(np.arange(8) * 45., np.linspace(60., -60., 5))
+        self.cell_area = np.random.random((5, 8)) + 1.
+
+    def test_intern(self):
+        G1 = get_grid(self.lat, self.lon, self.cell_area)
+        n = get_number_of_grids()
+        G2 = get_grid(self.lat.copy(), self.lon.copy(), self.cell_area.copy())
+        self.assertTrue(G1 is G2)
+        self.assertEqual(get_number_of_grids(), n)
+        G3 = get_grid(self.lat, self.lon + 1., self.cell_area)
+        self.assertFalse(G1 is G3)
+        self.assertEqual(get_number_of_grids(), n + 1)
+        del G3
+        self.assertEqual(get_number_of_grids(), n)
+
+        # arrays of the grid are read-only copies
+        self.assertFalse(G1.lat.flags.writeable)
+        self.assertFalse(np.may_share_memory(G1.lat, self.lat))
+        with self.assertRaises(ValueError):
+            Grid(self.lat, self.lon[:, 1:])
+
+    def test_weights(self):
+        G = Grid(self.lat, self.lon, cell_area=self.cell_area)
+        w, total = G.get_weights()
+        self.assertAlmostEqual(w.sum(), 1., 12)
+        self.assertAlmostEqual(total, self.cell_area.sum(), 12)
+        msk = np.zeros((5, 8), dtype='bool')
+        msk[2, :] = True
+        w1, t1 = G.get_weights(msk)
+        self.assertTrue(np.all(w1.mask[2, :]))
+        self.assertAlmostEqual(w1.sum(), 1., 12)
+        self.assertAlmostEqual(t1, self.cell_area[~msk].sum(), 12)
+        # cached
+        w2, t2 = G.get_weights(msk.copy())
+        self.assertTrue(w1 is w2)
+        self.assertFalse(w1.flags.writeable)
+
+    def test_unique_and_bands(self):
+        G = Grid(self.lat, self.lon)
+        self.assertTrue(np.all(G.get_unique_lat() == self.lat[:, 0]))
+        self.assertTrue(np.all(G.get_unique_lon() == self.lon[0, :]))
+        lat, idx = G.get_zonal_bands()
+        self.assertTrue(np.all(idx == np.arange(5).reshape((5, 1))))
+        lat, idx = G.get_zonal_bands(resolution=90.)
+        self.assertTrue(np.all(lat == np.array([-45., 45.])))
+        self.assertTrue(np.all(idx[:3] == 1))  # 60, 30, 0 deg
+        self.assertTrue(np.all(idx[3:] == 0))
+
+        lat = self.lat.copy()
+        lat[1, 3] += 1.
+        G = Grid(lat, self.lon)
+        self.assertTrue(G.get_unique_lat() is None)
+        with self.assertRaises(ValueError):
+            G.get_zonal_bands()
+
+
+class TestDataGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.files = []
+        for i in xrange(2):
+            filename = tempfile.mktemp(suffix='.nc')
+            F = Dataset(filename, 'w')
+            F.createDimension('time', None)
+            F.createDimension('lat', 5)
+            F.createDimension('lon', 8)
+            t = F.createVariable('time', 'f8', ('time',))
+            t.units = 'days since 2000-01-01 00:00:00'
+            t[:] = np.arange(4) * 30. + 15.
+            F.createVariable('lat', 'f8', ('lat',))[:] = np.linspace(60., -60., 5)
+            F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(8) * 45.
+            x = np.random.random((4, 5, 8))
+            x[:, 0, 1] = -999.
+            F.createVariable('var', 'f8', ('time', 'lat', 'lon'), fill_value=-999.)[:] = x
+            F.close()
+            self.files.append(filename)
+
+    def tearDown(self):
+        for f in self.files:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def test_shared_grid(self):
+        A = Data(self.files[0], 'var', read=True, share_grid=True)
+        B = Data(self.files[1], 'var', read=True, share_grid=True)
+        L = Data(self.files[1], 'var', read=True, lazy=True, share_grid=True)
+        self.assertTrue(A.get_grid() is B.get_grid())
+        self.assertTrue(A.get_grid() is L.get_grid())
+        for k in ['lat', 'lon', 'cell_area']:
+            self.assertTrue(np.may_share_memory(getattr(A, k), getattr(B, k)))
+            self.assertFalse(getattr(A, k).flags.writeable)
+
+        # copies get own coordinates
+        C = A.copy()
+        for k in ['data', 'lat', 'lon', 'cell_area']:
+            self.assertFalse(np.may_share_memory(getattr(C, k), getattr(A, k)))
+            self.assertTrue(getattr(C, k).flags.writeable)
+        self.assertTrue(C.get_grid() is A.get_grid())
+
+        # changed coordinates
+        C.cell_area = C.cell_area * 2.
+        self.assertFalse(C.get_grid() is A.get_grid())
+
+    def test_unshared_grid(self):
+        # by default the coordinates are not shared and can be modified
+        A = Data(self.files[0], 'var', read=True)
+        B = Data(self.files[1], 'var', read=True)
+        self.assertTrue(A.get_grid() is B.get_grid())
+        for k in ['lat', 'lon', 'cell_area']:
+            self.assertFalse(np.may_share_memory(getattr(A, k), getattr(B, k)))
+            self.assertTrue(getattr(A, k).flags.writeable)
+        w = A.get_grid().get_weights()[0]
+        A.cell_area[0, 0] *= 2.
+        A._set_grid()  # coordinates were modified in place
+        self.assertFalse(A.get_grid() is B.get_grid())
+        self.assertFalse(np.all(A.get_grid().get_weights()[0] == w))
+        A._shift_lon_360()
+        G = A.get_grid()
+        A._shift_lon()
+        self.assertFalse(A.get_grid() is G)
+
+    def test_grid_key_cache(self):
+        # the coordinates are only hashed again after reassignment
+        A = Data(self.files[0], 'var', read=True)
+        calls = []
+        get_grid = pycmbs.data.get_grid
+
+        def counting_get_grid(*args):
+            calls.append(1)
+            return get_grid(*args)
+        pycmbs.data.get_grid = counting_get_grid
+        try:
+            G = A.get_grid()
+            A._get_weighting_matrix()
+            A.fldmean()
+            self.assertTrue(A.get_grid() is G)
+            self.assertEqual(len(calls), 1)
+            A.lat = A.lat + 1.
+            self.assertFalse(A.get_grid() is G)
+            self.assertEqual(len(calls), 2)
+        finally:
+            pycmbs.data.get_grid = get_grid
+
+    def test_weighting(self):
+        A = Data(self.files[0], 'var', read=True)
+        for wt in ['valid', 'all']:
+            A.weighting_type = wt
+            w1 = A._get_weighting_matrix()
+            w2 = GeoData._get_weighting_matrix(A)
+            self.assertTrue(np.all(np.abs(w1 - w2) < 1.E-15))
+            self.assertTrue(np.all(w1.mask == w2.mask))
+            self.assertTrue(np.all(A.get_zonal_mean(return_object=False) ==
+                                   GeoData.get_zonal_mean(A, return_object=False)))
+
+        # the weights do not share the mask of the data
+        A.weighting_type = 'valid'
+        A.fldmean()
+        self.assertEqual(A.data.mask.shape, A.data.shape)
+
+        # latitude bands
+        z = A.get_zonal_mean(resolution=90.)
+        self.assertTrue(np.all(z.lat == np.array([-45., 45.])))
+        self.assertEqual(z.data.shape, (2, 4))
+        w = A._get_weighting_matrix()
+        ref = (A.data[:, :3, :] * w[:, :3, :]).sum(axis=2).sum(axis=1) / w[:, :3, :].sum(axis=2).sum(axis=1)
+        self.assertTrue(np.all(np.abs(z.data[1, :] - ref) < 1.E-12))
+
+if __name__ == "__main__":
+    unittest.main()
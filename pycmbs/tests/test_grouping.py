@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import datetime
+
+import numpy as np
+
+from pycmbs.data import Data
+from pycmbs.grouping import group_reduce
+
+
+class TestGrouping(unittest.TestCase):
+
+    def setUp(self):
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=60, ny=4, nx=5)
+        t = [datetime.datetime(2001 + i // 12, i % 12 + 1, 15) for i in xrange(60)]
+        self.D.time_str = 'days since 2001-01-01 00:00:00'
+        self.D.calendar = 'standard'
+        self.D.time = self.D.date2num(np.asarray(t))
+        self.D.data[5:24, 1, 2] = np.ma.masked
+        self.D.data[:, 3, 3] = np.ma.masked
+        self.years = np.asarray([d.year for d in t])
+
+    def test_group_reduce(self):
+        x = np.ma.array(np.random.random((20, 3, 2)))
+        x[2:5, 0, 0] = np.ma.masked
+        x[0:10, 1, 1] = np.ma.masked
+        g = np.asarray([3, 1, 2, 1] * 5)
+        msk = np.ones(20, dtype='bool')
+        msk[-4:] = False
+        labels, r = group_reduce(x, g, stats=['mean', 'sum', 'count', 'std', 'min', 'max'], mask=msk)
+        self.assertTrue(np.all(labels == [1, 2, 3]))
+        for i, l in enumerate(labels):
+            y = x[(g == l) & msk]
+            self.assertTrue(np.all(np.abs(r['mean'][i] - y.mean(axis=0)) < 1.E-12))
+            self.assertTrue(np.all(np.abs(r['sum'][i] - y.sum(axis=0)) < 1.E-12))
+            self.assertTrue(np.all(r['count'][i] == y.count(axis=0)))
+            self.assertTrue(np.all(np.abs(r['std'][i] - y.std(axis=0)) < 1.E-12))
+            self.assertTrue(np.all(r['min'][i] == y.min(axis=0)))
+            self.assertTrue(np.all(r['max'][i] == y.max(axis=0)))
+
+        # group without any selected timestep
+        msk = g != 2
+        labels, r = group_reduce(x, g, stats=['mean', 'count'], mask=msk)
+        self.assertTrue(np.all(r['mean'].mask[1]))
+        self.assertTrue(np.all(r['count'][1] == 0))
+
+        with self.assertRaises(ValueError):
+            group_reduce(x, g, stats=['median'])
+        with self.assertRaises(ValueError):
+            group_reduce(x, g[1:])
+
+    def test_get_yearmean(self):
+        msk = np.ones(60, dtype='bool')
+        msk[::12] = False
+        years, res = self.D.get_yearmean(mask=msk)
+        self.assertTrue(np.all(years == np.arange(2001, 2006)))
+        for i, y in enumerate(years):
+            ref = self.D.data[(self.years == y) & msk].mean(axis=0)
+            self.assertTrue(np.all(np.abs(res[i] - ref) < 1.E-12))
+            self.assertTrue(np.all(res.mask[i] == np.ma.getmaskarray(ref)))
+        r = self.D.get_yearmean(return_data=True)
+        self.assertEqual(r.data.shape, (5, 4, 5))
+        self.assertEqual(r.date[1].year, 2002)
+
+    def test_get_yearsum(self):
+        years, res = self.D.get_yearsum()
+        for i, y in enumerate(years):
+            ref = self.D.data[self.years == y].sum(axis=0)
+            self.assertTrue(np.all(np.abs(res[i] - ref) < 1.E-12))
+        # only data without any valid value is masked
+        self.assertTrue(np.all(res.mask[:, 3, 3]))
+        self.assertFalse(res.mask[0, 1, 2])
+        self.assertEqual(res[1, 1, 2], 0.)
+
+    def test_seasons(self):
+        labels, r = self.D.get_grouped_statistics('season', stats=['count'])
+        self.assertTrue(np.all(labels == [0, 1, 2, 3]))
+        self.assertEqual(r['count'][0, 0, 0], 15)
+        labels, r = self.D.get_grouped_statistics('month', stats=['mean'])
+        self.assertEqual(len(labels), 12)
+        ref = self.D.data[1::12].mean(axis=0)
+        self.assertTrue(np.all(np.abs(r['mean'][1] - ref) < 1.E-12))
+        with self.assertRaises(ValueError):
+            self.D.get_grouped_statistics('decade')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+import datetime
+
+import numpy as np
+from netCDF4 import Dataset, date2num
+
+from pycmbs.data import Data, set_memory_budget
+from pycmbs.lazy import LazyArray, ChunkCache
+
+
+class TestLazy(unittest.TestCase):
+
+    def setUp(self):
+        self.nt = 24
+        self.ny = 6
+        self.nx = 8
+        self.filename = tempfile.mktemp(suffix='.nc')
+        self.x = np.random.random((self.nt, self.ny, self.nx))
+        self.x[3, 2, 4] = -999.
+
+        F = Dataset(self.filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lat', self.ny)
+        F.createDimension('lon', self.nx)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t.calendar = 'standard'
+        dates = [datetime.datetime(2000 + i // 12, i % 12 + 1, 15) for i in xrange(self.nt)]
+        t[:] = date2num(dates, t.units, calendar=t.calendar)
+        lat = F.createVariable('lat', 'f8', ('lat',))
+        lat[:] = np.linspace(-50., 50., self.ny)  # increasing --> flipped
+        lon = F.createVariable('lon', 'f8', ('lon',))
+        lon[:] = np.arange(self.nx) * 45.
+        v = F.createVariable('var', 'f8', ('time', 'lat', 'lon'), fill_value=-999.)
+        v[:] = self.x
+        F.close()
+
+        self.cell_area = np.random.random((self.ny, self.nx)) + 1.
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def _get_data(self, **kwargs):
+        E = Data(self.filename, 'var', read=True, cell_area=self.cell_area.copy(), **kwargs)
+        L = Data(self.filename, 'var', read=True, cell_area=self.cell_area.copy(), lazy=True, **kwargs)
+        return E, L
+
+    def test_lazy_read(self):
+        E, L = self._get_data()
+        self.assertTrue(isinstance(L.data, LazyArray))
+        self.assertEqual(L.data.shape, E.data.shape)
+        self.assertTrue(np.all(L.time == E.time))
+        self.assertTrue(np.all(L.lat == E.lat))
+
+        x = L.data[:]
+        self.assertTrue(np.all(x.mask == E.data.mask))
+        self.assertTrue(np.all(x[~x.mask] == E.data[~E.data.mask]))
+        self.assertTrue(x.mask[3, self.ny - 3, 4])
+
+        # indexing
+        self.assertTrue(np.all(L.data[5] == E.data[5]))
+        self.assertTrue(np.all(L.data[:, 1, 2] == E.data[:, 1, 2]))
+        self.assertTrue(np.all(L.data[2:9:3, ::-1, 1:4] == E.data[2:9:3, ::-1, 1:4]))
+
+    def _reference(self):
+        # data on file flipped to N ... S
+        x = self.x[:, ::-1, :]
+        return np.ma.array(x, mask=x == -999.)
+
+    def test_lazy_timmean_fldmean(self):
+        E, L = self._get_data()
+        self.assertTrue(np.all(np.abs(L.timmean(return_object=False) - E.timmean(return_object=False)) < 1.E-10))
+
+        ref = self._reference()
+        ca = self.cell_area[::-1, :]
+        w = np.ma.array(ca[np.newaxis, :, :] * np.ones(ref.shape), mask=ref.mask)
+        fm = (w * ref).reshape(self.nt, -1).sum(axis=1) / w.reshape(self.nt, -1).sum(axis=1)
+        self.assertTrue(np.all(np.abs(L.fldmean(return_data=False) - fm) < 1.E-10))
+        fm = ref.reshape(self.nt, -1).mean(axis=1)
+        self.assertTrue(np.all(np.abs(L.fldmean(return_data=False, apply_weights=False) - fm) < 1.E-10))
+        r = L.fldmean()
+        self.assertEqual(r.data.shape, (self.nt, 1, 1))
+
+    def test_streaming_reductions(self):
+        E, L = self._get_data(memory_budget=20000)
+        self.assertTrue(np.all(np.abs(L.timstd(return_object=False) - E.timstd(return_object=False)) < 1.E-10))
+        self.assertTrue(np.all(np.abs(L.timvar(return_object=False) - E.timvar(return_object=False)) < 1.E-10))
+        self.assertTrue(isinstance(L.data, LazyArray))
+
+        c1 = L.get_climatology(return_object=True)
+        c2 = E.get_climatology(return_object=True)
+        self.assertTrue(np.all(np.abs(c1.data - c2.data) < 1.E-10))
+        self.assertTrue(np.all(c1.time == c2.time))
+
+        a1 = L.get_deseasonalized_anomaly(base='current')
+        a2 = E.get_deseasonalized_anomaly(base='current')
+        self.assertTrue(isinstance(a1.data, LazyArray))
+        self.assertTrue(np.all(np.abs(a1.data[:] - a2.data) < 1.E-10))
+        self.assertTrue(np.all(a1.data[:].mask == a2.data.mask))
+        self.assertTrue(np.all(np.abs(a1.data[5, 1:3, 2] - a2.data[5, 1:3, 2]) < 1.E-10))
+
+        # too small budget
+        L.memory_budget = 100
+        with self.assertRaises(ValueError):
+            L.timmean()
+        L.memory_budget = None
+        set_memory_budget(20000)
+        try:
+            self.assertTrue(np.all(np.abs(L.timmean(return_object=False) - E.timmean(return_object=False)) < 1.E-10))
+        finally:
+            set_memory_budget(None)
+
+    def test_subtract_cycle(self):
+        x = LazyArray(self.filename, 'var', fill_value=-999.)
+        cycle = np.random.random((5, self.ny, self.nx))
+        w = x.window((slice(3, 20),))
+        a = w.subtract_cycle(cycle)
+        ref = w[:] - cycle[np.arange(17) % 5]
+        self.assertTrue(np.all(np.abs(a[:] - ref) < 1.E-12))
+        b = a.window((slice(2, 9), slice(1, 4), np.array([0, 5, 7])))
+        self.assertTrue(np.all(np.abs(b[:] - ref[2:9, 1:4][:, :, [0, 5, 7]]) < 1.E-12))
+
+    def test_lazy_temporal_subsetting(self):
+        kw = {'start_time': datetime.datetime(2000, 4, 1), 'stop_time': datetime.datetime(2001, 3, 1)}
+        E, L = self._get_data(**kw)
+        self.assertTrue(isinstance(L.data, LazyArray))
+        self.assertEqual(len(L.data), 11)
+        self.assertTrue(np.all(L.time == E.time))
+        self.assertTrue(np.all(L.data[:] == E.data))
+
+    def test_lazy_scale_and_mask(self):
+        msk = np.ones((self.ny, self.nx)).astype('bool')
+        msk[0, :] = False
+        L = Data(self.filename, 'var', read=True, cell_area=self.cell_area, lazy=True, scale_factor=2., mask=msk)
+        ref = self._reference() * 2.
+        ref[:, -1, :] = np.ma.masked
+        x = L.data[:]
+        self.assertTrue(np.all(x.mask == ref.mask))
+        self.assertTrue(np.all(x == ref))
+
+    def test_lazy_arithmetic_loads_data(self):
+        E, L = self._get_data()
+        L.mulc(3., copy=False)
+        self.assertFalse(isinstance(L.data, LazyArray))
+        self.assertTrue(np.all(L.data == E.data * 3.))
+
+    def test_chunk_cache(self):
+        cache = ChunkCache(maxbytes=3 * self.ny * self.nx * 9)
+        x = LazyArray(self.filename, 'var', chunksize=1, cache=cache)
+        y = x[0:5]
+        self.assertTrue(cache.nbytes <= cache.maxbytes)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.misses, 5)
+        y = x[4]
+        self.assertEqual(cache.hits, 1)
+        y = x[0]
+        self.assertEqual(cache.misses, 6)
+
+        cache.set_size(0)
+        self.assertEqual(len(cache), 0)
+
+    def test_window_readonly(self):
+        x = LazyArray(self.filename, 'var', fill_value=-999.)
+        w = x.window((slice(2, 10), slice(1, 3)))
+        self.assertEqual(w.shape, (8, 2, self.nx))
+        self.assertTrue(np.all(w[:].data[~w[:].mask] == self.x[2:10, 1:3][~w[:].mask]))
+        with self.assertRaises(TypeError):
+            w[0] = 1.
+
+    def test_array_attributes(self):
+        cache = ChunkCache(maxbytes=0)
+        x = LazyArray(self.filename, 'var', fill_value=-999., chunksize=4, cache=cache)
+        self.assertTrue(x.mask[3, 2, 4])
+        n = cache.misses
+        self.assertEqual(x.filled(0.)[3, 2, 4], 0.)
+        self.assertTrue(np.all(x.mask == (self.x == -999.)))
+        self.assertEqual(cache.misses, n)  # window read only once
+        with self.assertRaises(AttributeError):
+            x.foo
+        w = x.window((slice(0, 2),))
+        self.assertEqual(w.mask.shape, (2, self.ny, self.nx))
+
+        # the cached data is not modified in place (reductions would
+        # read the file again and miss the changes)
+        with self.assertRaises(ValueError):
+            x.mask[0, 0, 0] = True
+        with self.assertRaises(ValueError):
+            x.data[0, 0, 0] = 1.
+
+    def test_lazy_temporal_mask(self):
+        E, L = self._get_data()
+        m = np.zeros(self.nt).astype('bool')
+        m[0] = True
+        E._apply_temporal_mask(m)
+        L._apply_temporal_mask(m)
+        self.assertTrue(np.all(L.data.mask[0]))
+        self.assertTrue(np.all(np.abs(L.timmean(return_object=False) - E.timmean(return_object=False)) < 1.E-10))
+
+if __name__ == "__main__":
+    unittest.main()
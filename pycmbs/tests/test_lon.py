@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+
+import numpy as np
+from netCDF4 import Dataset
+
+from pycmbs.data import Data
+from pycmbs.packed import PackedArray
+
+
+class TestLongitudes(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(3)
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=5, ny=4, nx=8)
+        self.D.data = np.ma.array(np.random.random((5, 4, 8)),
+                                  mask=np.random.random((5, 4, 8)) > 0.8)
+        self.D.lon, self.D.lat = np.meshgrid(np.arange(8) * 45. + 22.5,
+                                             np.linspace(60., -60., 4))
+        self.D.cell_area = np.random.random((4, 8)) + 1.
+        self.D._set_grid()
+
+    def test_shift_x(self):
+        x = self.D.copy()
+        x.shift_x(3)
+        self.assertTrue(np.all(x.data == np.roll(self.D.data, 3, axis=-1)))
+        self.assertTrue(np.all(x.data.mask == np.roll(self.D.data.mask, 3, axis=-1)))
+        self.assertTrue(np.all(x.lon == np.roll(self.D.lon, 3, axis=-1)))
+        self.assertTrue(np.all(x.cell_area == np.roll(self.D.cell_area, 3, axis=-1)))
+
+    def test_normalize(self):
+        self.assertEqual(self.D.get_grid().get_lon_convention(), '360')
+        x = self.D.copy()
+        x.normalize_lon('180')
+        self.assertEqual(x.get_grid().get_lon_convention(), '180')
+        self.assertFalse(x._lon360)
+        self.assertTrue(np.all(x.lon[0] == np.arange(8) * 45. - 157.5))
+        self.assertTrue(np.all(x.data == np.roll(self.D.data, 4, axis=-1)))
+        self.assertTrue(np.all(x.cell_area == np.roll(self.D.cell_area, 4, axis=-1)))
+
+        # second call is a no-op
+        d = x.data
+        x.normalize_lon('180')
+        self.assertTrue(x.data is d)
+
+        # and back
+        x.normalize_lon('360')
+        self.assertTrue(np.all(x.lon == self.D.lon))
+        self.assertTrue(np.all(x.data == self.D.data))
+        self.assertTrue(x.get_grid() is self.D.get_grid())
+
+        with self.assertRaises(ValueError):
+            x.normalize_lon('90')
+
+    def test_packed(self):
+        x = self.D.copy()
+        x.pack()
+        x.normalize_lon('180')
+        self.assertTrue(isinstance(x.data, PackedArray))
+        y = self.D.copy()
+        y.normalize_lon('180')
+        self.assertTrue(np.all(x.data.load().mask == y.data.mask))
+        self.assertTrue(np.all(x.data.load() == y.data))
+
+    def test_read(self):
+        filename = tempfile.mktemp(suffix='.nc')
+        F = Dataset(filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lat', 4)
+        F.createDimension('lon', 8)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t[:] = np.arange(5) * 30.
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.linspace(60., -60., 4)
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(8) * 45.
+        F.createVariable('var', 'f8', ('time', 'lat', 'lon'))[:] = self.D.data.data
+        F.close()
+        try:
+            E = Data(filename, 'var', read=True, lon_convention='180')
+            L = Data(filename, 'var', read=True, lon_convention='180', lazy=True)
+            self.assertTrue(np.all(E.lon[0] == np.arange(8) * 45. - 180.))
+            self.assertTrue(np.all(E.data == np.roll(self.D.data.data, 4, axis=-1)))
+            self.assertTrue(np.all(L.lon == E.lon))
+            self.assertTrue(np.all(L.data.load() == E.data))
+        finally:
+            os.remove(filename)
+
+if __name__ == "__main__":
+    unittest.main()
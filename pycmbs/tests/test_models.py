@@ -34,6 +34,7 @@ def test_mean_model():
     Z.variables={'var1': z, 'var2': z}
 
     #... now try multimodel ensemble
+    x0 = x.data.copy()
     M=MeanModel(dic_variables,intervals='season')
     M.add_member(X)
     M.add_member(Y)
@@ -42,6 +43,10 @@ def test_mean_model():
     # print M.variables['var2'].div(x).data #should give 0.6
     npt.assert_equal(np.all(np.abs(1. - M.variables['var2'].div(x).data/0.6) < 0.00000001), True)
 
+    # the members share their data with the mean model, but are not modified
+    npt.assert_equal(np.all(x.data == x0), True)
+    npt.assert_equal(M.variables['var1'].data.flags.writeable, True)
+
 def xxxxtest_median_model():
     x = Data(None, None)
     x.label = 'nothing'
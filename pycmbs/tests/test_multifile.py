@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import datetime
+
+import numpy as np
+from netCDF4 import Dataset, date2num
+
+from pycmbs.data import Data
+from pycmbs.lazy import LazyArray
+from pycmbs.multifile import is_file_pattern, expand_filenames
+
+
+class TestMultiFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp() + os.sep
+        self.x = np.random.random((36, 4, 5))
+        self.dates = [datetime.datetime(2000 + i // 12, i % 12 + 1, 15) for i in xrange(36)]
+        # one file per year; the time units differ between the files
+        for y in xrange(3):
+            self._write(self.dir + 'var_%i.nc' % (2000 + y), range(12 * y, 12 * y + 12),
+                        'days since %i-01-01 00:00:00' % (1990 + 5 * y))
+
+    def _write(self, filename, idx, units):
+        F = Dataset(filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lat', 4)
+        F.createDimension('lon', 5)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = units
+        t.calendar = 'standard'
+        t[:] = date2num([self.dates[i] for i in idx], units, calendar='standard')
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.linspace(60., -60., 4)
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(5) * 72.
+        F.createVariable('var', 'f8', ('time', 'lat', 'lon'))[:] = self.x[idx]
+        F.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pattern(self):
+        self.assertTrue(is_file_pattern(self.dir + 'var_*.nc'))
+        self.assertTrue(is_file_pattern([self.dir + 'var_2000.nc']))
+        self.assertFalse(is_file_pattern(self.dir + 'var_2000.nc'))
+        self.assertEqual(expand_filenames([self.dir + 'var_200[12].nc', self.dir + 'var_2001.nc']),
+                         [self.dir + 'var_2001.nc', self.dir + 'var_2002.nc'])
+
+    def test_read(self):
+        D = Data(self.dir + 'var_*.nc', 'var', read=True)
+        self.assertEqual(len(D.files), 3)
+        self.assertEqual(D.time_str, 'days since 1990-01-01 00:00:00')
+        self.assertTrue(np.all(np.abs(D.data - self.x) < 1.E-12))
+        self.assertEqual([(d.year, d.month, d.day) for d in D.date],
+                         [(d.year, d.month, d.day) for d in self.dates])
+
+    def test_read_period(self):
+        start = datetime.datetime(2001, 3, 1)
+        stop = datetime.datetime(2002, 2, 28)
+        for lazy in [False, True]:
+            D = Data(self.dir + 'var_*.nc', 'var', read=True, start_time=start,
+                     stop_time=stop, lazy=lazy)
+            self.assertEqual(D.files, [self.dir + 'var_2001.nc', self.dir + 'var_2002.nc'])
+            self.assertEqual(D.nt, 12)
+            self.assertTrue(np.all(np.abs(D.data - self.x[14:26]) < 1.E-12))
+
+        # single file remains lazy
+        D = Data(self.dir + 'var_*.nc', 'var', read=True, start_time=start,
+                 stop_time=datetime.datetime(2001, 6, 1), lazy=True)
+        self.assertEqual(D.files, [self.dir + 'var_2001.nc'])
+        self.assertTrue(isinstance(D.data, LazyArray))
+
+        with self.assertRaises(ValueError):
+            Data(self.dir + 'var_*.nc', 'var', read=True,
+                 start_time=datetime.datetime(2010, 1, 1),
+                 stop_time=datetime.datetime(2010, 12, 31))
+
+    def test_overlap(self):
+        self._write(self.dir + 'var_x.nc', range(10, 14), 'days since 2000-01-01 00:00:00')
+        with self.assertRaises(ValueError):
+            Data(self.dir + 'var_*.nc', 'var', read=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,8 +6,11 @@ For COPYING and LICENSE details, please refer to the LICENSE file
 """
 
 import unittest
+import os
+import tempfile
 from pycmbs import netcdf
 import numpy as np
+from netCDF4 import Dataset
 
 class TestPycmbsNetcdf(unittest.TestCase):
 
@@ -31,6 +34,170 @@ class TestPycmbsNetcdf(unittest.TestCase):
     def test_netCDFHandlerinit_Default(self):
         cdf = netcdf.NetCDFHandler()
 
+    def test_get_variable_TimeSliceLevel(self):
+        fname = tempfile.mktemp(suffix='.nc')
+        x = np.random.random((10, 3, 4, 5))
+        F = Dataset(fname, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lev', 3)
+        F.createDimension('lat', 4)
+        F.createDimension('lon', 5)
+        F.createVariable('x', 'f8', ('time', 'lev', 'lat', 'lon'))[:] = x
+        F.createVariable('y', 'f8', ('lat', 'lon'))[:] = x[0, 0]
+        F.close()
+
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        self.assertTrue(np.all(cdf.get_variable('x') == x))
+        self.assertTrue(np.all(cdf.get_variable('x', time_slice=slice(2, 5)) == x[2:5]))
+        self.assertTrue(np.all(cdf.get_variable('x', level=1) == x[:, 1]))
+        self.assertTrue(np.all(cdf.get_variable('x', time_slice=slice(7, 10), level=2) == x[7:10, 2]))
+        self.assertEqual(cdf.get_dimensions('x'), ('time', 'lev', 'lat', 'lon'))
+        with self.assertRaises(ValueError):
+            cdf.get_variable('y', level=1)
+        cdf.close()
+        os.remove(fname)
+
+    def _write_file(self, fname, x):
+        F = Dataset(fname, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lat', 4)
+        F.createDimension('lon', 5)
+        F.createVariable('time', 'f8', ('time',))[:] = np.arange(len(x))
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.arange(4)
+        F.createVariable('x', 'f8', ('time', 'lat', 'lon'))[:] = x
+        F.close()
+
+    def test_file_pool(self):
+        fname = tempfile.mktemp(suffix='.nc')
+        x = np.random.random((10, 4, 5))
+        self._write_file(fname, x)
+
+        pool = netcdf.default_pool
+        pool.clear()
+        hits = pool.hits
+        misses = pool.misses
+        for i in xrange(3):
+            cdf = netcdf.NetCDFHandler()
+            cdf.open_file(fname, 'r')
+            self.assertTrue(np.all(cdf.get_variable('x') == x))
+            t = cdf.get_variable('time', time_slice=slice(2, 5))
+            self.assertTrue(np.all(t == [2., 3., 4.]))
+            t[:] = -1.  # must not modify cached coordinates
+            cdf.close()
+        self.assertEqual(pool.misses - misses, 1)
+        self.assertEqual(pool.hits - hits, 2)
+        self.assertEqual(len(pool), 1)
+
+        # file is opened again after it was modified
+        os.remove(fname)
+        self._write_file(fname, x[0:6] * 2.)
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        self.assertTrue(np.all(cdf.get_variable('x') == x[0:6] * 2.))
+        self.assertTrue(np.all(cdf.get_variable('time') == np.arange(6)))
+        self.assertEqual(pool.misses - misses, 2)
+        self.assertEqual(len(pool), 1)
+        cdf.close()
+
+        # closing twice must not close the file shared by the pool
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        cdf.close()
+        cdf.close()
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        self.assertTrue(np.all(cdf.get_variable('x') == x[0:6] * 2.))
+        cdf.close()
+
+        # writing closes files of the pool
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'w')
+        cdf.close()
+        self.assertEqual(len(pool), 0)
+        os.remove(fname)
+
+    def test_file_pool_eviction(self):
+        files = [tempfile.mktemp(suffix='.nc') for i in xrange(3)]
+        for f in files:
+            self._write_file(f, np.random.random((2, 4, 5)))
+        pool = netcdf.FilePool(maxfiles=2)
+        keys = []
+        for f in files:
+            key, F = pool.open(f, netcdf.NetCDFHandler().handler)
+            keys.append(key)
+        # files in use are not closed
+        self.assertEqual(len(pool), 3)
+        pool.release(keys[1])
+        self.assertEqual(len(pool), 2)
+        self.assertFalse(keys[1] in pool._files)
+        pool.release(keys[0])
+        pool.release(keys[2])
+        self.assertEqual(len(pool), 2)
+        pool.set_size(0)
+        self.assertEqual(len(pool), 0)
+        for f in files:
+            os.remove(f)
+
+    def test_get_chunksizes(self):
+        c = netcdf.get_chunksizes((120, 180, 360), 'time', itemsize=4, chunkbytes=120 * 100 * 4)
+        self.assertEqual(c[0], 120)
+        self.assertTrue(np.prod(c) * 4 <= 120 * 100 * 4)
+        c = netcdf.get_chunksizes((120, 180, 360), 'map', chunkbytes=2 ** 30)
+        self.assertEqual(c, (1, 180, 360))
+        c = netcdf.get_chunksizes((180, 360), 'map', itemsize=8, chunkbytes=8 * 100)
+        self.assertEqual(c, (10, 10))
+        with self.assertRaises(ValueError):
+            netcdf.get_chunksizes((10, 10), 'invalid')
+
+    def test_write_chunked_slabs(self):
+        fname = tempfile.mktemp(suffix='.nc')
+        x = np.ma.array(np.random.random((25, 4, 5)))
+        x[3, 2, 1] = np.ma.masked
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'w')
+        cdf.create_dimension('time', size=25)
+        cdf.create_dimension('ny', size=4)
+        cdf.create_dimension('nx', size=5)
+        cdf.create_variable('x', 'f4', ('time', 'ny', 'nx'), complevel=1,
+                            shuffle=False, chunking='time', fill_value=-99.)
+        cdf.assign_value('x', x, slabbytes=3 * 4 * 5 * 4)
+        cdf.close()
+
+        F = Dataset(fname, 'r')
+        v = F.variables['x']
+        self.assertEqual(v.chunking(), [25, 4, 5])
+        self.assertEqual(v.filters()['complevel'], 1)
+        self.assertFalse(v.filters()['shuffle'])
+        self.assertTrue(np.all(np.abs(v[:] - x) < 1.E-6))
+        self.assertTrue(v[:].mask[3, 2, 1])
+        F.close()
+        os.remove(fname)
+
+    def test_append_mode(self):
+        fname = tempfile.mktemp(suffix='.nc')
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'w')
+        cdf.create_dimension('nx', size=3)
+        cdf.close()
+        # file is kept open in the pool
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        cdf.close()
+
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'a')
+        cdf.create_variable('x', 'f8', ('nx',))
+        cdf.assign_value('x', np.arange(3.))
+        cdf.close()
+
+        cdf = netcdf.NetCDFHandler()
+        cdf.open_file(fname, 'r')
+        self.assertTrue(np.all(cdf.get_variable('x') == np.arange(3.)))
+        cdf.close()
+        netcdf.default_pool.remove(fname)
+        os.remove(fname)
+
 
 if __name__ == "__main__":
     unittest.main()
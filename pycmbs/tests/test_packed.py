@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+
+import numpy as np
+
+from pycmbs.data import Data
+from pycmbs.packed import PackedArray, get_packing_index
+from pycmbs.diagnostic import Diagnostic
+from pycmbs.timeaxis import date2num
+from geoval.core.data import GeoData
+
+
+class TestPacked(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(7)
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=36, ny=6, nx=8)
+        self.D.data = np.ma.array(np.random.random((36, 6, 8)) + 1.,
+                                  mask=np.zeros((36, 6, 8), dtype='bool'))
+        self.D.cell_area = np.random.random((6, 8)) + 1.
+        self.land = np.random.random((6, 8)) > 0.6
+        self.D._apply_mask(self.land)
+        self.D.data.mask[3, 0, :] = True
+
+    def _packed(self, x):
+        r = x.copy()
+        r.pack(self.land)
+        return r
+
+    def test_pack(self):
+        P = self._packed(self.D)
+        self.assertTrue(isinstance(P.data, PackedArray))
+        self.assertEqual(P.data.values.shape, (36, self.land.sum()))
+        self.assertEqual(P.data.shape, self.D.data.shape)
+        self.assertEqual(P.nt, 36)
+        x = P.data.load()
+        self.assertTrue(np.all(x.mask == self.D.data.mask))
+        self.assertTrue(np.all(x[~x.mask] == self.D.data[~self.D.data.mask]))
+        self.assertTrue(np.all(P.data[3].mask == self.D.data[3].mask))
+        self.assertTrue(np.all(P.data[2:4, 1, :] == self.D.data[2:4, 1, :]))
+
+        # index is shared
+        Q = self._packed(self.D)
+        self.assertTrue(Q.data.index is P.data.index)
+        self.assertTrue(get_packing_index(self.land.copy()) is P.data.index)
+        with self.assertRaises(TypeError):
+            P.data[0, 0, 0] = 1.
+
+        # default: all cells with at least one valid value
+        Q = self.D.copy()
+        Q.pack()
+        self.assertTrue(np.all(Q.data.index.valid == self.land))
+        Q.unpack()
+        self.assertTrue(isinstance(Q.data, np.ma.MaskedArray))
+
+    def test_arithmetic(self):
+        P = self._packed(self.D)
+        Q = self._packed(self.D)
+        P.mulc(2., copy=False)
+        self.assertTrue(isinstance(P.data, PackedArray))
+        r = P.data - Q.data
+        self.assertTrue(isinstance(r, PackedArray))
+        self.assertTrue(np.all(np.abs(r.load() - self.D.data) < 1.E-12))
+        x = P.data * self.D.data
+        self.assertTrue(isinstance(x, np.ma.MaskedArray))
+
+        msk = np.ones((6, 8), dtype='bool')
+        msk[0, :] = False
+        P._apply_mask(msk)
+        self.assertTrue(isinstance(P.data, PackedArray))
+        self.assertTrue(np.all(P.data.load().mask[:, 0, :]))
+
+    def test_temporal_mask(self):
+        P = self._packed(self.D)
+        tmsk = np.zeros(36, dtype='bool')
+        tmsk[[0, 5, 20]] = True
+        P._apply_temporal_mask(tmsk)
+        self.assertTrue(isinstance(P.data, PackedArray))
+        D = self.D.copy()
+        D._apply_temporal_mask(tmsk)
+        self.assertTrue(np.all(P.data.load().mask == D.data.mask))
+        self.assertTrue(np.all(np.abs(P.timmean(return_object=False) -
+                                      D.timmean(return_object=False)) < 1.E-12))
+
+        # arrays of the expanded data are read-only
+        with self.assertRaises(ValueError):
+            P.data.mask[1, 0, 0] = True
+        with self.assertRaises(ValueError):
+            P.data.data[1, 0, 0] = 0.
+
+    def test_reductions(self):
+        P = self._packed(self.D)
+        self.assertTrue(np.all(np.abs(P.timmean(return_object=False) -
+                                      self.D.timmean(return_object=False)) < 1.E-12))
+        self.assertTrue(isinstance(P.timmean().data, PackedArray))
+        for wt in ['valid', 'all']:
+            P.weighting_type = wt
+            self.D.weighting_type = wt
+            r1 = P.fldmean(return_data=False)
+            r2 = GeoData.fldmean(self.D.copy(), return_data=False)
+            self.assertTrue(np.all(np.abs(r1 - r2) < 1.E-12))
+            w1 = P._get_weighting_matrix()
+            w2 = self.D._get_weighting_matrix()
+            self.assertTrue(np.all(np.abs(w1 - w2) < 1.E-12))
+
+    def test_correlate(self):
+        Y = self.D.copy()
+        Y.data = Y.data * 0.5 + np.random.random((36, 6, 8)) * 0.3
+        R1, P1 = self._packed(self.D).correlate(self._packed(Y))
+        R2, P2 = GeoData.correlate(self.D, Y)
+        self.assertTrue(isinstance(R1.data, PackedArray))
+        self.assertTrue(np.all(R1.data.load().mask == R2.data.mask))
+        self.assertTrue(np.all(np.abs(R1.data.load() - R2.data) < 1.E-10))
+        self.assertTrue(np.all(np.abs(P1.data.load() - P2.data) < 1.E-10))
+
+    def test_reichler(self):
+        Y = self.D.copy()
+        Y.data = Y.data * 0.9
+        self.D.std = np.ones(self.D.shape) * 0.1
+        m = np.arange(36)
+        self.D.time = date2num(2000 + m // 12, m % 12 + 1, 15, time_str=self.D.time_str,
+                               calendar=self.D.calendar)
+        Y.time = self.D.time.copy()
+        X = self._packed(self.D)
+        e1 = Diagnostic(X, y=self._packed(Y)).calc_reichler_index()
+        e2 = Diagnostic(self.D, y=Y).calc_reichler_index()
+        self.assertTrue(np.all(np.abs(e1 - e2) < 1.E-12))
+
+if __name__ == "__main__":
+    unittest.main()
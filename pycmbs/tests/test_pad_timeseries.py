@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import datetime
+
+import numpy as np
+
+from pycmbs.data import Data
+
+
+class TestPadTimeseries(unittest.TestCase):
+
+    def _get_data(self, dates):
+        D = Data(None, None)
+        D._init_sample_object(nt=len(dates), ny=3, nx=4)
+        D.time_str = 'days since 1980-01-01 00:00:00'
+        D.calendar = 'standard'
+        D.time = D.date2num(np.asarray(dates))
+        D.data = np.ma.array(np.random.random((len(dates), 3, 4)))
+        return D
+
+    def test_pad_monthly(self):
+        dates = [datetime.datetime(1980 + i // 12, i % 12 + 1, 15) for i in xrange(60)]
+        keep = np.ones(60, dtype='bool')
+        keep[[3, 4, 11, 12, 13, 40]] = False  # gaps also across the year boundary
+        D = self._get_data([d for d, k in zip(dates, keep) if k])
+        x = D.data.copy()
+        x[2, 1, 1] = -99.
+        D.data = x.copy()
+
+        D._pad_timeseries(fill_value=-99.)
+        self.assertEqual(len(D.time), 60)
+        self.assertEqual(D.data.shape, (60, 3, 4))
+        self.assertEqual(D.time_cycle, 12)
+        self.assertTrue(np.all(D.data.mask[~keep]))
+        self.assertTrue(np.all(D.data[keep][~x.mask] == x[~x.mask]))
+        self.assertTrue(D.data.mask[2, 1, 1])
+        self.assertTrue(np.all(np.asarray([d.month for d in D.date]) == np.arange(60) % 12 + 1))
+        self.assertTrue(np.all(np.asarray([d.day for d in D.date]) == 15))
+
+    def test_pad_daily(self):
+        dates = [datetime.datetime(2000, 1, 1) + datetime.timedelta(days=i) for i in xrange(100)]
+        keep = np.random.random(100) > 0.3
+        keep[0] = True
+        keep[-1] = True
+        D = self._get_data([d for d, k in zip(dates, keep) if k])
+        x = D.data.copy()
+        D._pad_timeseries(freq='daily')
+        self.assertEqual(len(D.time), 100)
+        self.assertTrue(np.all(np.diff(D.time) == 1.))
+        self.assertTrue(np.all(D.data.mask[~keep]))
+        self.assertTrue(np.all(D.data[keep] == x))
+
+    def test_pad_invalid(self):
+        D = self._get_data([datetime.datetime(2000, 1, 1), datetime.datetime(2000, 1, 20)])
+        with self.assertRaises(ValueError):
+            D._pad_timeseries()
+        with self.assertRaises(ValueError):
+            D._pad_timeseries(freq='hourly')
+        D = self._get_data([datetime.datetime(2000, 1, 1, 6), datetime.datetime(2000, 1, 1, 18)])
+        with self.assertRaisesRegexp(ValueError, 'same day$'):
+            D._pad_timeseries(freq='daily')
+
+if __name__ == "__main__":
+    unittest.main()
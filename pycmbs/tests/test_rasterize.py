@@ -87,6 +87,59 @@ class TestData(unittest.TestCase):
         self.assertEqual(res.data[1,2], 0.7)
         self.assertEqual(res.ny*res.nx - res.data.mask.sum(), 4)
 
+    def test_rasterize_methods(self):
+        x = Data(None, None)
+        x._init_sample_object(ny=1, nx=272)
+        x.lon = np.asarray([1.4, 1.6, 1.55, 3.6, 3.5])
+        x.lat = np.asarray([10.1, 9.9, 10.0, 11.3, 12.])
+        x.data = np.ma.array([1., 3., 5., 0.7, 2.], mask=[False, False, False, False, True])
+
+        lon = np.asarray([1.5, 2.5, 3.5])
+        lat = np.asarray([10., 11., 12.])
+        LON, LAT = np.meshgrid(lon, lat)
+
+        res = x._rasterize(LON, LAT, radius=0.5, method='nearest')
+        self.assertEqual(res.data[0, 0], 5.)
+        res = x._rasterize(LON, LAT, radius=0.5, method='mean')
+        self.assertAlmostEqual(res.data[0, 0], 3.)
+        self.assertAlmostEqual(res.data[1, 2], 0.7)
+        self.assertEqual(res.data.mask.sum(), 7)
+        res = x._rasterize(LON, LAT, radius=0.5, method='count')
+        self.assertEqual(res.data[0, 0], 3)
+        self.assertEqual(res.data[2, 2], 0)
+
+        # radius in km; 0.05 deg are about 5.5 km at 10N
+        res = x._rasterize(LON, LAT, radius=6., radius_units='km', method='count')
+        self.assertEqual(res.data.sum(), 1)
+        res = x._rasterize(LON, LAT, radius=20., radius_units='km', method='count')
+        self.assertEqual(res.data.sum(), 3)
+
+        with self.assertRaises(ValueError):
+            x._rasterize(LON, LAT, radius=0.5, method='median')
+        with self.assertRaises(ValueError):
+            x._rasterize(LON, LAT, radius=0.5, radius_units='m')
+
+    def test_rasterize_bruteforce(self):
+        x = Data(None, None)
+        x._init_sample_object(ny=1, nx=500)
+        x.lon = np.random.random(500) * 360.
+        x.lat = np.random.random(500) * 180. - 90.
+        x.data = np.random.random(500)
+        LON, LAT = np.meshgrid(np.arange(0., 360., 10.) + 5., np.arange(-90., 90., 10.) + 5.)
+        res = x._rasterize(LON, LAT, radius=180., method='count')
+        self.assertEqual(res.data.sum(), 500)
+
+        # nearest cell by great circle distance
+        rlon = np.deg2rad(LON.flatten())
+        rlat = np.deg2rad(LAT.flatten())
+        cnt = np.zeros(LON.size)
+        for i in xrange(500):
+            lo = np.deg2rad(x.lon[i])
+            la = np.deg2rad(x.lat[i])
+            d = np.arccos(np.clip(np.sin(la) * np.sin(rlat) + np.cos(la) * np.cos(rlat) * np.cos(rlon - lo), -1., 1.))
+            cnt[d.argmin()] += 1
+        self.assertTrue(np.all(cnt.reshape(LON.shape) == res.data))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+import datetime
+
+import numpy as np
+from netCDF4 import Dataset, date2num
+
+from pycmbs.data import Data
+from geoval.region import RegionBboxLatLon, RegionIndex, RegionPolygon
+
+
+class TestRead(unittest.TestCase):
+
+    def setUp(self):
+        self.nt = 36
+        self.ny = 4
+        self.nx = 6
+        self.filename = tempfile.mktemp(suffix='.nc')
+        self.x = np.random.random((self.nt, self.ny, self.nx))
+        self.x4 = np.random.random((self.nt, 3, self.ny, self.nx))
+
+        F = Dataset(self.filename, 'w')
+        F.createDimension('time', None)
+        F.createDimension('lev', 3)
+        F.createDimension('lat', self.ny)
+        F.createDimension('lon', self.nx)
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 1999-01-01 00:00:00'
+        t.calendar = 'standard'
+        dates = [datetime.datetime(1999 + i // 12, i % 12 + 1, 15) for i in xrange(self.nt)]
+        t[:] = date2num(dates, t.units, calendar=t.calendar)
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.linspace(60., -60., self.ny)
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(self.nx) * 60.
+        F.createVariable('var', 'f8', ('time', 'lat', 'lon'))[:] = self.x
+        F.createVariable('var4', 'f8', ('time', 'lev', 'lat', 'lon'))[:] = self.x4
+        F.close()
+        self.cell_area = np.ones((self.ny, self.nx))
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_read_time_window(self):
+        start = datetime.datetime(2000, 3, 1)
+        stop = datetime.datetime(2000, 11, 20)
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area, start_time=start, stop_time=stop)
+        self.assertEqual(D._read_time_slice, slice(14, 23))
+        self.assertEqual(len(D.time), 9)
+        self.assertEqual(D.data.shape, (9, self.ny, self.nx))
+        self.assertTrue(np.all(D.data == self.x[14:23]))
+        self.assertEqual(D.date[0].month, 3)
+        self.assertEqual(D.date[-1].month, 11)
+
+        # window of time indices
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area, time_window=(14, 23))
+        self.assertEqual(D.data.shape, (9, self.ny, self.nx))
+        self.assertTrue(np.all(D.data == self.x[14:23]))
+        self.assertEqual(D.date[0].month, 3)
+        with self.assertRaises(ValueError):
+            Data(self.filename, 'var', read=True, time_window=(14, 23), lazy=True)
+
+        # only start date
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area, start_time=start)
+        self.assertTrue(np.all(D.data == self.x[14:]))
+
+    def test_read_time_window_WithTimeCycle(self):
+        # full data needs to be read for the climatology
+        start = datetime.datetime(2000, 1, 1)
+        stop = datetime.datetime(2000, 12, 31)
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area, start_time=start, stop_time=stop, time_cycle=12)
+        self.assertTrue(D._read_time_slice is None)
+        self.assertTrue(np.all(D.data == self.x[12:24]))
+        self.assertTrue(np.all(np.abs(D._climatology_raw - self.x.reshape((3, 12, self.ny, self.nx)).mean(axis=0)) < 1.E-10))
+
+    def test_read_level(self):
+        start = datetime.datetime(2001, 1, 1)
+        D = Data(self.filename, 'var4', read=True, cell_area=self.cell_area, level=2, start_time=start)
+        self.assertTrue(np.all(D.data == self.x4[24:, 2]))
+
+    def test_get_time_indices(self):
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area)
+        i1, i2 = D._get_time_indices(datetime.datetime(1999, 2, 15), datetime.datetime(1999, 5, 14))
+        self.assertEqual((i1, i2), (1, 3))
+        i1, i2 = D._get_time_indices(None, datetime.datetime(1999, 5, 15))
+        self.assertEqual((i1, i2), (0, 4))
+        with self.assertRaises(ValueError):
+            D._get_time_indices(datetime.datetime(1999, 5, 16), datetime.datetime(1999, 5, 20))
+
+    def test_read_bbox_seam(self):
+        # box crosses the 0/360 seam of the file
+        D = Data(self.filename, 'var', read=True, bbox=(-70., 70., -30., 30.))
+        ref = self.x[:, 1:3][:, :, [5, 0, 1]]
+        self.assertEqual(D.data.shape, ref.shape)
+        self.assertTrue(np.all(D.data == ref))
+        self.assertTrue(np.all(D.lon[0, :] == np.asarray([300., 0., 60.])))
+        self.assertTrue(np.all(D.lat[:, 0] == np.asarray([20., -20.])))
+        self.assertEqual(D.cell_area.shape, (2, 3))
+
+        # the same lazily
+        L = Data(self.filename, 'var', read=True, bbox=(-70., 70., -30., 30.), lazy=True)
+        self.assertEqual(L.data.shape, ref.shape)
+        self.assertTrue(np.all(L.data[:] == ref))
+        self.assertTrue(np.all(np.abs(L.timmean(return_object=False) - ref.mean(axis=0)) < 1.E-10))
+
+    def test_read_bbox_region(self):
+        R = RegionBboxLatLon(1, 50., 130., -70., 0., label='test')
+        D = Data(self.filename, 'var', read=True, cell_area=self.cell_area, region=R, start_time=datetime.datetime(2001, 1, 1))
+        self.assertTrue(np.all(D.data == self.x[24:, 2:4, 1:3]))
+        self.assertEqual(D.cell_area.shape, (2, 2))
+
+        R = RegionIndex(1, 2, 5, 0, 3, label='test')
+        D = Data(self.filename, 'var', read=True, region=R)
+        self.assertTrue(np.all(D.data == self.x[:, 0:3, 2:5]))
+
+        with self.assertRaises(ValueError):
+            Data(self.filename, 'var', read=True, bbox=(10., 20., -30., 30.))
+
+        # regions without bounding box or indices (e.g. polygons)
+        P = RegionPolygon(1, [-10., 10., 10.], [-10., -10., 10.], label='test')
+        with self.assertRaises(ValueError):
+            Data(self.filename, 'var', read=True, region=P)
+
+    def test_read_bbox_dateline(self):
+        # file with longitudes -180 ... 180 and box crossing the dateline
+        fname = tempfile.mktemp(suffix='.nc')
+        F = Dataset(fname, 'w')
+        F.createDimension('lat', 2)
+        F.createDimension('lon', 8)
+        F.createVariable('lat', 'f8', ('lat',))[:] = np.asarray([10., -10.])
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(8) * 45. - 180.
+        F.createVariable('var', 'f8', ('lat', 'lon'))[:] = self.x[0, 0:2, 0:1] * np.arange(8)
+        F.close()
+        D = Data(fname, 'var', read=True, bbox=(130., 230., -20., 20.))
+        self.assertTrue(np.all(D.lon[0, :] == np.asarray([135., -180., -135.])))
+        self.assertTrue(np.all(D.data == (self.x[0, 0:2, 0:1] * np.arange(8))[:, [7, 0, 1]]))
+        os.remove(fname)
+
+    def test_read_region_index_ascending_lat(self):
+        # indices refer to the object, also if the file is stored S ... N
+        fname = tempfile.mktemp(suffix='.nc')
+        lat = np.asarray([-75., -45., -15., 15., 45., 75.])
+        F = Dataset(fname, 'w')
+        F.createDimension('lat', 6)
+        F.createDimension('lon', 3)
+        F.createVariable('lat', 'f8', ('lat',))[:] = lat
+        F.createVariable('lon', 'f8', ('lon',))[:] = np.arange(3) * 10.
+        F.createVariable('var', 'f8', ('lat', 'lon'))[:] = lat[:, None] + np.arange(3)
+        F.close()
+        D = Data(fname, 'var', read=True)
+        R = Data(fname, 'var', read=True, region=RegionIndex(1, 0, 2, 0, 2, label='test'))
+        self.assertTrue(np.all(R.lat[:, 0] == np.asarray([75., 45.])))
+        self.assertTrue(np.all(R.data == D.data[0:2, 0:2]))
+        os.remove(fname)
+
+if __name__ == "__main__":
+    unittest.main()
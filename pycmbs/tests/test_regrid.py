@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.spatial import ConvexHull
+from netCDF4 import Dataset
+
+from pycmbs.icon import Icon
+from pycmbs import regrid
+from pycmbs.regrid import Regridder, apply_weights, get_target_grid, gaussian_latitudes, get_cell_area
+from pycmbs.constants import EarthRadius
+
+
+def _sample_mesh(n):
+    # triangulation of quasi uniform points on the sphere
+    i = np.arange(n) + 0.5
+    z = 1. - 2. * i / n
+    phi = np.pi * (1. + 5 ** 0.5) * i
+    r = np.sqrt(1. - z ** 2)
+    p = np.column_stack((r * np.cos(phi), r * np.sin(phi), z))
+    v = p[ConvexHull(p).simplices]
+    c = v.sum(axis=1)
+    c /= np.sqrt((c ** 2).sum(axis=1))[:, np.newaxis]
+    lon = np.arctan2(c[:, 1], c[:, 0])
+    lat = np.arcsin(c[:, 2])
+    vlon = np.arctan2(v[..., 1], v[..., 0])
+    vlat = np.arcsin(v[..., 2])
+    return lon, lat, vlon, vlat
+
+
+class TestRegrid(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(3)
+        lon, lat, vlon, vlat = _sample_mesh(500)
+        self.lon = np.rad2deg(lon)
+        self.lat = np.rad2deg(lat)
+        self.R = Regridder(self.lon, self.lat, np.rad2deg(vlon), np.rad2deg(vlat))
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_target_grid(self):
+        lon, lat = get_target_grid('t63grid')
+        self.assertEqual((len(lon), len(lat)), (192, 96))
+        self.assertTrue(np.all(np.diff(lat) < 0.))
+        self.assertTrue(abs(lat[0] - 88.572168514) < 1.E-6)
+        lon, lat = get_target_grid('r360x180')
+        self.assertEqual((lon[1], lat[0]), (1., -89.5))
+        A = get_cell_area(lon, lat)
+        self.assertTrue(abs(A.sum() / (4. * np.pi * EarthRadius ** 2) - 1.) < 1.E-12)
+        self.assertTrue(np.all(np.abs(gaussian_latitudes(4) + gaussian_latitudes(4)[::-1]) < 1.E-12))
+        LON, LAT = np.meshgrid(lon[:5], lat[:3])
+        x, y = get_target_grid((LON, LAT))
+        self.assertTrue(np.all(x == lon[:5]) and np.all(y == lat[:3]))
+        for t in ['t64grid', 'abc', (LON, LAT.T)]:
+            with self.assertRaises(ValueError):
+                get_target_grid(t)
+
+    def test_weights(self):
+        target = (np.arange(0., 360., 20.), np.arange(-80., 81., 20.))
+        x = np.random.random((3, len(self.lon)))
+        W, lon, lat = self.R.get_weights(target, cache=False)
+        r = apply_weights(W, x)
+        self.assertEqual(r.shape, (3, len(lat) * len(lon)))
+        d, idx = self.R.index.tree.query(self.R._target_points(lon, lat))
+        self.assertTrue(np.all(r == x[:, idx]))
+
+        W, lon, lat = self.R.get_weights(target, method='idw', k=3, cache=False)
+        self.assertTrue(np.all(np.abs(np.asarray(W.sum(axis=1)) - 1.) < 1.E-12))
+        W, lon, lat = self.R.get_weights((self.lon[:1], self.lat[:1]), method='idw', cache=False)
+        self.assertEqual(W[0, 0], 1.)
+
+        W, lon, lat = self.R.get_weights('r36x18', method='overlap', cache=False)
+        self.assertTrue(np.all(np.abs(np.asarray(W.sum(axis=1)) - 1.) < 1.E-12))
+        r = apply_weights(W, np.ones(len(self.lon)) * 2.)
+        self.assertTrue(np.all(np.abs(r - 2.) < 1.E-12))
+        with self.assertRaises(ValueError):
+            self.R.get_weights('r36x18', method='bilinear')
+
+    def test_masked(self):
+        W, lon, lat = self.R.get_weights('r36x18', method='overlap', cache=False)
+        x = np.ma.array(np.random.random((2, len(self.lon))))
+        x[0, self.lat > 45.] = np.ma.masked
+        r = apply_weights(W, x).reshape((2, len(lat), len(lon)))
+        self.assertTrue(np.all(r.mask[0, lat > 60.]))
+        self.assertFalse(np.any(r.mask[0, lat < 40.]))
+        self.assertFalse(np.any(r.mask[1]))
+        ref = apply_weights(W, x.data[0]).reshape((len(lat), len(lon)))
+        self.assertTrue(np.all(np.abs(r[0, lat < 40.] - ref[lat < 40.]) < 1.E-12))
+
+    def test_cache(self):
+        W, lon, lat = self.R.get_weights('t21grid', method='overlap', cache_dir=self.dir)
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+        R = Regridder(self.lon, self.lat, key=self.R.key)
+        W2, lon, lat = R.get_weights('t21grid', method='overlap', cache_dir=self.dir)
+        self.assertTrue(R._normals is None)  # not recalculated
+        self.assertTrue(np.all((W != W2).data == 0))
+        self.assertEqual(W.shape, W2.shape)
+        # no temporary files are left
+        self.assertTrue(os.listdir(self.dir)[0].endswith('.snap'))
+
+    def test_registry(self):
+        n = regrid.max_regridders
+        regrid.max_regridders = 2
+        try:
+            R1 = regrid.get_regridder(self.lon, self.lat)
+            self.assertTrue(regrid.get_regridder(self.lon.copy(), self.lat.copy()) is R1)
+            regrid.get_regridder(self.lon + 1., self.lat)
+            regrid.get_regridder(self.lon + 2., self.lat)
+            self.assertEqual(len(regrid._regridders), 2)
+            self.assertFalse(regrid.get_regridder(self.lon, self.lat) is R1)
+        finally:
+            regrid.max_regridders = n
+
+
+class TestIconRegrid(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(4)
+        self.dir = tempfile.mkdtemp() + os.sep
+        lon, lat, vlon, vlat = _sample_mesh(300)
+        F = Dataset(self.dir + 'grid.nc', 'w')
+        F.uuidOfHGrid = 'a2b4c6d8-0000-0000-0000-000000000001'
+        F.createDimension('cell', len(lon))
+        F.createDimension('nv', 3)
+        F.createVariable('clon', 'f8', ('cell',))[:] = lon
+        F.createVariable('clat', 'f8', ('cell',))[:] = lat
+        F.createVariable('clon_vertices', 'f8', ('cell', 'nv'))[:] = vlon
+        F.createVariable('clat_vertices', 'f8', ('cell', 'nv'))[:] = vlat
+        F.close()
+        self.x = np.random.random((4, len(lon)))
+        F = Dataset(self.dir + 'data.nc', 'w')
+        F.createDimension('time', None)
+        F.createDimension('ncells', len(lon))
+        t = F.createVariable('time', 'f8', ('time',))
+        t.units = 'days since 2000-01-01 00:00:00'
+        t[:] = np.arange(4) * 30.
+        F.createVariable('tas', 'f8', ('time', 'ncells'))[:] = self.x
+        F.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_regrid(self):
+        I = Icon(self.dir + 'data.nc', self.dir + 'grid.nc', 'tas')
+        I.read()
+        self.assertEqual(I.grid_uuid, 'a2b4c6d8-0000-0000-0000-000000000001')
+        D = I.regrid('r36x18', method='overlap', cache_dir=self.dir)
+        self.assertEqual(D.data.shape, (4, 18, 36))
+        self.assertEqual(D.lon.shape, (18, 36))
+        self.assertFalse(hasattr(D, 'vlon'))
+        self.assertTrue(np.all(np.abs(D.fldmean(return_data=False) - self.x.mean(axis=1)) < 0.05))
+        self.assertTrue(os.path.exists(self.dir + os.listdir(self.dir)[-1]))
+        D2 = I.regrid('r36x18', method='overlap', cache_dir=self.dir)
+        self.assertTrue(np.all(D2.data == D.data))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+
+import numpy as np
+from scipy import stats
+
+from pycmbs.data import Data
+from pycmbs.significance import ttest_ind, masked_moments
+
+
+class TestSignificance(unittest.TestCase):
+
+    def setUp(self):
+        self.a = np.ma.array(np.random.random((30, 4, 5)))
+        self.b = np.ma.array(np.random.random((25, 4, 5)) * 2. + 0.2)
+        self.a[::3, 1, 2] = np.ma.masked
+        self.b[5:, 3, 3] = np.ma.masked
+        self.b[:, 0, 0] = np.ma.masked
+
+    def test_moments(self):
+        n, m, v = masked_moments(self.a, axis=0)
+        self.assertTrue(np.all(n == self.a.count(axis=0)))
+        self.assertTrue(np.all(np.abs(m - self.a.mean(axis=0)) < 1.E-12))
+        self.assertTrue(np.all(np.abs(v - self.a.var(axis=0, ddof=1)) < 1.E-12))
+        n, m, v = masked_moments(self.a, axis=2)
+        self.assertTrue(np.all(np.abs(m - self.a.mean(axis=2)) < 1.E-12))
+
+    def test_ttest_ind(self):
+        for equal_var in [True, False]:
+            t, p = ttest_ind(self.a, self.b, axis=0, equal_var=equal_var)
+            self.assertEqual(t.shape, (4, 5))
+            self.assertTrue(t.mask[0, 0])
+            self.assertTrue(p.mask[0, 0])
+            for i, j in [(0, 1), (1, 2), (3, 3), (2, 4)]:
+                tr, pr = stats.ttest_ind(self.a[:, i, j].compressed(), self.b[:, i, j].compressed(),
+                                         equal_var=equal_var)
+                self.assertAlmostEqual(t[i, j], tr, 10)
+                self.assertAlmostEqual(p[i, j], pr, 10)
+
+    def test_diff(self):
+        A = Data(None, None)
+        A._init_sample_object(nt=30, ny=4, nx=5)
+        A.data = self.a
+        B = Data(None, None)
+        B._init_sample_object(nt=30, ny=4, nx=5)
+        B.data = np.ma.array(np.random.random((30, 4, 5)) * 0.1 + 0.5)
+        B.data[:, 2, :] = self.a[:, 2, :] + 0.005
+
+        r = A.diff(B, equal_var=False, pthres=0.05, mask_data=True)
+        t, p = ttest_ind(A.data, B.data, equal_var=False)
+        self.assertTrue(np.all(np.abs(r.p_value - (1. - p)) < 1.E-12))
+        self.assertTrue(np.all(r.p_mask == (p <= 0.05)))
+        # mean difference only where significant
+        self.assertTrue(np.all(r.data.mask[2, :]))
+        ref = A.data.mean(axis=0) - B.data.mean(axis=0)
+        m = ~r.data.mask
+        self.assertTrue(np.all(np.abs(r.data[m] - ref[m]) < 1.E-12))
+
+        r = A.diff(B)
+        self.assertFalse(np.any(r.data.mask))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+import os
+import tempfile
+
+import numpy as np
+
+from pycmbs.data import Data
+from pycmbs.snapshot import write_snapshot, read_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(11)
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=10, ny=3, nx=5)
+        self.D.data = np.ma.array(np.random.random((10, 3, 5)).astype('float32'),
+                                  mask=np.random.random((10, 3, 5)) > 0.7)
+        self.D.std = np.random.random((10, 3, 5))
+        self.filename = tempfile.mktemp(suffix='.snap')
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_arrays(self):
+        a = {'x': np.arange(7, dtype='int16'), 'y': np.ones((3, 4)),
+             'z': np.zeros(0), 'none': None}
+        write_snapshot(self.filename, a, attributes={'name': 'abc', 'v': 1.5})
+        with self.assertRaises(ValueError):
+            write_snapshot(self.filename, a)
+        for mmap in [True, False]:
+            r, attr = read_snapshot(self.filename, mmap=mmap)
+            self.assertEqual(sorted(r.keys()), ['x', 'y', 'z'])
+            for k in r.keys():
+                self.assertEqual(r[k].dtype, a[k].dtype)
+                self.assertTrue(np.all(r[k] == a[k]))
+            self.assertEqual(attr, {'name': 'abc', 'v': 1.5})
+            self.assertTrue(isinstance(attr['name'], str))
+
+    def test_dump_load(self):
+        self.D.dump(self.filename)
+        for mmap in [True, False]:
+            x = Data.load(self.filename, mmap=mmap)
+            self.assertEqual(x.data.dtype, np.dtype('float32'))
+            self.assertTrue(np.all(x.data.mask == self.D.data.mask))
+            self.assertTrue(np.all(x.data == self.D.data))
+            for k in ['lat', 'lon', 'time', 'cell_area', 'std']:
+                self.assertTrue(np.all(getattr(x, k) == getattr(self.D, k)))
+            for k in ['label', 'unit', 'time_str', 'calendar', 'varname']:
+                self.assertEqual(getattr(x, k), getattr(self.D, k))
+            self.assertEqual(x._get_years(), self.D._get_years())
+
+        # data is mapped and can be modified without touching the file
+        x = Data.load(self.filename)
+        for a in [x.data.data, x.data.mask]:
+            while not isinstance(a, np.memmap):
+                a = a.base
+        x.mulc(2., copy=False)
+        y = Data.load(self.filename)
+        self.assertTrue(np.all(y.data == self.D.data))
+
+    def test_save(self):
+        self.D.save(self.filename, format='snap')
+        x = Data.load(self.filename)
+        self.assertTrue(np.all(x.data == self.D.data))
+        with self.assertRaises(ValueError):
+            Data.load(self.filename + '.nc')
+
+if __name__ == "__main__":
+    unittest.main()
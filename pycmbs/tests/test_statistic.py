@@ -144,6 +144,46 @@ class TestLomb(TestCase):
         #~ _test_ratio(Br[199], np.pi*0.5, thres=0.1)
 
 
+    def test_lomb_field(self):
+        # compare periodogram of field with single timeseries results
+        t = np.arange(0, 365 * 2, 5.)
+        D = Data(None, None)
+        D._init_sample_object(nt=len(t), ny=3, nx=4)
+        D.time = t
+        amp = np.random.random((3, 4)) * 3. + 1.
+        pha = np.random.random((3, 4)) * 2. - 1.
+        for i in xrange(3):
+            for j in xrange(4):
+                D.data[:, i, j] = amp[i, j] * np.cos(2. * np.pi * t / 100. + pha[i, j]) + np.random.random(len(t)) - 0.5
+        D.data[::7, 1, 1] = np.ma.masked  # gaps
+        D.data[:, 2, 3] = np.ma.masked  # no valid data
+
+        P = np.asarray([50., 100., 150.])
+        A, B, R, PV = D.lomb_scargle_periodogram(P, return_object=False, frac=0.5, blocksize=5)
+        self.assertTrue(np.all(np.isnan(A[:, 2, 3])))
+        self.assertTrue(np.all(np.abs(A[1, :2] - amp[:2]) < 0.2))
+        self.assertTrue(np.all(np.abs(B[1, :2] - pha[:2]) < 0.2))
+
+        y = D.data[:, 0, 2]
+        Ar, Br, Rr, Pr = lomb_scargle_periodogram(t, P, y.data)
+        # same model
+        x = 2. * np.pi * t / P[1]
+        self.assertTrue(np.all(np.abs(Ar[1] * np.cos(x + Br[1]) - A[1, 0, 2] * np.cos(x + B[1, 0, 2])) < 1.E-4))
+        self.assertTrue(np.all(np.abs(Rr - R[:, 0, 2]) < 1.E-4))
+        self.assertTrue(R[1, 0, 2] > 0.9)
+        self.assertTrue(PV[1, 0, 2] < 1.E-10)
+
+        y = D.data[:, 1, 1]
+        Ar, Br = lomb_scargle_periodogram(t[~y.mask], P, y.compressed(), corr=False)
+        self.assertAlmostEqual(Ar[1], A[1, 1, 1], 4)
+
+        # parallel processing
+        res = D.lomb_scargle_periodogram(P, return_object=True, frac=0.5, blocksize=3, nproc=2)
+        self.assertEqual(len(res), 4)
+        self.assertTrue(np.all(res[0].data.mask == np.isnan(A)))
+        self.assertTrue(np.all(np.abs(res[0].data.filled(0.) - np.nan_to_num(A)) < 1.E-10))
+        self.assertTrue(np.all(np.abs(res[3].data.filled(0.) - np.nan_to_num(PV)) < 1.E-10))
+
     #~ def test_lomb_normalize(self):
         # LOMB only works with zero mean data !!!!
         # normalization should be therefore implemented, but
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+
+import unittest
+
+import numpy as np
+from netCDF4 import netcdftime
+
+from pycmbs.data import Data
+from pycmbs.timeaxis import TimeAxis, date2num, parse_time_units
+from geoval.core.data import GeoData
+
+
+class TestTimeAxis(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(42)
+        self.t = np.sort(np.random.random(200) * 800000. - 200000.)
+
+    def _compare(self, t, time_str, calendar):
+        T = TimeAxis(t, time_str, calendar=calendar)
+        ref = netcdftime.utime(time_str, calendar=calendar).num2date(t)
+        for i, d in enumerate(ref):
+            self.assertEqual((T.year[i], T.month[i], T.day[i], T.hour[i], T.minute[i]),
+                             (d.year, d.month, d.day, d.hour, d.minute))
+
+    def test_calendars(self):
+        for cal in ['standard', 'proleptic_gregorian', 'julian', 'noleap',
+                    'all_leap', '360_day']:
+            self._compare(self.t, 'days since 1850-01-01 00:00:00', cal)
+        self._compare(self.t * 24., 'hours since 1979-01-01 06:00:00', 'standard')
+        self._compare(np.arange(100) * 1800. + 17., 'seconds since 2000-02-28', 'noleap')
+
+    def test_season(self):
+        T = TimeAxis(np.arange(12) * 30. + 15., 'days since 2001-01-01', calendar='360_day')
+        self.assertTrue(np.all(T.month == np.arange(12) + 1))
+        self.assertTrue(np.all(T.season == np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])))
+        self.assertTrue(np.all(T.dayofyear == np.arange(12) * 30 + 16))
+
+    def test_date2num(self):
+        t = date2num([2000, 2001], [1, 3], [1, 1], hour=[0, 12],
+                     time_str='hours since 2000-01-01 00:00:00')
+        self.assertTrue(np.all(t == np.array([0., 425. * 24. + 12.])))
+        self.assertEqual(parse_time_units('minutes since 1-1-1 0:0:0'), (1440, (1, 1, 1, 0, 0, 0.)))
+        with self.assertRaises(ValueError):
+            parse_time_units('months since 2000-01-01')
+        with self.assertRaises(ValueError):
+            TimeAxis([0.], 'days since 2000-01-01', calendar='mars')
+
+
+class TestDataTimeAxis(unittest.TestCase):
+
+    def setUp(self):
+        self.D = Data(None, None)
+        self.D._init_sample_object(nt=24, ny=2, nx=3)
+        self.D.time_str = 'days since 2000-01-01 00:00:00'
+        self.D.calendar = 'standard'
+        self.D.time = np.arange(24) * 30.5 + 10.
+
+    def test_cache(self):
+        T = self.D.get_time_axis()
+        self.assertTrue(T is self.D.get_time_axis())
+        self.assertEqual(self.D._get_years(), GeoData._get_years(self.D))
+        self.assertEqual(self.D._get_months(), GeoData._get_months(self.D))
+        self.assertTrue(np.all(self.D.date == GeoData._get_date(self.D)))
+
+        # new time, modified time and new calendar invalidate the cache
+        self.D.time = self.D.time + 400.
+        self.assertEqual(self.D._get_years()[0], 2001)
+        self.D.time[0] = 2000.
+        self.assertEqual(self.D._get_years()[0], 2005)
+        self.D.calendar = '360_day'
+        self.assertEqual(self.D._get_years()[0], 2005)
+        self.assertEqual(self.D._get_months()[0], 7)
+        self.assertFalse(T is self.D.get_time_axis())
+
+        self.D.time_str = None
+        self.assertTrue(self.D.get_time_axis() is None)
+
+    def test_convert(self):
+        for time_str, t, f in [('day as YYYYMMDD', [20010115., 19991231.], '_convert_time_YYYYMMDD'),
+                               ('day as YYYYMMDDhhmm', [200101151230., 199912312359.],
+                                '_convert_time_YYYYMMDDhhmm'),
+                               ('month as %Y%m.%f', [200101., 199912.], '_convert_timeYYYYMM'),
+                               ('day as %Y%m%d.%f', [20010115.5, 19991231.75], '_convert_time'),
+                               ('months since 1850-01-15', [0., 5., 1799.],
+                                '_convert_monthly_timeseries')]:
+            x = self.D.copy()
+            x.time_str = time_str
+            x.calendar = 'standard'
+            x.time = np.asarray(t)
+            x.set_time()
+            y = self.D.copy()
+            y.time_str = time_str
+            y.calendar = 'standard'
+            y.time = np.asarray(t)
+            getattr(GeoData, f)(y)
+            self.assertEqual(x.time_str, y.time_str)
+            self.assertTrue(np.all(np.abs(x.time - y.time) < 1.E-6))
+
+if __name__ == "__main__":
+    unittest.main()
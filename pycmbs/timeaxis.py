@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of pyCMBS.
+(c) 2012- Alexander Loew
+For COPYING and LICENSE details, please refer to the LICENSE file
+"""
+"""
+This module implements the decoding of numerical time axes given as
+'<units> since <reference date>' (CF conventions) for all timesteps
+at once. Dates are calculated from day numbers with integer
+arithmetic for the calendars standard (mixed julian/gregorian),
+proleptic_gregorian, julian, noleap, all_leap and 360_day.
+"""
+
+import re
+import datetime
+import hashlib
+
+import numpy as np
+
+valid_calendars = ['standard', 'gregorian', 'proleptic_gregorian', 'julian',
+                   'noleap', '365_day', 'all_leap', '366_day', '360_day']
+
+# number of time units per day
+_units = {'days': 1, 'day': 1, 'd': 1,
+          'hours': 24, 'hour': 24, 'hr': 24, 'h': 24,
+          'minutes': 1440, 'minute': 1440, 'min': 1440,
+          'seconds': 86400, 'second': 86400, 'sec': 86400, 's': 86400}
+
+# julian day number of the first day of the gregorian calendar (1582-10-15)
+_jd_gregorian = 2299161
+
+_ndays_noleap = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_cum_noleap = np.concatenate(([0], np.cumsum(_ndays_noleap)))
+_cum_leap = np.concatenate(([0], np.cumsum(_ndays_noleap + (np.arange(12) == 1))))
+
+_re_units = re.compile(r'^\s*(\w+)\s+since\s+(-?\d+)-(\d+)-(\d+)'
+                       r'(?:[ T]+(\d+):(\d+)(?::(\d+(?:\.\d*)?))?)?\s*(?:UTC|Z|00:00|\+00:00|0:00)?\s*$')
+
+
+def parse_time_units(time_str):
+    """
+    parse a CF time units string
+
+    Parameters
+    ----------
+    time_str : str
+        e.g. 'days since 2000-01-01 00:00:00'
+
+    Returns
+    -------
+    per : int
+        number of time units per day
+    ref : tuple
+        reference date (year, month, day, hour, minute, second)
+    """
+    m = _re_units.match(time_str)
+    if m is None:
+        raise ValueError('Unsupported time units: %s' % time_str)
+    units = m.group(1).lower()
+    if units not in _units:
+        raise ValueError('Unsupported time units: %s' % time_str)
+    ref = [int(m.group(i)) for i in xrange(2, 5)]
+    ref += [int(m.group(i)) if m.group(i) is not None else 0 for i in [5, 6]]
+    ref.append(float(m.group(7)) if m.group(7) is not None else 0.)
+    return _units[units], tuple(ref)
+
+
+def _jd_from_gregorian(y, m, d):
+    a = (14 - m) // 12
+    y = y + 4800 - a
+    m = m + 12 * a - 3
+    return d + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+def _jd_from_julian(y, m, d):
+    a = (14 - m) // 12
+    y = y + 4800 - a
+    m = m + 12 * a - 3
+    return d + (153 * m + 2) // 5 + 365 * y + y // 4 - 32083
+
+
+def _gregorian_from_jd(jd):
+    a = jd + 32044
+    b = (4 * a + 3) // 146097
+    c = a - 146097 * b // 4
+    d = (4 * c + 3) // 1461
+    e = c - 1461 * d // 4
+    m = (5 * e + 2) // 153
+    return (100 * b + d - 4800 + m // 10, m + 3 - 12 * (m // 10),
+            e - (153 * m + 2) // 5 + 1)
+
+
+def _julian_from_jd(jd):
+    c = jd + 32082
+    d = (4 * c + 3) // 1461
+    e = c - 1461 * d // 4
+    m = (5 * e + 2) // 153
+    return d - 4800 + m // 10, m + 3 - 12 * (m // 10), e - (153 * m + 2) // 5 + 1
+
+
+def day_number(year, month, day, calendar='standard'):
+    """
+    consecutive number of a day in a calendar
+
+    Parameters
+    ----------
+    year, month, day : int or ndarray
+        date
+    calendar : str
+        calendar
+
+    Returns
+    -------
+    ndarray (int) of day numbers; for real world calendars these are
+    julian day numbers
+    """
+    y = np.asarray(year, dtype='int64')
+    m = np.asarray(month, dtype='int64')
+    d = np.asarray(day, dtype='int64')
+    if calendar in ['standard', 'gregorian']:
+        greg = (y * 10000 + m * 100 + d) >= 15821015
+        return np.where(greg, _jd_from_gregorian(y, m, d), _jd_from_julian(y, m, d))
+    elif calendar == 'proleptic_gregorian':
+        return _jd_from_gregorian(y, m, d)
+    elif calendar == 'julian':
+        return _jd_from_julian(y, m, d)
+    elif calendar in ['noleap', '365_day']:
+        return 365 * y + _cum_noleap[m - 1] + d - 1
+    elif calendar in ['all_leap', '366_day']:
+        return 366 * y + _cum_leap[m - 1] + d - 1
+    elif calendar == '360_day':
+        return 360 * y + 30 * (m - 1) + d - 1
+    else:
+        raise ValueError('Unsupported calendar: %s' % calendar)
+
+
+def date_from_day_number(n, calendar='standard'):
+    """
+    date for day numbers (inverse of day_number())
+
+    Returns
+    -------
+    year, month, day : ndarrays (int)
+    """
+    n = np.asarray(n, dtype='int64')
+    if calendar in ['standard', 'gregorian']:
+        yg, mg, dg = _gregorian_from_jd(n)
+        yj, mj, dj = _julian_from_jd(n)
+        greg = n >= _jd_gregorian
+        return np.where(greg, yg, yj), np.where(greg, mg, mj), np.where(greg, dg, dj)
+    elif calendar == 'proleptic_gregorian':
+        return _gregorian_from_jd(n)
+    elif calendar == 'julian':
+        return _julian_from_jd(n)
+    elif calendar in ['noleap', '365_day', 'all_leap', '366_day']:
+        ny, cum = (365, _cum_noleap) if calendar in ['noleap', '365_day'] else (366, _cum_leap)
+        y = n // ny
+        doy = n - ny * y
+        m = np.searchsorted(cum, doy, side='right')
+        return y, m, doy - cum[m - 1] + 1
+    elif calendar == '360_day':
+        y = n // 360
+        doy = n - 360 * y
+        return y, doy // 30 + 1, doy % 30 + 1
+    else:
+        raise ValueError('Unsupported calendar: %s' % calendar)
+
+
+def date2num(year, month, day, hour=0, minute=0, second=0., time_str=None,
+             calendar='standard'):
+    """
+    convert dates given by their components into numerical time
+    values for all dates at once
+
+    Parameters
+    ----------
+    year, month, day, hour, minute, second : ndarray
+        components of the dates
+    time_str : str
+        time units, e.g. 'days since 0001-01-01 00:00:00'
+    calendar : str
+        calendar
+
+    Returns
+    -------
+    ndarray of numerical time values
+    """
+    per, ref = parse_time_units(time_str)
+    n0 = day_number(ref[0], ref[1], ref[2], calendar=calendar)
+    s0 = ref[3] * 3600. + ref[4] * 60. + ref[5]
+    n = day_number(year, month, day, calendar=calendar)
+    s = np.asarray(hour) * 3600. + np.asarray(minute) * 60. + np.asarray(second)
+    return (n - n0) * per + (s - s0) * (per / 86400.)
+
+
+class TimeAxis(object):
+
+    def __init__(self, time, time_str, calendar='standard'):
+        """
+        decoded time axis. The components of the dates of all
+        timesteps are calculated once and provided as integer arrays
+
+        Parameters
+        ----------
+        time : ndarray
+            numerical time values
+        time_str : str
+            time units, e.g. 'days since 2000-01-01 00:00:00'
+        calendar : str
+            calendar of the time axis
+
+        Attributes
+        ----------
+        year, month, day, hour, minute, second, microsecond : ndarray
+            components of the dates
+        dayofyear : ndarray
+            day of the year [1 ... 366]
+        season : ndarray
+            season index (0=DJF, 1=MAM, 2=JJA, 3=SON)
+        """
+        if calendar is None:
+            calendar = 'standard'
+        if calendar not in valid_calendars:
+            raise ValueError('Unsupported calendar: %s' % calendar)
+        self.key = self.get_key(time, time_str, calendar)
+        self.calendar = calendar
+        self.time_str = time_str
+
+        per, ref = parse_time_units(time_str)
+        t = np.asarray(time, dtype='float').flatten()
+        if not np.all(np.isfinite(t)):
+            raise ValueError('Invalid time values!')
+        # days since the reference day and time of the day, which is
+        # calculated in the original units to avoid loss of precision
+        d = np.floor(t / per)
+        s = (t - d * per) * (86400. / per) + (ref[3] * 3600. + ref[4] * 60. + ref[5])
+        us = np.round(s * 1.E6).astype('int64')
+        d = d.astype('int64') + us // 86400000000
+        us = us % 86400000000
+
+        n = day_number(ref[0], ref[1], ref[2], calendar=calendar) + d
+        self.year, self.month, self.day = date_from_day_number(n, calendar=calendar)
+        self.dayofyear = n - day_number(self.year, 1, 1, calendar=calendar) + 1
+        self.hour = us // 3600000000
+        self.minute = (us // 60000000) % 60
+        self.second = (us // 1000000) % 60
+        self.microsecond = us % 1000000
+        self.season = (self.month % 12) // 3
+        self._dates = None
+
+    @staticmethod
+    def get_key(time, time_str, calendar):
+        """ key which identifies a time axis """
+        t = np.ascontiguousarray(np.asarray(time, dtype='float'))
+        return (time_str, calendar, t.shape, hashlib.sha1(t.data).hexdigest())
+
+    def __len__(self):
+        return len(self.year)
+
+    def get_dates(self, tzinfo=None):
+        """
+        returns an array of datetime objects; not possible for
+        calendars with dates which do not exist in the real world
+        (e.g. 30th February)
+
+        Parameters
+        ----------
+        tzinfo : tzinfo
+            timezone of the datetime objects
+        """
+        if self._dates is None or self._dates[0] != tzinfo:
+            r = [datetime.datetime(*(x + (0, tzinfo))) for x in
+                 zip(self.year.tolist(), self.month.tolist(), self.day.tolist(),
+                     self.hour.tolist(), self.minute.tolist(), self.second.tolist())]
+            self._dates = (tzinfo, np.asarray(r))
+        return self._dates[1]
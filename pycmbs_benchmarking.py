@@ -278,7 +278,7 @@ def main():
 
         # sum up all models
         for i in range(len(proc_models)):
-            exec('actmodel = ' + proc_models[i] + '.copy()')
+            exec('actmodel = ' + proc_models[i] + '.copy(share=True)')
             MEANMODEL.add_member(actmodel)
             del actmodel
 